@@ -0,0 +1,243 @@
+"""
+Workflow Checkpoints
+Persist step results so failed workflow runs resume where they stopped
+and identical steps across workflows reuse each other's results
+
+Results are stored under a hash of the step's identity and its upstream
+results. A step's identity is its cache_key when it has one (shared by
+every workflow using that key, kept for WORKFLOW_MEMO_TTL_SECONDS) and
+otherwise the run and step name, so only a resumed run of the same
+workflow reuses it; those rows are deleted when the run completes or
+stops being resumable (WORKFLOW_RESUME_MAX_AGE_SECONDS). A running run
+heartbeats, and is never resumed by another caller while its heartbeat
+is fresh.
+"""
+
+from typing import Any, Dict, Optional, Tuple
+import hashlib
+import json
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+WORKFLOW_CHECKPOINT_DB = os.getenv("WORKFLOW_CHECKPOINT_DB", "")
+# Shared (cache_key) results and run records expire after this many seconds
+WORKFLOW_MEMO_TTL_SECONDS = float(os.getenv("WORKFLOW_MEMO_TTL_SECONDS", str(7 * 24 * 3600)))
+# Unfinished runs idle for longer than this start over instead of resuming
+WORKFLOW_RESUME_MAX_AGE_SECONDS = float(os.getenv("WORKFLOW_RESUME_MAX_AGE_SECONDS", str(24 * 3600)))
+# Running runs heartbeat this often; one silent for 3 intervals is considered dead
+WORKFLOW_HEARTBEAT_SECONDS = float(os.getenv("WORKFLOW_HEARTBEAT_SECONDS", "10"))
+
+RUN_RUNNING = "running"
+RUN_COMPLETED = "completed"
+RUN_FAILED = "failed"
+
+
+def step_key(identity: str, upstream: Dict[str, Any]) -> Optional[str]:
+    """
+    Memo key for a step identity and its inputs, or None when the inputs
+    don't round-trip through JSON exactly (no canonical form to hash)
+    """
+    inputs = {"step": identity, "upstream": upstream}
+    try:
+        payload = json.dumps(inputs, sort_keys=True, separators=(",", ":"), allow_nan=False)
+        if json.loads(payload) != inputs:
+            return None
+    except (TypeError, ValueError):
+        return None
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class CheckpointStore:
+    """Interface for step result and run persistence"""
+
+    # How often the engine heartbeats a running run
+    heartbeat_seconds: float = WORKFLOW_HEARTBEAT_SECONDS
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """(found, result) for a step key"""
+        raise NotImplementedError
+
+    def put(self, key: str, workflow_id: str, step_name: str, result: Any, run_id: Optional[str] = None):
+        """Store a result; run_id scopes it to one run (deleted once the run completes)"""
+        raise NotImplementedError
+
+    def start_run(self, workflow_id: str, resume: bool = True) -> str:
+        """
+        Run id for a new run, or the last unfinished run of this workflow when
+        resuming; raises RuntimeError if that run is still live
+        """
+        raise NotImplementedError
+
+    def heartbeat(self, run_id: str):
+        """Mark a run as still executing"""
+        raise NotImplementedError
+
+    def finish_run(self, run_id: str, status: str, report: Dict[str, Any]):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class SQLiteCheckpointStore(CheckpointStore):
+    """Checkpoints in a local SQLite file (results pickled)"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS workflow_step_results (
+            key TEXT PRIMARY KEY,
+            workflow_id TEXT NOT NULL,
+            step_name TEXT NOT NULL,
+            result BLOB NOT NULL,
+            created_at REAL NOT NULL,
+            run_id TEXT
+        );
+        CREATE TABLE IF NOT EXISTS workflow_runs (
+            run_id TEXT PRIMARY KEY,
+            workflow_id TEXT NOT NULL,
+            status TEXT NOT NULL,
+            started_at REAL NOT NULL,
+            finished_at REAL,
+            report TEXT,
+            heartbeat_at REAL
+        );
+        CREATE INDEX IF NOT EXISTS idx_workflow_runs_workflow ON workflow_runs(workflow_id, started_at);
+    """
+    # Columns added after the first release, for existing checkpoint files
+    MIGRATIONS = {
+        "workflow_step_results": {"run_id": "TEXT"},
+        "workflow_runs": {"heartbeat_at": "REAL"},
+    }
+    INDEXES = """
+        CREATE INDEX IF NOT EXISTS idx_workflow_step_results_run ON workflow_step_results(run_id);
+        CREATE INDEX IF NOT EXISTS idx_workflow_step_results_created ON workflow_step_results(created_at)
+            WHERE run_id IS NULL;
+        CREATE INDEX IF NOT EXISTS idx_workflow_runs_heartbeat ON workflow_runs(heartbeat_at);
+    """
+
+    def __init__(self, path: str = WORKFLOW_CHECKPOINT_DB or "workflow_checkpoints.sqlite3",
+                 memo_ttl: float = WORKFLOW_MEMO_TTL_SECONDS,
+                 resume_max_age: float = WORKFLOW_RESUME_MAX_AGE_SECONDS,
+                 heartbeat_seconds: float = WORKFLOW_HEARTBEAT_SECONDS):
+        self.path = path
+        self.memo_ttl = memo_ttl
+        self.resume_max_age = resume_max_age
+        self.heartbeat_seconds = heartbeat_seconds
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(self.SCHEMA)
+        for table, columns in self.MIGRATIONS.items():
+            existing = {row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+            for column, column_type in columns.items():
+                if column not in existing:
+                    self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+        self._conn.execute(
+            "UPDATE workflow_runs SET heartbeat_at = COALESCE(finished_at, started_at) WHERE heartbeat_at IS NULL"
+        )
+        self._conn.executescript(self.INDEXES)
+        # Steps finish on pool threads
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result FROM workflow_step_results "
+                "WHERE key = ? AND (run_id IS NOT NULL OR created_at >= ?)",
+                (key, time.time() - self.memo_ttl)
+            ).fetchone()
+        if row is None:
+            return False, None
+        return True, pickle.loads(row[0])
+
+    def put(self, key: str, workflow_id: str, step_name: str, result: Any, run_id: Optional[str] = None):
+        try:
+            blob = pickle.dumps(result)
+        except Exception as e:
+            logger.warning(f"Step {step_name} result is not picklable, not checkpointed: {e}")
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO workflow_step_results "
+                "(key, workflow_id, step_name, result, created_at, run_id) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, workflow_id, step_name, blob, time.time(), run_id)
+            )
+
+    def _prune(self, now: float):
+        """Drop expired memo rows and run records, and results of runs too old to resume"""
+        self._conn.execute(
+            "DELETE FROM workflow_step_results WHERE run_id IS NULL AND created_at < ?",
+            (now - self.memo_ttl,)
+        )
+        self._conn.execute(
+            "DELETE FROM workflow_step_results WHERE run_id IN "
+            "(SELECT run_id FROM workflow_runs WHERE heartbeat_at < ?)",
+            (now - self.resume_max_age,)
+        )
+        self._conn.execute("DELETE FROM workflow_runs WHERE heartbeat_at < ?", (now - self.memo_ttl,))
+
+    def start_run(self, workflow_id: str, resume: bool = True) -> str:
+        with self._lock:
+            now = time.time()
+            # IMMEDIATE: two processes can't both pick up the same run
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._prune(now)
+                row = None
+                if resume:
+                    row = self._conn.execute(
+                        "SELECT run_id, status, heartbeat_at FROM workflow_runs WHERE workflow_id = ? "
+                        "ORDER BY started_at DESC LIMIT 1",
+                        (workflow_id,)
+                    ).fetchone()
+                if row is not None and row[1] == RUN_RUNNING and row[2] >= now - 3 * self.heartbeat_seconds:
+                    raise RuntimeError(f"Workflow {workflow_id} run {row[0]} is still running")
+                if row is not None and row[1] != RUN_COMPLETED and row[2] >= now - self.resume_max_age:
+                    run_id = row[0]
+                    self._conn.execute(
+                        "UPDATE workflow_runs SET status = ?, finished_at = NULL, heartbeat_at = ? WHERE run_id = ?",
+                        (RUN_RUNNING, now, run_id)
+                    )
+                else:
+                    run_id = uuid.uuid4().hex
+                    self._conn.execute(
+                        "INSERT INTO workflow_runs (run_id, workflow_id, status, started_at, heartbeat_at) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (run_id, workflow_id, RUN_RUNNING, now, now)
+                    )
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return run_id
+
+    def heartbeat(self, run_id: str):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE workflow_runs SET heartbeat_at = ? WHERE run_id = ?", (time.time(), run_id)
+            )
+
+    def finish_run(self, run_id: str, status: str, report: Dict[str, Any]):
+        with self._lock:
+            now = time.time()
+            self._conn.execute(
+                "UPDATE workflow_runs SET status = ?, finished_at = ?, heartbeat_at = ?, report = ? "
+                "WHERE run_id = ?",
+                (status, now, now, json.dumps(report, default=str), run_id)
+            )
+            if status == RUN_COMPLETED:
+                # Nothing left to resume
+                self._conn.execute("DELETE FROM workflow_step_results WHERE run_id = ?", (run_id,))
+
+    def close(self):
+        self._conn.close()
+
+
+def build_checkpoint_store() -> Optional[CheckpointStore]:
+    """SQLite store at WORKFLOW_CHECKPOINT_DB, or None when it isn't set"""
+    return SQLiteCheckpointStore(WORKFLOW_CHECKPOINT_DB) if WORKFLOW_CHECKPOINT_DB else None
@@ -1,48 +1,710 @@
 """
 Message Bus for Inter-Agent Communication
 Enables agents to communicate with each other
+
+History is a fixed-size ring buffer with a per-event-type index, so memory
+stays bounded and history queries cost O(limit). Messages evicted from the
+ring can be spilled to an on-disk segment log that is queried the same way;
+close() spills the rest of the ring and a reopened bus refills its ring
+from the log tail.
+AsyncMessageBus delivers to each subscriber from its own bounded queue.
+With a transport (see transports.py) messages travel between processes:
+by default every bus receives every message, as every subscriber does in
+process; buses sharing a group compete for messages instead.
 """
 
-from typing import Dict, Any, List, Callable, Optional
+from typing import Dict, Any, List, Callable, Deque, Optional, Tuple
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from itertools import islice
+import asyncio
+import json
 import logging
+import os
+import socket
+import threading
+import time
+import uuid
+
+from agents.base.transports import Delivery, Transport, build_transport
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_HISTORY_SIZE = int(os.getenv("MESSAGE_BUS_HISTORY_SIZE", "1000"))
+# Seconds messages stay in memory (0 = until the ring wraps)
+DEFAULT_RETENTION_SECONDS = float(os.getenv("MESSAGE_BUS_RETENTION_SECONDS", "0"))
+DEFAULT_SEGMENT_SIZE = int(os.getenv("MESSAGE_BUS_SEGMENT_SIZE", "10000"))
+DEFAULT_MAX_SEGMENTS = int(os.getenv("MESSAGE_BUS_MAX_SEGMENTS", "100"))
+# AsyncMessageBus: per-subscriber queue bound, backpressure policy, threads for sync callbacks
+DEFAULT_QUEUE_SIZE = int(os.getenv("MESSAGE_BUS_QUEUE_SIZE", "1000"))
+DEFAULT_BACKPRESSURE = os.getenv("MESSAGE_BUS_BACKPRESSURE", "block")
+DEFAULT_DELIVERY_THREADS = int(os.getenv("MESSAGE_BUS_DELIVERY_THREADS", "8"))
+# Log a warning when a subscriber's oldest queued message is older than this
+SLOW_SUBSCRIBER_LAG_SECONDS = float(os.getenv("MESSAGE_BUS_SLOW_LAG_SECONDS", "5"))
+
+BLOCK = "block"
+DROP_OLDEST = "drop_oldest"
+REJECT = "reject"
+BACKPRESSURE_POLICIES = (BLOCK, DROP_OLDEST, REJECT)
+# Transport mode: shared consumer group (unset: every bus gets its own), deliveries before giving up
+DEFAULT_GROUP = os.getenv("MESSAGE_BUS_GROUP") or None
+DEFAULT_MAX_DELIVERIES = int(os.getenv("MESSAGE_BUS_MAX_DELIVERIES", "5"))
+TRANSPORT_TRIM_INTERVAL = float(os.getenv("MESSAGE_BUS_TRIM_INTERVAL", "60"))
+
+
+class Segment:
+    """One append-only JSON-lines file plus its offset index"""
+
+    def __init__(self, path: str, first_seq: int):
+        self.path = path
+        self.first_seq = first_seq
+        self.last_seq = first_seq - 1
+        self.offsets: List[int] = []
+        self.event_offsets: Dict[str, List[int]] = {}
+
+    @property
+    def index_path(self) -> str:
+        return self.path + ".idx"
+
+    def add(self, seq: int, event_type: str, offset: int):
+        self.last_seq = seq
+        self.offsets.append(offset)
+        self.event_offsets.setdefault(event_type, []).append(offset)
+
+    def save_index(self):
+        with open(self.index_path, "w") as f:
+            json.dump({
+                "first_seq": self.first_seq,
+                "last_seq": self.last_seq,
+                "offsets": self.offsets,
+                "event_offsets": self.event_offsets
+            }, f)
+
+    @classmethod
+    def load(cls, path: str, first_seq: int) -> "Segment":
+        """Open a segment from its index, rebuilding the index if it is missing"""
+        segment = cls(path, first_seq)
+        if os.path.exists(segment.index_path):
+            with open(segment.index_path) as f:
+                index = json.load(f)
+            segment.last_seq = index["last_seq"]
+            segment.offsets = index["offsets"]
+            segment.event_offsets = index["event_offsets"]
+            return segment
+        with open(path, "rb") as f:
+            offset = f.tell()
+            for line in iter(f.readline, b""):
+                try:
+                    seq, message = json.loads(line)
+                except ValueError:
+                    # Torn final write
+                    break
+                segment.add(seq, message.get("event_type", ""), offset)
+                offset = f.tell()
+        return segment
+
+
+class SegmentLog:
+    """Spill log for messages evicted from the in-memory history"""
+
+    def __init__(self, directory: str, segment_size: int = DEFAULT_SEGMENT_SIZE,
+                 max_segments: int = DEFAULT_MAX_SEGMENTS):
+        self.directory = directory
+        self.segment_size = segment_size
+        self.max_segments = max_segments
+        os.makedirs(directory, exist_ok=True)
+        self.segments: List[Segment] = [
+            Segment.load(os.path.join(directory, name), int(name[len("segment-"):-len(".jsonl")]))
+            for name in sorted(os.listdir(directory))
+            if name.startswith("segment-") and name.endswith(".jsonl")
+        ]
+        self._file = None
+
+    @property
+    def last_seq(self) -> int:
+        return self.segments[-1].last_seq if self.segments else 0
+
+    def _roll(self, first_seq: int):
+        if self._file is not None:
+            self._file.close()
+            self.segments[-1].save_index()
+        segment = Segment(os.path.join(self.directory, f"segment-{first_seq:016d}.jsonl"), first_seq)
+        self.segments.append(segment)
+        self._file = open(segment.path, "ab")
+        while len(self.segments) > self.max_segments:
+            expired = self.segments.pop(0)
+            for path in (expired.path, expired.index_path):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def append(self, seq: int, message: Dict[str, Any]):
+        if self._file is None or len(self.segments[-1].offsets) >= self.segment_size:
+            self._roll(seq)
+        offset = self._file.tell()
+        self._file.write(json.dumps([seq, message], default=str).encode() + b"\n")
+        self._file.flush()
+        self.segments[-1].add(seq, message.get("event_type", ""), offset)
+
+    def read(self, event_type: Optional[str], limit: int,
+             before_seq: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Newest messages first (only seqs below before_seq), touching only the lines returned"""
+        return [message for _, message in self._read(event_type, limit, before_seq)]
+
+    def tail(self, limit: int) -> List[Tuple[int, Dict[str, Any]]]:
+        """Last `limit` (seq, message) pairs, oldest first"""
+        return self._read(None, limit, None)[::-1]
+
+    def _read(self, event_type: Optional[str], limit: int,
+              before_seq: Optional[int]) -> List[Tuple[int, Dict[str, Any]]]:
+        messages: List[Tuple[int, Dict[str, Any]]] = []
+        for segment in reversed(self.segments):
+            if len(messages) >= limit:
+                break
+            if before_seq is not None and segment.first_seq >= before_seq:
+                continue
+            offsets = segment.offsets if event_type is None else segment.event_offsets.get(event_type)
+            if not offsets:
+                continue
+            with open(segment.path, "rb") as f:
+                for offset in reversed(offsets):
+                    if len(messages) >= limit:
+                        break
+                    f.seek(offset)
+                    seq, message = json.loads(f.readline())
+                    if before_seq is None or seq < before_seq:
+                        messages.append((seq, message))
+        return messages
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self.segments[-1].save_index()
+
 
 class MessageBus:
-    """Message bus for agent communication"""
-    
-    def __init__(self):
+    """
+    Message bus for agent communication
+
+    Without a transport, publish() calls subscribers directly. With one
+    (argument or MESSAGE_BUS_TRANSPORT), publish() also sends through it and
+    a receiver thread, started on the first subscribe(), hands messages from
+    other buses to the local subscribers; a delivery is acknowledged once
+    every subscriber handled it, otherwise it is retried up to
+    max_deliveries times.
+
+    By default each bus has a consumer group of its own, so every bus gets
+    every message and local subscribers are still called synchronously by
+    publish(). Buses given the same group (argument or MESSAGE_BUS_GROUP)
+    are competing consumers: each message goes to one of them, so publish()
+    only sends it and local subscribers receive it asynchronously, like
+    any other member of the group.
+    """
+
+    def __init__(self, history_size: int = DEFAULT_HISTORY_SIZE,
+                 retention_seconds: float = DEFAULT_RETENTION_SECONDS,
+                 segment_dir: Optional[str] = os.getenv("MESSAGE_BUS_SEGMENT_DIR") or None,
+                 segment_size: int = DEFAULT_SEGMENT_SIZE,
+                 max_segments: int = DEFAULT_MAX_SEGMENTS,
+                 transport: Optional[Transport] = None,
+                 group: Optional[str] = DEFAULT_GROUP,
+                 consumer: Optional[str] = None,
+                 max_deliveries: int = DEFAULT_MAX_DELIVERIES):
+        self.transport = transport if transport is not None else build_transport()
+        self.consumer = consumer or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        # Without a shared group the bus has a group of its own (fan-out), dropped on stop()
+        self.own_group = group is None
+        self.group = group or f"bus-{self.consumer}"
+        self.max_deliveries = max_deliveries
+        self._receiver: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
         self.subscribers: Dict[str, List[Callable]] = {}
-        self.message_history: List[Dict[str, Any]] = []
+        self.history_size = max(1, history_size)
+        self.retention_seconds = retention_seconds
+        self.segment_log = SegmentLog(segment_dir, segment_size, max_segments) if segment_dir else None
+        # Ring slot seq % history_size holds (seq, published_at, message)
+        self._ring: List[Optional[Tuple[int, float, Dict[str, Any]]]] = [None] * self.history_size
+        self._event_index: Dict[str, Deque[int]] = {}
+        self._seq = self.segment_log.last_seq if self.segment_log else 0
+        self._oldest = self._seq + 1
+        # Messages up to this seq are already in the segment log
+        self._spilled_through = self._seq
+        self._lock = threading.Lock()
         self.logger = logging.getLogger("message_bus")
-    
+        if self.segment_log is not None:
+            self._restore()
+
+    def _restore(self):
+        """Refill the ring with the newest messages of the segment log"""
+        now = time.monotonic()
+        for seq, message in self.segment_log.tail(self.history_size):
+            self._ring[seq % self.history_size] = (seq, now, message)
+            self._event_index.setdefault(message.get("event_type", ""), deque()).append(seq)
+            self._oldest = min(self._oldest, seq)
+
     def subscribe(self, event_type: str, callback: Callable):
         """Subscribe to an event type"""
         if event_type not in self.subscribers:
             self.subscribers[event_type] = []
         self.subscribers[event_type].append(callback)
+        if self.transport is not None:
+            self.transport.ensure_group(self.group, event_type)
+            self._start_receiver()
         self.logger.info(f"Subscribed to {event_type}")
-    
-    def publish(self, event_type: str, message: Dict[str, Any]):
-        """Publish a message"""
+
+    def _evict_oldest(self):
+        """Drop the oldest in-memory message, spilling it to the segment log"""
+        seq, _, message = self._ring[self._oldest % self.history_size]
+        self._ring[self._oldest % self.history_size] = None
+        self._oldest += 1
+        index = self._event_index.get(message["event_type"])
+        if index and index[0] == seq:
+            index.popleft()
+            if not index:
+                del self._event_index[message["event_type"]]
+        if self.segment_log is not None and seq > self._spilled_through:
+            self.segment_log.append(seq, message)
+            self._spilled_through = seq
+
+    def _expire(self, now: float):
+        if not self.retention_seconds:
+            return
+        while self._oldest <= self._seq:
+            _, published_at, _ = self._ring[self._oldest % self.history_size]
+            if now - published_at < self.retention_seconds:
+                break
+            self._evict_oldest()
+
+    def _record(self, event_type: str, message: Dict[str, Any]):
+        with self._lock:
+            now = time.monotonic()
+            if self._seq - self._oldest + 1 >= self.history_size:
+                self._evict_oldest()
+            self._seq += 1
+            self._ring[self._seq % self.history_size] = (self._seq, now, message)
+            self._event_index.setdefault(event_type, deque()).append(self._seq)
+            self._expire(now)
+
+    def _stamp(self, event_type: str, message: Dict[str, Any]):
         message["timestamp"] = datetime.now().isoformat()
         message["event_type"] = event_type
-        self.message_history.append(message)
-        
+        if self.transport is not None:
+            message["origin"] = self.consumer
+        self._record(event_type, message)
+
+    def _from_self(self, delivery: Delivery) -> bool:
+        """A fan-out bus's own message, already dispatched locally by publish()"""
+        return self.own_group and delivery.message.get("origin") == self.consumer
+
+    def _dispatch(self, event_type: str, message: Dict[str, Any]) -> bool:
+        """Call local subscribers; False if any of them raised"""
+        handled = True
         if event_type in self.subscribers:
             for callback in self.subscribers[event_type]:
                 try:
                     callback(message)
                 except Exception as e:
+                    handled = False
                     self.logger.error(f"Error in callback: {e}")
-        
+        return handled
+
+    def publish(self, event_type: str, message: Dict[str, Any]):
+        """Publish a message"""
+        self._stamp(event_type, message)
+        if self.transport is not None:
+            self.transport.send(event_type, message)
+        if self.transport is None or self.own_group:
+            self._dispatch(event_type, message)
+
         self.logger.info(f"Published {event_type}: {message.get('id', 'unknown')}")
-    
+
+    def _settled(self, delivery: Delivery, handled: bool) -> bool:
+        """Whether a delivery should be acknowledged"""
+        if handled:
+            return True
+        if delivery.attempts >= self.max_deliveries:
+            self.logger.error(
+                f"Giving up on {delivery.event_type} {delivery.id} after {delivery.attempts} deliveries"
+            )
+            return True
+        return False
+
+    def poll(self, block: float = 0.0) -> int:
+        """Receive and dispatch one batch from the transport; returns deliveries handled"""
+        deliveries = self.transport.receive(list(self.subscribers), self.group, self.consumer, block=block)
+        settled = [
+            d for d in deliveries
+            if self._from_self(d) or self._settled(d, self._dispatch(d.event_type, d.message))
+        ]
+        self.transport.ack(self.group, settled)
+        return len(deliveries)
+
+    def _receive_loop(self):
+        trimmed_at = time.monotonic()
+        while not self._stopping.is_set():
+            try:
+                self.poll(block=1.0)
+                if time.monotonic() - trimmed_at > TRANSPORT_TRIM_INTERVAL:
+                    trimmed_at = time.monotonic()
+                    self.transport.trim()
+            except Exception as e:
+                self.logger.error(f"Message bus receive failed: {e}")
+                self._stopping.wait(1.0)
+
+    def _start_receiver(self):
+        if self._receiver is None:
+            self._stopping.clear()
+            self._receiver = threading.Thread(target=self._receive_loop, name="message-bus-receiver", daemon=True)
+            self._receiver.start()
+
+    def stop(self):
+        """Stop the receiver thread, close the transport and the history log"""
+        self._stopping.set()
+        if self._receiver is not None:
+            self._receiver.join()
+            self._receiver = None
+        self._close_transport()
+        self.close()
+
+    def _close_transport(self):
+        """Drop a fan-out bus's own group (nobody else reads it) and close the transport"""
+        if self.transport is None:
+            return
+        if self.own_group and self.subscribers:
+            try:
+                self.transport.drop_group(self.group, list(self.subscribers))
+            except Exception as e:
+                self.logger.warning(f"Could not drop consumer group {self.group}: {e}")
+        self.transport.close()
+
+    @property
+    def message_history(self) -> List[Dict[str, Any]]:
+        """In-memory history, oldest first"""
+        with self._lock:
+            self._expire(time.monotonic())
+            return [self._ring[seq % self.history_size][2] for seq in range(self._oldest, self._seq + 1)]
+
     def get_message_history(self, event_type: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
-        """Get message history"""
-        history = self.message_history
-        if event_type:
-            history = [msg for msg in history if msg.get("event_type") == event_type]
-        return history[-limit:]
+        """Get the last `limit` messages (oldest first), reading the segment log past memory"""
+        if limit <= 0:
+            return []
+        with self._lock:
+            self._expire(time.monotonic())
+            if event_type is None:
+                seqs = range(max(self._oldest, self._seq - limit + 1), self._seq + 1)
+            else:
+                seqs = list(islice(reversed(self._event_index.get(event_type, ())), limit))[::-1]
+            history = [self._ring[seq % self.history_size][2] for seq in seqs]
+            if len(history) < limit and self.segment_log is not None:
+                older = self.segment_log.read(event_type, limit - len(history), before_seq=self._oldest)
+                history = older[::-1] + history
+        return history
+
+    def close(self):
+        """Spill the in-memory history to the segment log and flush its index"""
+        if self.segment_log is None:
+            return
+        with self._lock:
+            for seq in range(max(self._oldest, self._spilled_through + 1), self._seq + 1):
+                self.segment_log.append(seq, self._ring[seq % self.history_size][2])
+            self._spilled_through = self._seq
+            self.segment_log.close()
+
+
+class BackpressureError(Exception):
+    """A reject-policy subscriber's queue is full"""
+
+    def __init__(self, subscription: "Subscription"):
+        super().__init__(f"Subscriber {subscription.name} queue is full ({subscription.max_queue})")
+        self.subscription = subscription
+
+
+class PendingAck:
+    """Acknowledges a transport delivery once every local subscriber is done with it"""
+
+    def __init__(self, bus: "AsyncMessageBus", delivery: Delivery, remaining: int):
+        self.bus = bus
+        self.delivery = delivery
+        self.remaining = remaining
+        self.handled = True
+
+    def done(self, handled: bool):
+        self.handled = self.handled and handled
+        self.remaining -= 1
+        if self.remaining == 0 and self.bus._settled(self.delivery, self.handled):
+            future = self.bus._loop.run_in_executor(
+                self.bus._executor, self.bus.transport.ack, self.bus.group, [self.delivery]
+            )
+            future.add_done_callback(self._acked)
+
+    def _acked(self, future: asyncio.Future):
+        # Unacknowledged deliveries are redelivered after claim_after, so only log
+        if not future.cancelled() and future.exception() is not None:
+            self.bus.logger.error(
+                f"Failed to acknowledge {self.delivery.event_type} {self.delivery.id}: {future.exception()}"
+            )
+
+
+class Subscription:
+    """One subscriber's bounded queue and delivery counters"""
+
+    def __init__(self, event_type: str, callback: Callable, name: str, max_queue: int, policy: str):
+        if policy not in BACKPRESSURE_POLICIES:
+            raise ValueError(f"Unknown backpressure policy {policy}")
+        self.event_type = event_type
+        self.callback = callback
+        self.name = name
+        self.max_queue = max(1, max_queue)
+        self.policy = policy
+        self.is_coroutine = asyncio.iscoroutinefunction(callback)
+        # (enqueued_at, message, transport delivery to acknowledge or None)
+        self.queue: Deque[Tuple[float, Dict[str, Any], Optional[PendingAck]]] = deque()
+        self.delivered = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.errors = 0
+        self.last_lag = 0.0
+        self.task: Optional[asyncio.Task] = None
+        self._changed: Optional[asyncio.Condition] = None
+        self._busy = False
+
+    @property
+    def full(self) -> bool:
+        return len(self.queue) >= self.max_queue
+
+    @property
+    def lag(self) -> float:
+        """Age of the oldest undelivered message"""
+        return time.monotonic() - self.queue[0][0] if self.queue else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "event_type": self.event_type,
+            "policy": self.policy,
+            "depth": len(self.queue),
+            "max_queue": self.max_queue,
+            "lag_seconds": round(self.lag, 6),
+            "last_delivery_lag_seconds": round(self.last_lag, 6),
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "rejected": self.rejected,
+            "errors": self.errors,
+        }
+
+
+class AsyncMessageBus(MessageBus):
+    """
+    Message bus that delivers concurrently: every subscriber has its own
+    bounded queue drained by an asyncio task, so a slow subscriber only
+    delays itself. Coroutine callbacks run on the event loop and plain
+    callbacks on a thread pool; each subscriber still sees its messages in
+    order. When a queue is full, the subscriber's policy decides: block
+    (publish waits), drop_oldest, or reject (publish raises BackpressureError).
+    With a transport, start() runs the receiver as a task; transport
+    deliveries that are dropped or rejected stay unacknowledged and are
+    redelivered.
+    """
+
+    def __init__(self, max_queue: int = DEFAULT_QUEUE_SIZE, policy: str = DEFAULT_BACKPRESSURE,
+                 delivery_threads: int = DEFAULT_DELIVERY_THREADS, **history_options):
+        super().__init__(**history_options)
+        if policy not in BACKPRESSURE_POLICIES:
+            raise ValueError(f"Unknown backpressure policy {policy}")
+        self.max_queue = max_queue
+        self.policy = policy
+        self.subscriptions: Dict[str, List[Subscription]] = {}
+        self.delivery_threads = delivery_threads
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._receive_task: Optional[asyncio.Task] = None
+
+    def subscribe(self, event_type: str, callback: Callable, name: Optional[str] = None,
+                  max_queue: Optional[int] = None, policy: Optional[str] = None) -> Subscription:
+        """Subscribe to an event type with its own queue (defaults from the bus)"""
+        subscription = Subscription(
+            event_type,
+            callback,
+            name or getattr(callback, "__qualname__", repr(callback)),
+            self.max_queue if max_queue is None else max_queue,
+            policy or self.policy
+        )
+        self.subscriptions.setdefault(event_type, []).append(subscription)
+        super().subscribe(event_type, callback)
+        if self._loop is not None:
+            self._start_subscription(subscription)
+        return subscription
+
+    def _start_receiver(self):
+        # Receiving runs on the event loop (see start())
+        pass
+
+    def _start_subscription(self, subscription: Subscription):
+        subscription._changed = asyncio.Condition()
+        subscription.task = self._loop.create_task(self._deliver(subscription))
+
+    async def start(self):
+        """Start delivery tasks on the running loop"""
+        if self._loop is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._executor = ThreadPoolExecutor(max_workers=self.delivery_threads, thread_name_prefix="message-bus")
+        for subscriptions in self.subscriptions.values():
+            for subscription in subscriptions:
+                self._start_subscription(subscription)
+        if self.transport is not None:
+            self._receive_task = self._loop.create_task(self._receive_loop_async())
+
+    async def _receive_loop_async(self):
+        trimmed_at = time.monotonic()
+        while True:
+            try:
+                deliveries = await self._loop.run_in_executor(
+                    self._executor, self.transport.receive,
+                    list(self.subscriptions), self.group, self.consumer, self.max_queue, 1.0
+                )
+                own = [d for d in deliveries if self._from_self(d)]
+                for delivery in deliveries:
+                    if not self._from_self(delivery):
+                        await self._fan_out(delivery)
+                if own:
+                    await self._loop.run_in_executor(self._executor, self.transport.ack, self.group, own)
+                if time.monotonic() - trimmed_at > TRANSPORT_TRIM_INTERVAL:
+                    trimmed_at = time.monotonic()
+                    await self._loop.run_in_executor(self._executor, self.transport.trim)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error(f"Message bus receive failed: {e}")
+                await asyncio.sleep(1.0)
+
+    async def _fan_out(self, delivery: Delivery):
+        """Queue a transport delivery for the local subscribers"""
+        subscriptions = self.subscriptions.get(delivery.event_type, [])
+        for subscription in subscriptions:
+            if subscription.policy == REJECT and subscription.full:
+                # Left unacknowledged: the transport redelivers it after claim_after
+                subscription.rejected += 1
+                return
+        pending = PendingAck(self, delivery, len(subscriptions))
+        if not subscriptions:
+            pending.remaining = 1
+            pending.done(True)
+        for subscription in sorted(subscriptions, key=lambda s: s.policy == BLOCK):
+            await self._enqueue(subscription, delivery.message, pending)
+
+    async def _deliver(self, subscription: Subscription):
+        changed = subscription._changed
+        while True:
+            async with changed:
+                await changed.wait_for(lambda: subscription.queue)
+                enqueued_at, message, pending = subscription.queue.popleft()
+                subscription._busy = True
+                changed.notify_all()
+            subscription.last_lag = time.monotonic() - enqueued_at
+            if subscription.last_lag > SLOW_SUBSCRIBER_LAG_SECONDS:
+                self.logger.warning(
+                    f"Slow subscriber {subscription.name}: {subscription.last_lag:.1f}s behind, "
+                    f"{len(subscription.queue)} queued"
+                )
+            handled = False
+            try:
+                if subscription.is_coroutine:
+                    await subscription.callback(message)
+                else:
+                    await self._loop.run_in_executor(self._executor, subscription.callback, message)
+                subscription.delivered += 1
+                handled = True
+            except Exception as e:
+                subscription.errors += 1
+                self.logger.error(f"Error in callback {subscription.name}: {e}")
+            finally:
+                if pending is not None:
+                    pending.done(handled)
+                async with changed:
+                    subscription._busy = False
+                    changed.notify_all()
+
+    async def _enqueue(self, subscription: Subscription, message: Dict[str, Any],
+                       pending: Optional[PendingAck] = None):
+        changed = subscription._changed
+        async with changed:
+            if subscription.full:
+                if subscription.policy == BLOCK:
+                    await changed.wait_for(lambda: not subscription.full)
+                elif subscription.policy == DROP_OLDEST:
+                    _, _, dropped = subscription.queue.popleft()
+                    subscription.dropped += 1
+                    if dropped is not None:
+                        dropped.done(False)
+            subscription.queue.append((time.monotonic(), message, pending))
+            changed.notify_all()
+
+    async def publish(self, event_type: str, message: Dict[str, Any]):
+        """Record and queue a message for every subscriber (see the backpressure policies)"""
+        if self._loop is None:
+            await self.start()
+        # Competing consumers get their own messages back from the transport
+        local = self.transport is None or self.own_group
+        subscriptions = self.subscriptions.get(event_type, []) if local else []
+        for subscription in subscriptions:
+            if subscription.policy == REJECT and subscription.full:
+                subscription.rejected += 1
+                raise BackpressureError(subscription)
+        self._stamp(event_type, message)
+        if self.transport is not None:
+            await self._loop.run_in_executor(self._executor, self.transport.send, event_type, message)
+        # Non-blocking queues first so a blocked subscriber doesn't hold the others back
+        for subscription in sorted(subscriptions, key=lambda s: s.policy == BLOCK):
+            await self._enqueue(subscription, message)
+        self.logger.debug(f"Published {event_type}: {message.get('id', 'unknown')}")
+
+    def publish_threadsafe(self, event_type: str, message: Dict[str, Any]):
+        """Publish from another thread; returns a concurrent.futures.Future"""
+        if self._loop is None:
+            raise RuntimeError("AsyncMessageBus is not started")
+        return asyncio.run_coroutine_threadsafe(self.publish(event_type, message), self._loop)
+
+    async def drain(self):
+        """Wait until every queued message has been delivered"""
+        for subscriptions in self.subscriptions.values():
+            for subscription in subscriptions:
+                if subscription._changed is None:
+                    continue
+                async with subscription._changed:
+                    await subscription._changed.wait_for(
+                        lambda s=subscription: not s.queue and not s._busy
+                    )
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-subscriber queue depth, lag and delivery counters"""
+        return {
+            subscription.name: subscription.stats()
+            for subscriptions in self.subscriptions.values()
+            for subscription in subscriptions
+        }
+
+    async def stop(self, drain: bool = True):
+        """Stop delivery (after draining queues by default), the transport and the history log"""
+        if self._receive_task is not None:
+            self._receive_task.cancel()
+            await asyncio.gather(self._receive_task, return_exceptions=True)
+            self._receive_task = None
+        if drain:
+            await self.drain()
+        tasks = [
+            s.task for subscriptions in self.subscriptions.values() for s in subscriptions if s.task
+        ]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for subscriptions in self.subscriptions.values():
+            for subscription in subscriptions:
+                subscription.task = None
+                subscription._changed = None
+        self._loop = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        self._close_transport()
+        self.close()
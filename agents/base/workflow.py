@@ -1,14 +1,31 @@
 """
 Workflow Engine
 Manages agent workflows and task execution
+
+Steps form a DAG through their dependencies. Independent steps run
+concurrently on a thread pool, each step receives its upstream results,
+and every run reports its critical path. With a checkpoint store, step
+results are persisted so failed runs resume and cache_key steps are
+shared across workflows (see checkpoints.py).
 """
 
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from typing import Dict, List, Any, Callable, Optional
 from enum import Enum
+import asyncio
+import inspect
 import logging
+import os
+import time
+
+from agents.base.checkpoints import (
+    RUN_COMPLETED, RUN_FAILED, CheckpointStore, build_checkpoint_store, step_key
+)
 
 logger = logging.getLogger(__name__)
 
+WORKFLOW_MAX_WORKERS = int(os.getenv("WORKFLOW_MAX_WORKERS", "8"))
+
 
 class WorkflowStatus(Enum):
     PENDING = "pending"
@@ -20,46 +37,238 @@ class WorkflowStatus(Enum):
 
 class WorkflowStep:
     """Represents a step in a workflow"""
-    
-    def __init__(self, name: str, action: Callable, dependencies: List[str] = None):
+
+    def __init__(self, name: str, action: Callable, dependencies: List[str] = None,
+                 cache_key: Optional[str] = None, pass_upstream: Optional[bool] = None):
         self.name = name
         self.action = action
         self.dependencies = dependencies or []
+        # Identifies the computation for memoization across workflows (e.g. "rag.query:v1")
+        self.cache_key = cache_key
+        self.cached = False
         self.status = WorkflowStatus.PENDING
         self.result = None
         self.error = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        # Whether action is called with the upstream results ({dependency name: result});
+        # by default only when it has a required positional parameter
+        self.takes_upstream = _requires_argument(action) if pass_upstream is None else pass_upstream
+
+    @property
+    def duration(self) -> float:
+        if self.started_at is None or self.finished_at is None:
+            return 0.0
+        return self.finished_at - self.started_at
+
+    def reset(self):
+        self.cached = False
+        self.status = WorkflowStatus.PENDING
+        self.result = None
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+
+
+def _requires_argument(action: Callable) -> bool:
+    try:
+        parameters = inspect.signature(action).parameters.values()
+    except (TypeError, ValueError):
+        return False
+    return any(
+        p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD) and p.default is p.empty
+        for p in parameters
+    )
+
+
+def topological_order(steps: List[WorkflowStep]) -> List[WorkflowStep]:
+    """Steps ordered so every step follows its dependencies; raises ValueError on bad graphs"""
+    by_name: Dict[str, WorkflowStep] = {}
+    for step in steps:
+        if step.name in by_name:
+            raise ValueError(f"Duplicate workflow step {step.name}")
+        by_name[step.name] = step
+    for step in steps:
+        for dependency in step.dependencies:
+            if dependency not in by_name:
+                raise ValueError(f"Step {step.name} depends on unknown step {dependency}")
+
+    remaining = {step.name: len(set(step.dependencies)) for step in steps}
+    dependents: Dict[str, List[str]] = {step.name: [] for step in steps}
+    for step in steps:
+        for dependency in set(step.dependencies):
+            dependents[dependency].append(step.name)
+    ready = [step.name for step in steps if remaining[step.name] == 0]
+    ordered = []
+    while ready:
+        name = ready.pop(0)
+        ordered.append(by_name[name])
+        for dependent in dependents[name]:
+            remaining[dependent] -= 1
+            if remaining[dependent] == 0:
+                ready.append(dependent)
+    if len(ordered) != len(steps):
+        cycle = sorted(name for name, count in remaining.items() if count > 0)
+        raise ValueError(f"Workflow has a dependency cycle through {', '.join(cycle)}")
+    return ordered
+
+
+def critical_path(steps: List[WorkflowStep]) -> Dict[str, Any]:
+    """Longest chain of step durations through the DAG (what bounds the run time)"""
+    by_name = {step.name: step for step in steps}
+    finish: Dict[str, float] = {}
+    previous: Dict[str, Optional[str]] = {}
+    for step in topological_order(steps):
+        upstream = max(step.dependencies, key=lambda name: finish[name], default=None)
+        finish[step.name] = step.duration + (finish[upstream] if upstream else 0.0)
+        previous[step.name] = upstream
+    if not finish:
+        return {"steps": [], "seconds": 0.0}
+    name = max(finish, key=finish.get)
+    path = []
+    while name is not None:
+        path.append(name)
+        name = previous[name]
+    return {
+        "steps": path[::-1],
+        "seconds": round(sum(by_name[n].duration for n in path), 6),
+    }
 
 
 class WorkflowEngine:
     """Workflow execution engine"""
-    
-    def __init__(self):
+
+    def __init__(self, max_workers: int = WORKFLOW_MAX_WORKERS,
+                 checkpoint_store: Optional[CheckpointStore] = None):
         self.workflows: Dict[str, List[WorkflowStep]] = {}
+        self.reports: Dict[str, Dict[str, Any]] = {}
+        self.max_workers = max_workers
+        self.checkpoint_store = checkpoint_store if checkpoint_store is not None else build_checkpoint_store()
         self.logger = logging.getLogger("workflow_engine")
-    
+
     def create_workflow(self, workflow_id: str, steps: List[WorkflowStep]):
-        """Create a new workflow"""
+        """Create a new workflow (raises ValueError for unknown dependencies or cycles)"""
+        topological_order(steps)
         self.workflows[workflow_id] = steps
         self.logger.info(f"Created workflow: {workflow_id} with {len(steps)} steps")
-    
-    def execute_workflow(self, workflow_id: str) -> Dict[str, Any]:
-        """Execute a workflow"""
+
+    def _run_step(self, workflow_id: str, run_id: Optional[str], step: WorkflowStep,
+                  upstream: Dict[str, Any]) -> Any:
+        key = None
+        if self.checkpoint_store is not None:
+            key = step_key(step.cache_key or f"run:{run_id}/{step.name}", upstream)
+            if key is None:
+                self.logger.debug(f"Step {step.name} inputs have no canonical form, not memoized")
+        if key is not None:
+            found, result = self.checkpoint_store.get(key)
+            if found:
+                step.cached = True
+                step.started_at = step.finished_at = time.perf_counter()
+                return result
+        step.started_at = time.perf_counter()
+        try:
+            result = step.action(upstream) if step.takes_upstream else step.action()
+            if inspect.isawaitable(result):
+                result = asyncio.run(_await(result))
+        finally:
+            step.finished_at = time.perf_counter()
+        if key is not None:
+            self.checkpoint_store.put(key, workflow_id, step.name, result, None if step.cache_key else run_id)
+        return result
+
+    def execute_workflow(self, workflow_id: str, resume: bool = True) -> Dict[str, Any]:
+        """
+        Execute a workflow: each step starts as soon as its dependencies have
+        completed. After a failure no new steps start and the rest are
+        cancelled. Returns results of completed steps; see get_report().
+        With a checkpoint store, resume=True continues the workflow's last
+        unfinished run, skipping steps that already succeeded (RuntimeError
+        if that run is still executing elsewhere).
+        """
         if workflow_id not in self.workflows:
             raise ValueError(f"Workflow {workflow_id} not found")
-        
+
         steps = self.workflows[workflow_id]
-        results = {}
-        
         for step in steps:
-            try:
-                step.status = WorkflowStatus.RUNNING
-                step.result = step.action()
-                step.status = WorkflowStatus.COMPLETED
-                results[step.name] = step.result
-            except Exception as e:
-                step.status = WorkflowStatus.FAILED
-                step.error = str(e)
-                self.logger.error(f"Workflow step failed: {step.name} - {e}")
-                break
-        
+            step.reset()
+        by_name = {step.name: step for step in steps}
+        waiting = {step.name: set(step.dependencies) for step in steps}
+        results = {}
+        running: Dict[Future, WorkflowStep] = {}
+        failed = False
+        started = time.perf_counter()
+        run_id = self.checkpoint_store.start_run(workflow_id, resume) if self.checkpoint_store else None
+        heartbeat_seconds = self.checkpoint_store.heartbeat_seconds if run_id is not None else None
+        heartbeat_at = time.monotonic()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=f"workflow-{workflow_id}") as pool:
+            while True:
+                if not failed:
+                    for name in [n for n, deps in waiting.items() if not deps]:
+                        step = by_name[name]
+                        del waiting[name]
+                        step.status = WorkflowStatus.RUNNING
+                        upstream = {d: by_name[d].result for d in step.dependencies}
+                        running[pool.submit(self._run_step, workflow_id, run_id, step, upstream)] = step
+                if not running:
+                    break
+                done, _ = wait(running, timeout=heartbeat_seconds, return_when=FIRST_COMPLETED)
+                if run_id is not None and time.monotonic() - heartbeat_at >= heartbeat_seconds:
+                    heartbeat_at = time.monotonic()
+                    self.checkpoint_store.heartbeat(run_id)
+                for future in done:
+                    step = running.pop(future)
+                    try:
+                        step.result = future.result()
+                        step.status = WorkflowStatus.COMPLETED
+                        results[step.name] = step.result
+                        for deps in waiting.values():
+                            deps.discard(step.name)
+                    except Exception as e:
+                        step.status = WorkflowStatus.FAILED
+                        step.error = str(e)
+                        failed = True
+                        self.logger.error(f"Workflow step failed: {step.name} - {e}")
+
+        for name in waiting:
+            by_name[name].status = WorkflowStatus.CANCELLED
+        self.reports[workflow_id] = self._report(steps, time.perf_counter() - started)
+        if run_id is not None:
+            self.reports[workflow_id]["run_id"] = run_id
+            self.checkpoint_store.finish_run(run_id, RUN_FAILED if failed else RUN_COMPLETED, self.reports[workflow_id])
+        self.logger.info(
+            f"Workflow {workflow_id} finished in {self.reports[workflow_id]['wall_seconds']}s "
+            f"(critical path {self.reports[workflow_id]['critical_path']['seconds']}s)"
+        )
         return results
+
+    async def execute_workflow_async(self, workflow_id: str, resume: bool = True) -> Dict[str, Any]:
+        """execute_workflow() without blocking the event loop"""
+        return await asyncio.get_running_loop().run_in_executor(None, self.execute_workflow, workflow_id, resume)
+
+    def _report(self, steps: List[WorkflowStep], wall_seconds: float) -> Dict[str, Any]:
+        step_seconds = sum(step.duration for step in steps)
+        return {
+            "wall_seconds": round(wall_seconds, 6),
+            "step_seconds": round(step_seconds, 6),
+            "parallelism": round(step_seconds / wall_seconds, 2) if wall_seconds else 0.0,
+            "critical_path": critical_path(steps),
+            "cache_hits": sum(1 for step in steps if step.cached),
+            "steps": {
+                step.name: {
+                    "status": step.status.value,
+                    "seconds": round(step.duration, 6),
+                    "cached": step.cached,
+                    "error": step.error
+                }
+                for step in steps
+            },
+        }
+
+    def get_report(self, workflow_id: str) -> Optional[Dict[str, Any]]:
+        """Timings of the last run: wall time, summed step time, critical path"""
+        return self.reports.get(workflow_id)
+
+
+async def _await(awaitable):
+    return await awaitable
@@ -0,0 +1,385 @@
+"""
+Unit Tests for MessageBus
+Bounded history, per-event indexes, the segment log and transport delivery
+"""
+
+import asyncio
+import tempfile
+import threading
+import time
+import unittest
+
+from agents.base.message_bus import AsyncMessageBus, BackpressureError, MessageBus
+from agents.base.transports import InMemoryTransport
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+class TestMessageBusHistory(unittest.TestCase):
+    """Test in-memory history"""
+
+    def test_history_is_bounded(self):
+        """Test the ring keeps only the newest messages"""
+        bus = MessageBus(history_size=10)
+        for i in range(25):
+            bus.publish("tick", {"id": i})
+        self.assertEqual([m["id"] for m in bus.message_history], list(range(15, 25)))
+        self.assertEqual(len(bus.get_message_history(limit=100)), 10)
+
+    def test_history_by_event_type(self):
+        """Test filtering uses the event index"""
+        bus = MessageBus(history_size=100)
+        for i in range(30):
+            bus.publish("even" if i % 2 == 0 else "odd", {"id": i})
+        history = bus.get_message_history("odd", limit=3)
+        self.assertEqual([m["id"] for m in history], [25, 27, 29])
+        self.assertEqual(bus.get_message_history("missing"), [])
+
+    def test_retention_expires_messages(self):
+        """Test messages older than retention_seconds leave memory"""
+        bus = MessageBus(history_size=100, retention_seconds=0.05)
+        bus.publish("tick", {"id": 1})
+        time.sleep(0.1)
+        bus.publish("tick", {"id": 2})
+        self.assertEqual([m["id"] for m in bus.get_message_history("tick")], [2])
+
+    def test_subscribers_receive_messages(self):
+        """Test publish still delivers to subscribers"""
+        bus = MessageBus()
+        received = []
+        bus.subscribe("tick", received.append)
+        bus.publish("tick", {"id": 1})
+        self.assertEqual(received[0]["event_type"], "tick")
+
+
+class TestMessageBusSegmentLog(unittest.TestCase):
+    """Test spilling evicted messages to disk"""
+
+    def test_history_reads_past_memory(self):
+        """Test queries continue into the segment log"""
+        with tempfile.TemporaryDirectory() as directory:
+            bus = MessageBus(history_size=5, segment_dir=directory, segment_size=4)
+            for i in range(40):
+                bus.publish("even" if i % 2 == 0 else "odd", {"id": i})
+            self.assertEqual([m["id"] for m in bus.get_message_history(limit=12)], list(range(28, 40)))
+            self.assertEqual([m["id"] for m in bus.get_message_history("even", limit=6)], [28, 30, 32, 34, 36, 38])
+            bus.close()
+
+    def test_log_survives_restart(self):
+        """Test a new bus continues from the segments on disk, including the ring spilled on close"""
+        with tempfile.TemporaryDirectory() as directory:
+            bus = MessageBus(history_size=2, segment_dir=directory, segment_size=3)
+            for i in range(10):
+                bus.publish("tick", {"id": i})
+            bus.close()
+            reopened = MessageBus(history_size=2, segment_dir=directory, segment_size=3)
+            self.assertEqual([m["id"] for m in reopened.message_history], [8, 9])
+            self.assertEqual([m["id"] for m in reopened.get_message_history(limit=3)], [7, 8, 9])
+
+    def test_restarts_keep_every_message_once(self):
+        """Test repeated close/reopen neither loses nor duplicates history"""
+        with tempfile.TemporaryDirectory() as directory:
+            published = 0
+            for _ in range(3):
+                bus = MessageBus(history_size=20, segment_dir=directory, segment_size=7)
+                for _ in range(50):
+                    bus.publish("even" if published % 2 == 0 else "odd", {"id": published})
+                    published += 1
+                bus.close()
+            reopened = MessageBus(history_size=20, segment_dir=directory, segment_size=7)
+            self.assertEqual([m["id"] for m in reopened.get_message_history(limit=1000)], list(range(150)))
+            self.assertEqual([m["id"] for m in reopened.get_message_history("odd", limit=3)], [145, 147, 149])
+            reopened.publish("even", {"id": 150})
+            self.assertEqual([m["id"] for m in reopened.get_message_history(limit=3)], [148, 149, 150])
+            reopened.close()
+
+    def test_old_segments_are_dropped(self):
+        """Test max_segments bounds disk use"""
+        with tempfile.TemporaryDirectory() as directory:
+            bus = MessageBus(history_size=1, segment_dir=directory, segment_size=2, max_segments=2)
+            for i in range(20):
+                bus.publish("tick", {"id": i})
+            self.assertEqual([m["id"] for m in bus.get_message_history(limit=100)], [16, 17, 18, 19])
+            bus.close()
+
+
+class TestAsyncMessageBus(unittest.IsolatedAsyncioTestCase):
+    """Test concurrent delivery and backpressure"""
+
+    async def test_slow_subscriber_does_not_block_others(self):
+        """Test each subscriber drains its own queue"""
+        bus = AsyncMessageBus()
+        release = asyncio.Event()
+        fast = []
+
+        async def slow(message):
+            await release.wait()
+
+        bus.subscribe("tick", slow, name="slow")
+        bus.subscribe("tick", fast.append, name="fast")
+        for i in range(5):
+            await bus.publish("tick", {"id": i})
+        await asyncio.sleep(0.05)
+        self.assertEqual([m["id"] for m in fast], list(range(5)))
+        stats = bus.stats()
+        self.assertEqual(stats["fast"]["delivered"], 5)
+        self.assertEqual(stats["slow"]["depth"], 4)
+        self.assertGreater(stats["slow"]["lag_seconds"], 0)
+        release.set()
+        await bus.stop()
+        self.assertEqual(bus.stats()["slow"]["delivered"], 5)
+
+    async def test_drop_oldest(self):
+        """Test a full drop_oldest queue keeps the newest messages"""
+        bus = AsyncMessageBus(max_queue=2, policy="drop_oldest")
+        gate = asyncio.Event()
+        received = []
+
+        async def consumer(message):
+            await gate.wait()
+            received.append(message["id"])
+
+        bus.subscribe("tick", consumer, name="consumer")
+        await bus.start()
+        for i in range(6):
+            await bus.publish("tick", {"id": i})
+            await asyncio.sleep(0)
+        gate.set()
+        await bus.stop()
+        self.assertEqual(received, [0, 4, 5])
+        self.assertEqual(bus.stats()["consumer"]["dropped"], 3)
+
+    async def test_reject(self):
+        """Test a full reject queue refuses the publish"""
+        bus = AsyncMessageBus(max_queue=1, policy="reject")
+        gate = threading.Event()
+        bus.subscribe("tick", lambda message: gate.wait(), name="consumer")
+        await bus.publish("tick", {"id": 1})
+        await asyncio.sleep(0.05)
+        await bus.publish("tick", {"id": 2})
+        with self.assertRaises(BackpressureError):
+            await bus.publish("tick", {"id": 3})
+        self.assertEqual(len(bus.get_message_history("tick")), 2)
+        gate.set()
+        await bus.stop()
+        self.assertEqual(bus.stats()["consumer"]["rejected"], 1)
+
+    async def test_block(self):
+        """Test a full block queue makes publish wait for the subscriber"""
+        bus = AsyncMessageBus(max_queue=1, policy="block")
+        gate = asyncio.Event()
+
+        async def consumer(message):
+            await gate.wait()
+
+        bus.subscribe("tick", consumer, name="consumer")
+        await bus.publish("tick", {"id": 1})
+        await asyncio.sleep(0)
+        await bus.publish("tick", {"id": 2})
+        blocked = asyncio.create_task(bus.publish("tick", {"id": 3}))
+        await asyncio.sleep(0.05)
+        self.assertFalse(blocked.done())
+        gate.set()
+        await blocked
+        await bus.stop()
+        self.assertEqual(bus.stats()["consumer"]["delivered"], 3)
+
+
+class TestMessageBusTransport(unittest.TestCase):
+    """Test cross-process delivery through a transport"""
+
+    def test_group_shares_messages(self):
+        """Test consumers in one group split the messages, each handled once"""
+        transport = InMemoryTransport()
+        received = []
+        nodes = [MessageBus(transport=transport, group="legal", consumer=f"node-{i}") for i in range(2)]
+        for node in nodes:
+            node.subscribe("contract", lambda message: received.append(message["id"]))
+        for i in range(50):
+            nodes[0].publish("contract", {"id": i})
+        self.assertTrue(wait_until(lambda: len(received) == 50))
+        time.sleep(0.05)
+        self.assertEqual(sorted(received), list(range(50)))
+        self.assertEqual(transport.pending("legal"), 0)
+        for node in nodes:
+            node.stop()
+
+    def test_every_group_receives(self):
+        """Test each consumer group gets every message"""
+        transport = InMemoryTransport()
+        legal, marketing = [], []
+        legal_bus = MessageBus(transport=transport, group="legal")
+        marketing_bus = MessageBus(transport=transport, group="marketing")
+        legal_bus.subscribe("launch", legal.append)
+        marketing_bus.subscribe("launch", marketing.append)
+        MessageBus(transport=transport).publish("launch", {"id": 1})
+        self.assertTrue(wait_until(lambda: len(legal) == 1 and len(marketing) == 1))
+        legal_bus.stop()
+        marketing_bus.stop()
+
+    def test_buses_fan_out_by_default(self):
+        """Test buses without a group each get every message, like in-process subscribers"""
+        transport = InMemoryTransport()
+        received = {"a": [], "b": []}
+        buses = {name: MessageBus(transport=transport) for name in received}
+        for name, bus in buses.items():
+            bus.subscribe("launch", lambda message, name=name: received[name].append(message["id"]))
+        producer = MessageBus(transport=transport)
+        for i in range(5):
+            producer.publish("launch", {"id": i})
+        self.assertTrue(wait_until(lambda: all(len(ids) == 5 for ids in received.values())))
+        self.assertEqual(received, {"a": list(range(5)), "b": list(range(5))})
+        for bus in buses.values():
+            bus.stop()
+
+    def test_publish_dispatches_locally(self):
+        """Test publish calls this bus's subscribers synchronously, once, and still reaches other buses"""
+        transport = InMemoryTransport()
+        local, remote = [], []
+        bus = MessageBus(transport=transport)
+        other = MessageBus(transport=transport)
+        bus.subscribe("contract", local.append)
+        other.subscribe("contract", remote.append)
+        bus.publish("contract", {"id": 1})
+        self.assertEqual([m["id"] for m in local], [1])
+        self.assertTrue(wait_until(lambda: len(remote) == 1 and transport.pending(bus.group) == 0))
+        time.sleep(0.05)
+        self.assertEqual(len(local), 1)
+        bus.stop()
+        other.stop()
+
+    def test_stop_drops_own_group(self):
+        """Test a bus's own group is removed on stop, but a shared group is kept"""
+        transport = InMemoryTransport()
+        own = MessageBus(transport=transport)
+        shared = MessageBus(transport=transport, group="legal")
+        own.subscribe("contract", lambda message: None)
+        shared.subscribe("contract", lambda message: None)
+        self.assertEqual(sorted(transport.groups("contract")), sorted([own.group, "legal"]))
+        own.stop()
+        shared.stop()
+        self.assertEqual(transport.groups("contract"), ["legal"])
+
+    def test_failed_delivery_is_retried(self):
+        """Test an unacknowledged message is redelivered (at-least-once)"""
+        transport = InMemoryTransport(claim_after=0.05)
+        attempts = []
+
+        def flaky(message):
+            attempts.append(message["id"])
+            if len(attempts) == 1:
+                raise RuntimeError("temporary failure")
+
+        bus = MessageBus(transport=transport, group="compliance")
+        bus.subscribe("check", flaky)
+        bus.publish("check", {"id": 7})
+        self.assertTrue(wait_until(lambda: len(attempts) == 2))
+        self.assertTrue(wait_until(lambda: transport.pending("compliance") == 0))
+        bus.stop()
+
+    def test_gives_up_after_max_deliveries(self):
+        """Test a message that keeps failing is dropped after max_deliveries"""
+        transport = InMemoryTransport(claim_after=0)
+        attempts = []
+
+        def failing(message):
+            attempts.append(message["id"])
+            raise RuntimeError("permanent failure")
+
+        bus = MessageBus(transport=transport, group="compliance", max_deliveries=3)
+        bus.subscribe("check", failing)
+        bus.publish("check", {"id": 1})
+        self.assertTrue(wait_until(lambda: transport.pending("compliance") == 0))
+        bus.stop()
+        self.assertEqual(attempts, [1, 1, 1])
+
+
+class TestAsyncMessageBusTransport(unittest.IsolatedAsyncioTestCase):
+    """Test AsyncMessageBus over a transport"""
+
+    async def test_delivers_through_transport(self):
+        """Test messages published on one bus reach another bus's subscribers"""
+        transport = InMemoryTransport()
+        received = []
+
+        async def handler(message):
+            received.append(message["id"])
+
+        consumer = AsyncMessageBus(transport=transport, group="marketing")
+        consumer.subscribe("campaign", handler, name="handler")
+        await consumer.start()
+        producer = AsyncMessageBus(transport=transport, group="producer")
+        for i in range(10):
+            await producer.publish("campaign", {"id": i})
+        for _ in range(200):
+            if len(received) == 10 and transport.pending("marketing") == 0:
+                break
+            await asyncio.sleep(0.01)
+        self.assertEqual(received, list(range(10)))
+        self.assertEqual(transport.pending("marketing"), 0)
+        await consumer.stop()
+        await producer.stop()
+
+    async def test_publish_queues_locally(self):
+        """Test a bus without a group queues for its own subscribers on publish, including backpressure"""
+        transport = InMemoryTransport()
+        release = asyncio.Event()
+        received = []
+
+        async def handler(message):
+            await release.wait()
+            received.append(message["id"])
+
+        bus = AsyncMessageBus(transport=transport, max_queue=1, policy="reject")
+        bus.subscribe("campaign", handler, name="handler")
+        await bus.publish("campaign", {"id": 1})
+        await asyncio.sleep(0.01)
+        await bus.publish("campaign", {"id": 2})
+        with self.assertRaises(BackpressureError):
+            await bus.publish("campaign", {"id": 3})
+        release.set()
+        await bus.drain()
+        for _ in range(200):
+            if transport.pending(bus.group) == 0:
+                break
+            await asyncio.sleep(0.01)
+        self.assertEqual(received, [1, 2])
+        self.assertEqual(transport.pending(bus.group), 0)
+        await bus.stop()
+
+    async def test_failed_ack_is_logged(self):
+        """Test an acknowledgement that raises is logged and the delivery stays pending"""
+
+        class FailingAckTransport(InMemoryTransport):
+            def ack(self, group, deliveries):
+                raise ConnectionError("transport down")
+
+        transport = FailingAckTransport()
+        bus = AsyncMessageBus(transport=transport, group="audit")
+        received = []
+        bus.subscribe("entry", received.append, name="recorder")
+        with self.assertLogs("message_bus", "ERROR") as logs:
+            await bus.publish("entry", {"id": 1})
+            for _ in range(200):
+                if any("Failed to acknowledge" in line for line in logs.output):
+                    break
+                await asyncio.sleep(0.01)
+            await bus.stop()
+        self.assertEqual([m["id"] for m in received], [1])
+        self.assertTrue(any("transport down" in line for line in logs.output))
+        self.assertEqual(transport.pending("audit"), 1)
+
+    async def test_stop_without_start(self):
+        """Test stopping a bus that never started is a no-op"""
+        bus = AsyncMessageBus(transport=InMemoryTransport())
+        bus.subscribe("entry", lambda message: None)
+        await bus.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,303 @@
+"""
+Unit Tests for WorkflowEngine
+DAG scheduling, upstream results and critical path reporting
+"""
+
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+
+from agents.base.checkpoints import SQLiteCheckpointStore, step_key
+from agents.base.workflow import WorkflowEngine, WorkflowStatus, WorkflowStep
+
+
+class TestWorkflowEngine(unittest.TestCase):
+    """Test DAG execution"""
+
+    def setUp(self):
+        self.engine = WorkflowEngine(max_workers=4)
+
+    def test_independent_steps_run_concurrently(self):
+        """Test steps without dependencies between them overlap"""
+        barrier = threading.Barrier(3, timeout=2)
+        steps = [WorkflowStep(f"review_{i}", lambda: barrier.wait() is not None) for i in range(3)]
+        self.engine.create_workflow("review", steps)
+        results = self.engine.execute_workflow("review")
+        self.assertEqual(len(results), 3)
+        self.assertTrue(all(step.status == WorkflowStatus.COMPLETED for step in steps))
+
+    def test_steps_receive_upstream_results(self):
+        """Test a step gets its dependencies' results by name"""
+        steps = [
+            WorkflowStep("extract", lambda: "clauses"),
+            WorkflowStep("summarize", lambda: "summary"),
+            WorkflowStep("report", lambda upstream: f"{upstream['extract']}+{upstream['summarize']}",
+                         dependencies=["extract", "summarize"]),
+        ]
+        self.engine.create_workflow("doc", steps)
+        self.assertEqual(self.engine.execute_workflow("doc")["report"], "clauses+summary")
+
+    def test_optional_parameters_are_not_given_upstream(self):
+        """Test actions whose parameters all have defaults are called without arguments"""
+        def fetch(limit=10, verbose=False):
+            return limit
+
+        steps = [
+            WorkflowStep("seed", lambda: "seed"),
+            WorkflowStep("fetch", fetch, dependencies=["seed"]),
+            WorkflowStep("variadic", lambda *args: args, dependencies=["seed"]),
+            WorkflowStep("explicit", lambda *args: args[0]["seed"], dependencies=["seed"], pass_upstream=True),
+        ]
+        self.engine.create_workflow("defaults", steps)
+        results = self.engine.execute_workflow("defaults")
+        self.assertEqual(results["fetch"], 10)
+        self.assertEqual(results["variadic"], ())
+        self.assertEqual(results["explicit"], "seed")
+
+    def test_pass_upstream_false_overrides_signature(self):
+        """Test pass_upstream=False calls an action with a required parameter without arguments"""
+        step = WorkflowStep("count", lambda items: len(items), pass_upstream=False)
+        self.assertFalse(step.takes_upstream)
+
+    def test_critical_path(self):
+        """Test the report names the longest dependency chain"""
+        def sleeper(seconds):
+            return lambda *args: time.sleep(seconds)
+
+        steps = [
+            WorkflowStep("a", sleeper(0.05)),
+            WorkflowStep("b", sleeper(0.2), dependencies=["a"]),
+            WorkflowStep("c", sleeper(0.05), dependencies=["a"]),
+            WorkflowStep("d", sleeper(0.05), dependencies=["b", "c"]),
+        ]
+        self.engine.create_workflow("dag", steps)
+        self.engine.execute_workflow("dag")
+        report = self.engine.get_report("dag")
+        self.assertEqual(report["critical_path"]["steps"], ["a", "b", "d"])
+        self.assertGreater(report["step_seconds"], report["critical_path"]["seconds"])
+        self.assertLess(report["wall_seconds"], report["step_seconds"])
+
+    def test_failure_cancels_downstream(self):
+        """Test dependents of a failed step never run"""
+        ran = []
+        steps = [
+            WorkflowStep("fetch", lambda: 1 / 0),
+            WorkflowStep("analyze", lambda upstream: ran.append("analyze"), dependencies=["fetch"]),
+        ]
+        self.engine.create_workflow("broken", steps)
+        self.assertEqual(self.engine.execute_workflow("broken"), {})
+        self.assertEqual(steps[0].status, WorkflowStatus.FAILED)
+        self.assertEqual(steps[1].status, WorkflowStatus.CANCELLED)
+        self.assertEqual(ran, [])
+
+    def test_invalid_graphs_are_rejected(self):
+        """Test unknown dependencies and cycles raise ValueError"""
+        with self.assertRaises(ValueError):
+            self.engine.create_workflow("unknown", [WorkflowStep("a", lambda: 1, dependencies=["missing"])])
+        with self.assertRaises(ValueError):
+            self.engine.create_workflow("cycle", [
+                WorkflowStep("a", lambda: 1, dependencies=["b"]),
+                WorkflowStep("b", lambda: 1, dependencies=["a"]),
+            ])
+
+    def test_coroutine_steps(self):
+        """Test async actions are awaited"""
+        async def fetch():
+            return "fetched"
+
+        self.engine.create_workflow("async", [WorkflowStep("fetch", fetch)])
+        self.assertEqual(self.engine.execute_workflow("async"), {"fetch": "fetched"})
+
+
+class TestWorkflowCheckpoints(unittest.TestCase):
+    """Test resumable runs and the memo cache"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = SQLiteCheckpointStore(os.path.join(self.directory.name, "checkpoints.sqlite3"))
+        self.engine = WorkflowEngine(checkpoint_store=self.store)
+
+    def tearDown(self):
+        self.store.close()
+        self.directory.cleanup()
+
+    def test_resume_skips_completed_steps(self):
+        """Test a re-run after a failure only runs what didn't succeed"""
+        calls = []
+        broken = [True]
+
+        def query():
+            calls.append("query")
+            return "context"
+
+        def generate(upstream):
+            calls.append("generate")
+            if broken[0]:
+                raise RuntimeError("model timeout")
+            return upstream["query"] + " -> draft"
+
+        steps = [WorkflowStep("query", query), WorkflowStep("generate", generate, dependencies=["query"])]
+        self.engine.create_workflow("draft", steps)
+        self.assertEqual(self.engine.execute_workflow("draft"), {"query": "context"})
+        broken[0] = False
+        results = self.engine.execute_workflow("draft")
+        self.assertEqual(results["generate"], "context -> draft")
+        self.assertEqual(calls, ["query", "generate", "generate"])
+        self.assertTrue(self.engine.get_report("draft")["steps"]["query"]["cached"])
+
+    def test_completed_run_starts_fresh(self):
+        """Test a finished run is not replayed by the next run"""
+        calls = []
+        self.engine.create_workflow("daily", [WorkflowStep("fetch", lambda: calls.append(1))])
+        self.engine.execute_workflow("daily")
+        self.engine.execute_workflow("daily")
+        self.assertEqual(len(calls), 2)
+
+    def test_cache_key_shared_across_workflows(self):
+        """Test identical steps with a cache_key hit the memo cache"""
+        calls = []
+
+        def rag_query():
+            calls.append(1)
+            return ["clause 4.2"]
+
+        for workflow_id in ("contract_review", "risk_report"):
+            self.engine.create_workflow(workflow_id, [
+                WorkflowStep("context", rag_query, cache_key="rag.liability_clauses:v1"),
+                WorkflowStep("use", lambda upstream: len(upstream["context"]), dependencies=["context"]),
+            ])
+            self.assertEqual(self.engine.execute_workflow(workflow_id)["use"], 1)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(self.engine.get_report("risk_report")["cache_hits"], 1)
+
+    def test_resume_false_recomputes(self):
+        """Test resume=False starts a new run"""
+        calls = []
+        self.engine.create_workflow("flaky", [
+            WorkflowStep("ok", lambda: calls.append(1)),
+            WorkflowStep("fail", lambda upstream: 1 / 0, dependencies=["ok"]),
+        ])
+        self.engine.execute_workflow("flaky")
+        self.engine.execute_workflow("flaky", resume=False)
+        self.assertEqual(len(calls), 2)
+
+    def _rows(self, where: str = "1 = 1") -> int:
+        with sqlite3.connect(self.store.path) as conn:
+            return conn.execute(f"SELECT count(*) FROM workflow_step_results WHERE {where}").fetchone()[0]
+
+    def test_completed_run_deletes_its_checkpoints(self):
+        """Test run-scoped results are removed once the run completes, shared ones stay"""
+        broken = [True]
+
+        def publish(upstream):
+            if broken[0]:
+                raise RuntimeError("channel down")
+            return "sent"
+
+        self.engine.create_workflow("campaign", [
+            WorkflowStep("audience", lambda: ["a@example.com"], cache_key="audience:v1"),
+            WorkflowStep("copy", lambda: "hello"),
+            WorkflowStep("publish", publish, dependencies=["audience", "copy"]),
+        ])
+        self.engine.execute_workflow("campaign")
+        self.assertEqual(self._rows("run_id IS NOT NULL"), 1)
+        broken[0] = False
+        self.engine.execute_workflow("campaign")
+        self.assertEqual(self._rows("run_id IS NOT NULL"), 0)
+        self.assertEqual(self._rows("run_id IS NULL"), 1)
+
+    def test_step_key_needs_canonical_inputs(self):
+        """Test inputs without an exact JSON form get no key instead of a repr-based one"""
+        self.assertEqual(step_key("s", {"a": [1, "x"]}), step_key("s", {"a": [1, "x"]}))
+        self.assertNotEqual(step_key("s", {"a": 1}), step_key("s", {"a": "1"}))
+        self.assertIsNone(step_key("s", {"a": object()}))
+        self.assertIsNone(step_key("s", {"a": {1: "int key"}}))
+        self.assertIsNone(step_key("s", {"a": (1, 2)}))
+        self.assertIsNone(step_key("s", {"a": float("nan")}))
+
+    def test_unhashable_inputs_are_not_memoized(self):
+        """Test a step whose upstream has no canonical form always runs"""
+        calls = []
+
+        class Document:
+            pass
+
+        self.engine.create_workflow("parse", [
+            WorkflowStep("load", lambda: Document()),
+            WorkflowStep("parse", lambda upstream: calls.append(1), dependencies=["load"], cache_key="parse:v1"),
+        ])
+        self.engine.execute_workflow("parse")
+        self.engine.execute_workflow("parse")
+        self.assertEqual(len(calls), 2)
+        self.assertFalse(self.engine.get_report("parse")["steps"]["parse"]["cached"])
+
+    def test_memo_rows_expire(self):
+        """Test shared results older than memo_ttl are recomputed and pruned"""
+        store = SQLiteCheckpointStore(os.path.join(self.directory.name, "ttl.sqlite3"), memo_ttl=0.05)
+        engine = WorkflowEngine(checkpoint_store=store)
+        calls = []
+        engine.create_workflow("lookup", [WorkflowStep("rates", lambda: calls.append(1), cache_key="rates:v1")])
+        engine.execute_workflow("lookup")
+        engine.execute_workflow("lookup")
+        time.sleep(0.1)
+        engine.execute_workflow("lookup")
+        self.assertEqual(len(calls), 2)
+        store.close()
+
+    def test_old_failed_run_is_not_resumed(self):
+        """Test a failed run idle past resume_max_age starts over and its results are dropped"""
+        store = SQLiteCheckpointStore(os.path.join(self.directory.name, "age.sqlite3"), resume_max_age=0.05)
+        engine = WorkflowEngine(checkpoint_store=store)
+        calls = []
+        engine.create_workflow("nightly", [
+            WorkflowStep("extract", lambda: calls.append(1)),
+            WorkflowStep("load", lambda upstream: 1 / 0, dependencies=["extract"]),
+        ])
+        engine.execute_workflow("nightly")
+        first_run = engine.get_report("nightly")["run_id"]
+        time.sleep(0.1)
+        engine.execute_workflow("nightly")
+        self.assertEqual(len(calls), 2)
+        self.assertNotEqual(engine.get_report("nightly")["run_id"], first_run)
+        store.close()
+
+    def test_live_run_is_not_resumed(self):
+        """Test a run still heartbeating elsewhere can't be resumed, a silent one can"""
+        store = SQLiteCheckpointStore(os.path.join(self.directory.name, "live.sqlite3"), heartbeat_seconds=0.05)
+        engine = WorkflowEngine(checkpoint_store=store)
+        engine.create_workflow("sync", [WorkflowStep("pull", lambda: "pulled")])
+        other = store.start_run("sync")
+        with self.assertRaises(RuntimeError):
+            engine.execute_workflow("sync")
+        # resume=False starts a separate run regardless
+        self.assertEqual(engine.execute_workflow("sync", resume=False), {"pull": "pulled"})
+        other = store.start_run("sync", resume=False)
+        time.sleep(0.2)
+        engine.execute_workflow("sync")
+        self.assertEqual(engine.get_report("sync")["run_id"], other)
+        store.close()
+
+    def test_running_run_heartbeats(self):
+        """Test a long step keeps its run live past the heartbeat timeout"""
+        store = SQLiteCheckpointStore(os.path.join(self.directory.name, "beat.sqlite3"), heartbeat_seconds=0.05)
+        engine = WorkflowEngine(checkpoint_store=store)
+        refused = []
+
+        def long_step():
+            time.sleep(0.4)
+            try:
+                store.start_run("long")
+            except RuntimeError:
+                refused.append(True)
+
+        engine.create_workflow("long", [WorkflowStep("train", long_step)])
+        engine.execute_workflow("long")
+        self.assertEqual(refused, [True])
+        store.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,47 +4,121 @@ Authentication and authorization
 
 from fastapi import Depends, HTTPException, Header
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from typing import Optional
-import hmac
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from jose import JWTError, jwt
 import hashlib
 import os
+import threading
+import time
+
+from api.metrics import registry
+from api.signing import HmacVerifier, verify_signature
 
 security = HTTPBearer()
 
+# JWT Configuration
+SECRET_KEY = os.getenv("JWT_SECRET", "your-secret-key-change-in-production")
+ALGORITHM = "HS256"
+
+# Decoded-claims cache size (entries never outlive the token's exp)
+JWT_CACHE_SIZE = int(os.getenv("JWT_CACHE_SIZE", "4096"))
+
+TOKEN_CACHE_LOOKUPS = registry.counter(
+    "hc_jwt_cache_lookups_total",
+    "Decoded JWT cache lookups by result",
+    labels=("result",)
+)
+
 
 def verify_hmac_signature(
     body: bytes,
     signature: str,
     secret: Optional[str] = None
 ) -> bool:
-    """Verify HMAC signature for webhooks"""
-    secret = secret or os.getenv("WEBHOOK_SECRET", "")
-    expected_signature = hmac.new(
-        secret.encode(),
-        body,
-        hashlib.sha256
-    ).hexdigest()
-    return hmac.compare_digest(signature, expected_signature)
+    """Verify HMAC signature for webhooks (X-HC-Signature unless secret is given)"""
+    if secret:
+        return HmacVerifier([secret]).verify(body, signature)
+    return verify_signature("hc", body, signature)
+
+
+class TokenCache:
+    """LRU of decoded JWT claims keyed by token hash, expiring at the token's exp"""
+
+    def __init__(self, max_entries: int = JWT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[bytes, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        key = self._key(token)
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires_at, claims = item
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return claims
+
+    def set(self, token: str, claims: Dict[str, Any]):
+        exp = claims.get("exp")
+        if exp is None:
+            # Tokens without exp are never cached
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (float(exp), claims)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache()
+
+
+def decode_token(token: str) -> Dict[str, Any]:
+    """Verified JWT claims; raises 401 for invalid or expired tokens"""
+    claims = token_cache.get(token)
+    if claims is not None:
+        TOKEN_CACHE_LOOKUPS.inc("hit")
+        return claims
+    TOKEN_CACHE_LOOKUPS.inc("miss")
+    try:
+        claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    if claims.get("sub") is None:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    token_cache.set(token, claims)
+    return claims
 
 
 async def verify_token(
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ) -> dict:
     """Verify JWT token"""
-    token = credentials.credentials
-    # Implement JWT verification here
-    # For now, return a mock user
-    return {"user_id": "system", "role": "admin"}
+    claims = decode_token(credentials.credentials)
+    return {
+        "user_id": claims["sub"],
+        "email": claims.get("email"),
+        "role": claims.get("role"),
+        "exp": claims.get("exp"),
+    }
 
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ) -> dict:
-    """Get current authenticated user"""
+    """Get current authenticated user (from token claims; no database lookup)"""
     return await verify_token(credentials)
-
-
-
-
-
-
@@ -0,0 +1,92 @@
+"""
+Bulk intake benchmark: POST /v1/donations/create vs POST /v1/donations/bulk
+
+Sends the same number of donations through the single-row route (with
+bounded concurrency) and through the bulk route in fixed-size batches, and
+reports donations per second for each:
+
+    python -m api.benchmarks.bench_bulk_intake --donations 5000 --batch-size 500
+"""
+
+from typing import List
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+
+import httpx
+
+from api.benchmarks.common import print_report, summarize
+
+
+def _donations(count: int) -> List[dict]:
+    return [
+        {
+            "chain": random.choice(["solana", "stellar", "bitcoin", "ethereum"]),
+            "token": "USDC",
+            "amount_crypto": round(random.uniform(1, 500), 2),
+            "amount_usd": round(random.uniform(1, 500), 2),
+            "source": "benchmark",
+        }
+        for _ in range(count)
+    ]
+
+
+async def single_rows(client: httpx.AsyncClient, donations: List[dict], concurrency: int, headers: dict) -> List[float]:
+    samples: List[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(donation: dict):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post("/v1/donations/create", json=donation, headers=headers)
+            response.raise_for_status()
+            samples.append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*(one(d) for d in donations))
+    return samples
+
+
+async def bulk_batches(client: httpx.AsyncClient, donations: List[dict], batch_size: int, headers: dict) -> List[float]:
+    samples: List[float] = []
+    bulk_headers = {**headers, "Content-Type": "application/x-ndjson"}
+    for offset in range(0, len(donations), batch_size):
+        body = "\n".join(json.dumps(d) for d in donations[offset:offset + batch_size])
+        start = time.perf_counter()
+        response = await client.post("/v1/donations/bulk", content=body, headers=bulk_headers)
+        response.raise_for_status()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+async def run(args) -> None:
+    headers = {"X-API-Key": args.api_key}
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=120.0) as client:
+        for label, runner in (
+            ("single-row /create", lambda d: single_rows(client, d, args.concurrency, headers)),
+            (f"bulk /bulk x{args.batch_size}", lambda d: bulk_batches(client, d, args.batch_size, headers)),
+        ):
+            donations = _donations(args.donations)
+            start = time.perf_counter()
+            samples = await runner(donations)
+            elapsed = time.perf_counter() - start
+            stats = summarize(samples, elapsed)
+            stats["donations_per_s"] = round(len(donations) / elapsed, 1)
+            print_report(label, stats, args.json)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default=os.getenv("API_BASE_URL", "http://localhost:8000"))
+    parser.add_argument("--donations", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--api-key", default=os.getenv("WC_API_KEY", "changeme"))
+    parser.add_argument("--json", action="store_true", help="Emit JSON lines instead of tables")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
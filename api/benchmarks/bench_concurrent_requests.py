@@ -0,0 +1,79 @@
+"""
+Concurrent load benchmark for the donation API
+
+Fires a fixed number of requests at a running API with bounded concurrency
+and reports p50/p95/p99 latency. Run it once against a build using the sync
+Session and once against the async engine to compare event-loop stalls:
+
+    python -m api.benchmarks.bench_concurrent_requests \\
+        --base-url http://localhost:8000 --concurrency 100 --requests 5000 \\
+        --label async
+
+Mixes invoice creation with lookups so both the write and read paths are
+exercised; lookups reuse invoice ids created earlier in the run.
+"""
+
+from typing import List
+import argparse
+import asyncio
+import os
+import random
+import time
+
+import httpx
+
+from api.benchmarks.common import print_report, summarize
+
+
+def _donation_payload() -> dict:
+    return {
+        "chain": random.choice(["solana", "stellar", "bitcoin", "ethereum"]),
+        "token": "USDC",
+        "amount_crypto": round(random.uniform(1, 500), 2),
+        "amount_usd": round(random.uniform(1, 500), 2),
+        "earmark": "general",
+        "source": "benchmark",
+    }
+
+
+async def run(base_url: str, total: int, concurrency: int, read_ratio: float, api_key: str) -> List[float]:
+    samples: List[float] = []
+    invoice_ids: List[str] = []
+    semaphore = asyncio.Semaphore(concurrency)
+    headers = {"X-API-Key": api_key}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+        async def one_request():
+            async with semaphore:
+                start = time.perf_counter()
+                if invoice_ids and random.random() < read_ratio:
+                    response = await client.get(f"/v1/donations/{random.choice(invoice_ids)}")
+                else:
+                    response = await client.post("/v1/donations/create", json=_donation_payload(), headers=headers)
+                    if response.status_code == 200:
+                        invoice_ids.append(response.json()["invoice_id"])
+                samples.append((time.perf_counter() - start) * 1000)
+
+        await asyncio.gather(*(one_request() for _ in range(total)))
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default=os.getenv("API_BASE_URL", "http://localhost:8000"))
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--read-ratio", type=float, default=0.7)
+    parser.add_argument("--api-key", default=os.getenv("WC_API_KEY", "changeme"))
+    parser.add_argument("--label", default="run")
+    parser.add_argument("--json", action="store_true", help="Emit one JSON line instead of a table")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    samples = asyncio.run(run(args.base_url, args.requests, args.concurrency, args.read_ratio, args.api_key))
+    print_report(args.label, summarize(samples, time.perf_counter() - start), args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Invoice lookup benchmark: metadata->>'invoice_id' vs indexed invoice_id
+
+Loads a scratch copy of the donations lookup columns (default 1M rows) and
+times random point lookups through the old JSON predicate and through the
+indexed invoice_id column:
+
+    python -m api.benchmarks.bench_invoice_lookup --rows 1000000 --lookups 200
+
+The scratch table is dropped afterwards unless --keep is passed.
+"""
+
+from typing import List
+import argparse
+import random
+import time
+
+from sqlalchemy import text
+
+from api.benchmarks.common import print_report, summarize
+from api.database import engine
+
+TABLE = "bench_donations_invoice_lookup"
+
+
+def load(conn, rows: int):
+    conn.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+    conn.execute(text(f"""
+        CREATE UNLOGGED TABLE {TABLE} (
+            id bigint PRIMARY KEY,
+            invoice_id text,
+            status text NOT NULL DEFAULT 'created',
+            metadata jsonb DEFAULT '{{}}'::jsonb
+        )
+    """))
+    conn.execute(text(f"""
+        INSERT INTO {TABLE} (id, invoice_id, metadata)
+        SELECT g, 'INV-' || lpad(g::text, 12, '0'),
+               jsonb_build_object('source', 'api', 'invoice_id', 'INV-' || lpad(g::text, 12, '0'))
+        FROM generate_series(1, :rows) AS g
+    """), {"rows": rows})
+    conn.execute(text(f"CREATE UNIQUE INDEX ON {TABLE}(invoice_id)"))
+    conn.execute(text(f"ANALYZE {TABLE}"))
+
+
+def time_lookups(conn, predicate: str, invoice_ids: List[str]) -> List[float]:
+    statement = text(f"SELECT id, status FROM {TABLE} WHERE {predicate} = :invoice_id")
+    samples = []
+    for invoice_id in invoice_ids:
+        start = time.perf_counter()
+        conn.execute(statement, {"invoice_id": invoice_id}).fetchone()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--lookups", type=int, default=200)
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch table")
+    parser.add_argument("--json", action="store_true", help="Emit JSON lines instead of tables")
+    args = parser.parse_args()
+
+    invoice_ids = [f"INV-{random.randint(1, args.rows):012d}" for _ in range(args.lookups)]
+
+    with engine.begin() as conn:
+        load(conn, args.rows)
+    try:
+        with engine.connect() as conn:
+            for label, predicate in (
+                ("metadata->>'invoice_id' (seq scan)", "metadata->>'invoice_id'"),
+                ("invoice_id column (index)", "invoice_id"),
+            ):
+                start = time.perf_counter()
+                samples = time_lookups(conn, predicate, invoice_ids)
+                print_report(f"{label} @ {args.rows} rows", summarize(samples, time.perf_counter() - start), args.json)
+    finally:
+        if not args.keep:
+            with engine.begin() as conn:
+                conn.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+
+
+if __name__ == "__main__":
+    main()
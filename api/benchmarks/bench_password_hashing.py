@@ -0,0 +1,104 @@
+"""
+Password hashing benchmark: bcrypt cost vs latency and pool throughput
+
+Times single bcrypt hashes at a range of cost factors, reports the highest
+cost that stays under a latency target, then drives the shared hashing
+pool with concurrent verifies to show throughput and 429 shedding:
+
+    python -m api.benchmarks.bench_password_hashing --target-ms 250 --concurrency 64
+
+Exits non-zero when the configured BCRYPT_ROUNDS exceeds the target, so it
+can gate a deployment on new hardware.
+"""
+
+from typing import Dict, List
+import argparse
+import asyncio
+import sys
+import time
+
+from api.benchmarks.common import print_report, summarize
+from api.services.passwords import (
+    BCRYPT_ROUNDS,
+    PasswordHasher,
+    PasswordHasherSaturated,
+    build_context,
+)
+
+PASSWORD = "correct horse battery staple"
+
+
+def time_cost(rounds: int, samples: int) -> List[float]:
+    context = build_context(rounds)
+    durations = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        context.hash(PASSWORD)
+        durations.append((time.perf_counter() - start) * 1000)
+    return durations
+
+
+async def drive_pool(rounds: int, concurrency: int, total: int) -> Dict[str, float]:
+    context = build_context(rounds)
+    hasher = PasswordHasher(context=context)
+    password_hash = context.hash(PASSWORD)
+    samples: List[float] = []
+    rejected = 0
+
+    async def one():
+        nonlocal rejected
+        start = time.perf_counter()
+        try:
+            await hasher.verify_and_update(PASSWORD, password_hash)
+            samples.append((time.perf_counter() - start) * 1000)
+        except PasswordHasherSaturated:
+            rejected += 1
+
+    start = time.perf_counter()
+    for offset in range(0, total, concurrency):
+        await asyncio.gather(*(one() for _ in range(min(concurrency, total - offset))))
+    elapsed = time.perf_counter() - start
+    hasher.shutdown()
+    return {**summarize(samples, elapsed), "rejected_429": rejected}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--min-rounds", type=int, default=10)
+    parser.add_argument("--max-rounds", type=int, default=14)
+    parser.add_argument("--samples", type=int, default=3)
+    parser.add_argument("--target-ms", type=float, default=250.0, help="Latency budget for one hash")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=128)
+    parser.add_argument("--json", action="store_true", help="Emit JSON lines instead of tables")
+    args = parser.parse_args()
+
+    recommended = None
+    configured_ms = None
+    for rounds in range(args.min_rounds, args.max_rounds + 1):
+        durations = time_cost(rounds, args.samples)
+        stats = summarize(durations, sum(durations) / 1000)
+        print_report(f"bcrypt cost {rounds}", stats, args.json)
+        if stats["p50_ms"] <= args.target_ms:
+            recommended = rounds
+        if rounds == BCRYPT_ROUNDS:
+            configured_ms = stats["p50_ms"]
+
+    print_report(
+        f"hashing pool @ cost {BCRYPT_ROUNDS}, concurrency {args.concurrency}",
+        asyncio.run(drive_pool(BCRYPT_ROUNDS, args.concurrency, args.requests)),
+        args.json
+    )
+    print_report("recommendation", {
+        "configured_rounds": BCRYPT_ROUNDS,
+        "configured_p50_ms": configured_ms if configured_ms is not None else "not measured",
+        "target_ms": args.target_ms,
+        "recommended_rounds": recommended if recommended is not None else "none under target",
+    }, args.json)
+
+    if configured_ms is not None and configured_ms > args.target_ms:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
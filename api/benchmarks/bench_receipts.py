@@ -0,0 +1,97 @@
+"""
+Receipt engine benchmark: receipts per second
+
+Renders synthetic receipts through the compiled template and writes them
+to a scratch directory, first in-process and then across a process pool
+(no database or object storage involved):
+
+    python -m api.benchmarks.bench_receipts --receipts 20000 --processes 8
+
+Pass --keep to leave the PDFs in --directory for inspection.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import List
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import uuid
+
+from api.benchmarks.common import print_report
+from api.workers.receipts import LocalReceiptStore, get_template, receipt_fields, receipt_key
+
+
+def synthetic_rows(count: int) -> List[SimpleNamespace]:
+    created_at = datetime(2025, 12, 31, tzinfo=timezone.utc)
+    return [
+        SimpleNamespace(
+            id=uuid.uuid4(), invoice_id=f"INV-{index:012d}", created_at=created_at,
+            donor_name=f"Donor {index}", anonymous=index % 10 == 0, amount_usd=25.0 + index % 500,
+            amount_crypto=0.01 * (index % 97 + 1), token="USDC", chain="solana",
+            txid=uuid.uuid4().hex * 2, earmark="general",
+        )
+        for index in range(count)
+    ]
+
+
+def render_rows(directory: str, rows: List[SimpleNamespace]) -> int:
+    template = get_template()
+    store = LocalReceiptStore(directory)
+    total = 0
+    for row in rows:
+        size, _ = store.put(receipt_key(row), template.render(receipt_fields(row)))
+        total += size
+    return total
+
+
+def render_only(rows: List[SimpleNamespace]) -> int:
+    template = get_template()
+    return sum(len(chunk) for row in rows for chunk in template.render(receipt_fields(row)))
+
+
+def report(label: str, count: int, total_bytes: int, elapsed: float, as_json: bool):
+    print_report(label, {
+        "receipts": count,
+        "elapsed_s": round(elapsed, 3),
+        "receipts_per_s": round(count / elapsed, 1) if elapsed else 0.0,
+        "avg_bytes": round(total_bytes / count) if count else 0,
+    }, as_json)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--receipts", type=int, default=20000)
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk", type=int, default=500)
+    parser.add_argument("--directory", default=None, help="Output directory (default: a temp dir)")
+    parser.add_argument("--keep", action="store_true", help="Keep the rendered PDFs")
+    parser.add_argument("--json", action="store_true", help="Emit JSON lines instead of tables")
+    args = parser.parse_args()
+
+    rows = synthetic_rows(args.receipts)
+    directory = args.directory or tempfile.mkdtemp(prefix="bench-receipts-")
+    try:
+        start = time.perf_counter()
+        total = render_only(rows)
+        report("template render only", len(rows), total, time.perf_counter() - start, args.json)
+
+        start = time.perf_counter()
+        total = render_rows(os.path.join(directory, "serial"), rows)
+        report("render + write, 1 process", len(rows), total, time.perf_counter() - start, args.json)
+
+        chunks = [rows[offset:offset + args.chunk] for offset in range(0, len(rows), args.chunk)]
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=args.processes) as pool:
+            total = sum(pool.map(render_rows, [os.path.join(directory, "pool")] * len(chunks), chunks))
+        report(f"render + write, {args.processes} processes", len(rows), total, time.perf_counter() - start, args.json)
+    finally:
+        if not args.keep and not args.directory:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Sweep plan simulator: naive vs batched
+
+Generates synthetic receiving wallets (and optional pending sweep
+operations) across chains, plans them one-transaction-per-transfer and
+with the batched planner, and compares transaction counts, fees per chain
+and time to settle:
+
+    python -m api.benchmarks.bench_sweep_plans --wallets 2000 --operations 200
+
+No database or network access; the planner is pure.
+"""
+
+from decimal import Decimal
+import argparse
+import json
+import random
+import uuid
+
+from api.workers.sweeps import FEE_MODELS, collect_transfers, plan_naive, plan_sweeps, simulate
+
+
+def synthetic_inputs(wallet_count: int, operation_count: int, seed: int):
+    rng = random.Random(seed)
+    chains = sorted(FEE_MODELS)
+    destinations = {
+        chain: {"id": str(uuid.uuid4()), "chain": chain, "address": f"cold-{chain}",
+                "wallet_type": "cold", "balance_crypto": 0, "active": True}
+        for chain in chains
+    }
+    wallets = list(destinations.values())
+    for index in range(wallet_count):
+        chain = rng.choice(chains)
+        # Log-uniform balances: many small deposits, a few large ones
+        balance = Decimal(str(round(10 ** rng.uniform(-5, 1), 8)))
+        wallets.append({"id": str(uuid.uuid4()), "chain": chain, "address": f"{chain}-{index}",
+                        "wallet_type": "public", "balance_crypto": balance, "active": True})
+    sources = [w for w in wallets if w["wallet_type"] == "public"]
+    operations = []
+    for _ in range(operation_count):
+        source = rng.choice(sources)
+        operations.append({"id": str(uuid.uuid4()), "from_wallet_id": source["id"], "to_wallet_id": None,
+                           "amount_crypto": source["balance_crypto"] / 2})
+    return wallets, operations, destinations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--wallets", type=int, default=2000)
+    parser.add_argument("--operations", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", action="store_true", help="Emit JSON lines instead of tables")
+    args = parser.parse_args()
+
+    transfers = collect_transfers(*synthetic_inputs(args.wallets, args.operations, args.seed))
+    results = {
+        "naive": simulate(plan_naive(transfers)),
+        "batched": simulate(plan_sweeps(transfers)),
+    }
+    if args.json:
+        for label, result in results.items():
+            print(json.dumps({"label": label, **result}))
+        return
+
+    print(f"{len(transfers)} transfers")
+    print(f"{'chain':<10} {'plan':<8} {'txs':>6} {'transfers':>10} {'fee':>14} {'settle_s':>9}")
+    for chain in sorted(FEE_MODELS):
+        for label, result in results.items():
+            stats = result["chains"].get(chain)
+            if stats:
+                print(f"{chain:<10} {label:<8} {stats['transactions']:>6} {stats['transfers']:>10} "
+                      f"{stats['fee']:>14} {stats['settle_seconds']:>9}")
+    for label, result in results.items():
+        print(f"{label}: {result['transactions']} transactions, {result['skipped']} skipped, "
+              f"settles in {result['settle_seconds']}s")
+
+
+if __name__ == "__main__":
+    main()
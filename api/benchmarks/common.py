@@ -0,0 +1,40 @@
+"""
+Shared helpers for API benchmarks
+"""
+
+from typing import Dict, List
+import json
+import math
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of samples"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(samples_ms: List[float], elapsed_s: float) -> Dict[str, float]:
+    """Summarize latency samples (milliseconds) for a run"""
+    count = len(samples_ms)
+    return {
+        "requests": count,
+        "elapsed_s": round(elapsed_s, 3),
+        "throughput_rps": round(count / elapsed_s, 1) if elapsed_s else 0.0,
+        "p50_ms": round(percentile(samples_ms, 50), 2),
+        "p95_ms": round(percentile(samples_ms, 95), 2),
+        "p99_ms": round(percentile(samples_ms, 99), 2),
+        "max_ms": round(max(samples_ms), 2) if samples_ms else 0.0,
+    }
+
+
+def print_report(label: str, stats: Dict[str, float], as_json: bool = False):
+    """Print a benchmark summary"""
+    if as_json:
+        print(json.dumps({"label": label, **stats}))
+        return
+    print(f"== {label}")
+    for key, value in stats.items():
+        print(f"  {key:<16} {value}")
@@ -26,6 +26,39 @@ celery_app.conf.update(
     task_track_started=True,
     task_time_limit=30 * 60,  # 30 minutes
     task_soft_time_limit=25 * 60,  # 25 minutes
+    # Ack after the task finishes so a crashed worker's tasks are redelivered;
+    # tasks are idempotent (they only move donations forward from a status)
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    # Long-running batch tasks: don't let one worker hoard queued messages
+    worker_prefetch_multiplier=int(os.getenv("CELERY_PREFETCH_MULTIPLIER", "1")),
+    task_default_queue="default",
+    # One queue per stage so each can be scaled (and rate limited) separately
+    task_routes={
+        "blockchain_confirm_worker": {"queue": "chain"},
+        "dispatch_donation_pipelines": {"queue": "chain"},
+        "compliance_worker": {"queue": "compliance"},
+        "compliance_batch": {"queue": "compliance"},
+        "receipt_worker": {"queue": "receipts"},
+        "receipt_batch": {"queue": "receipts"},
+        "receipt_bulk_worker": {"queue": "receipts"},
+        "nft_worker": {"queue": "nft"},
+        "nft_batch": {"queue": "nft"},
+        "sweep_worker": {"queue": "treasury"},
+        "webhook_consumer_worker": {"queue": "webhooks"},
+    },
+    beat_schedule={
+        # Poll confirmations for pending donations and run the rest of their lifecycle
+        "dispatch-donation-pipelines": {
+            "task": "dispatch_donation_pipelines",
+            "schedule": float(os.getenv("DONATION_PIPELINE_INTERVAL", "30")),
+        },
+        # Drain webhooks accepted by the API (see api/workers/webhook_consumer.py)
+        "drain-webhooks": {
+            "task": "webhook_consumer_worker",
+            "schedule": float(os.getenv("WEBHOOK_DRAIN_INTERVAL", "5")),
+        },
+    },
 )
 
 
@@ -33,3 +66,6 @@ celery_app.conf.update(
 
 
 
+
+# Task metrics signal handlers (publish side and worker side)
+import api.workers.instrumentation  # noqa: E402,F401
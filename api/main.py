@@ -4,6 +4,8 @@ Custom-built API with full control over schema/queries
 """
 
 from fastapi import FastAPI, Depends, HTTPException, Header, Request
+from fastapi.responses import PlainTextResponse
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from contextlib import asynccontextmanager
@@ -11,9 +13,18 @@ import os
 from typing import Optional
 
 from api.routers import donations, wallets, compliance, receipts, admin, webhooks, auth, wix, wix
-from api.database import get_db, init_db
+from api.database import init_db, close_db, cached_db_health, pool_status
 from api.auth import verify_token, get_current_user
-from api.middleware import logging_middleware, error_handler
+from api.metrics import registry
+from api.middleware import timing_middleware, error_handler
+from api.services.donation_events import donation_events
+from api.services.notifications import notification_listener, DONATION_CHANGES_CHANNEL
+from api.services.login_throttle import login_throttle
+from api.services.passwords import password_hasher
+from api.services.qr import qr_service
+from api.services.response_cache import response_cache
+from api.services.task_metrics import task_metrics
+from api.services.wallet_pool import wallet_pool, WALLETS_CHANNEL
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -34,9 +45,12 @@ app.add_middleware(
 )
 
 # Add custom middleware
-app.middleware("http")(logging_middleware)
+app.middleware("http")(timing_middleware)
 app.middleware("http")(error_handler)
 
+# Mirror Celery task metrics recorded by workers into /metrics
+registry.add_collector(task_metrics.collect)
+
 # Include routers
 app.include_router(auth.router, prefix="/v1/auth", tags=["Authentication"])
 app.include_router(donations.router, prefix="/v1/donations", tags=["Donations"])
@@ -54,11 +68,27 @@ async def startup_event():
     """Initialize database on startup"""
     await init_db()
     print("✅ Database initialized")
+    try:
+        await wallet_pool.load()
+    except Exception as e:
+        print(f"⚠️  Wallet pool not loaded: {e}")
+    notification_listener.add_handler(WALLETS_CHANNEL, wallet_pool.handle_notification)
+    notification_listener.add_handler(DONATION_CHANGES_CHANNEL, response_cache.handle_donation_change)
+    notification_listener.add_handler(DONATION_CHANGES_CHANNEL, donation_events.handle_donation_change)
+    # wallets_changed notifications may have been missed while disconnected
+    notification_listener.add_reconnect_handler(wallet_pool.load)
+    await notification_listener.start()
+    login_throttle.start()
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup on shutdown"""
+    await notification_listener.stop()
+    await login_throttle.stop()
+    await close_db()
+    qr_service.shutdown()
+    password_hasher.shutdown()
     print("🛑 Shutting down...")
 
 
@@ -75,17 +105,21 @@ async def root():
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    try:
-        # Check database connection
-        from sqlalchemy import text
-        db = next(get_db())
-        db.execute(text("SELECT 1"))
-        return {
-            "status": "healthy",
-            "database": "connected"
-        }
-    except Exception as e:
-        raise HTTPException(status_code=503, detail=f"Unhealthy: {str(e)}")
+    # Check database connection (cached; see HEALTH_DB_CHECK_INTERVAL)
+    if not await cached_db_health():
+        raise HTTPException(status_code=503, detail="Unhealthy: database unreachable")
+    return {
+        "status": "healthy",
+        "database": "connected",
+        "pool": pool_status()
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics (per-route latency, DB and QR time, Celery tasks)"""
+    # Collectors may block (Celery task metrics are read from Redis)
+    return PlainTextResponse(await run_in_threadpool(registry.render), media_type="text/plain; version=0.0.4")
 
 
 @app.get("/v1/info")
@@ -0,0 +1,297 @@
+"""
+In-process metrics
+Histograms, counters and gauges rendered in Prometheus text format, plus
+per-request DB/QR timing accumulated through a context variable
+"""
+
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+import threading
+import time
+
+# Latency buckets in seconds
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Base class for labelled metrics"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Sequence[str]) -> LabelValues:
+        if len(labels) != len(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}")
+        return tuple(str(v) for v in labels)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    """Monotonic counter"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        super().__init__(name, help_text, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set_total(self, value: float, *labels: str):
+        """Mirror a total kept elsewhere (e.g. counted by another process)"""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def snapshot(self) -> Dict[LabelValues, float]:
+        with self._lock:
+            return dict(self._values)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(Metric):
+    """Point-in-time value"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        super().__init__(name, help_text, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, *labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, k)} {_format_value(v)}" for k, v in items]
+
+
+class Histogram(Metric):
+    """Cumulative bucket histogram"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts..., +Inf count], sum
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, *labels: str):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+                self._sums[key] = 0.0
+            counts[index] += 1
+            self._sums[key] += value
+
+    def snapshot(self) -> Dict[LabelValues, Tuple[List[int], float]]:
+        with self._lock:
+            return {k: (list(c), self._sums[k]) for k, c in self._counts.items()}
+
+    def set_counts(self, counts: Sequence[int], total: float, *labels: str):
+        """Mirror per-bucket counts (non-cumulative, +Inf last) kept elsewhere"""
+        key = self._key(labels)
+        if len(counts) != len(self.buckets) + 1:
+            raise ValueError(f"{self.name} expects {len(self.buckets) + 1} bucket counts")
+        with self._lock:
+            self._counts[key] = list(counts)
+            self._sums[key] = total
+
+    def quantile(self, q: float, *labels: str) -> Optional[float]:
+        """Estimate a quantile by linear interpolation within its bucket"""
+        with self._lock:
+            counts = self._counts.get(self._key(labels))
+            counts = list(counts) if counts else None
+        if not counts or not sum(counts):
+            return None
+        rank = q * sum(counts)
+        cumulative = 0
+        for index, count in enumerate(counts):
+            if count and cumulative + count >= rank:
+                if index == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[index - 1] if index else 0.0
+                return lower + (self.buckets[index] - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+    def render(self) -> List[str]:
+        lines = []
+        for key, (counts, total) in sorted(self.snapshot().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = ("le", _format_value(bound))
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together at /metrics"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric: Metric) -> Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric):
+                    raise ValueError(f"Metric {metric.name} already registered as {existing.kind}")
+                return existing
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labels))
+
+    def gauge(self, name: str, help_text: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, labels))
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, help_text, labels, buckets))
+
+    def add_collector(self, collector: Callable[[], None]):
+        """Register a callback run before each render (e.g. to refresh gauges)"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Prometheus text exposition format"""
+        for collector in self._collectors:
+            collector()
+        lines: List[str] = []
+        for name in sorted(self._metrics):
+            metric = self._metrics[name]
+            samples = metric.render()
+            if samples:
+                lines.extend(metric.header())
+                lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry exposed at /metrics
+registry = MetricsRegistry()
+
+# Per-request accumulated nanoseconds by kind ("db", "qr"); None outside a request
+_request_timings: ContextVar[Optional[Dict[str, int]]] = ContextVar("request_timings", default=None)
+
+
+def start_request_timings() -> Dict[str, int]:
+    """Begin accumulating timings for the current request"""
+    timings: Dict[str, int] = {}
+    _request_timings.set(timings)
+    return timings
+
+
+def record_timing(kind: str, elapsed_ns: int):
+    """Add elapsed time to the current request (no-op outside a request)"""
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[kind] = timings.get(kind, 0) + elapsed_ns
+
+
+@contextmanager
+def timed(kind: str) -> Iterator[None]:
+    """Time a block and add it to the current request's timings"""
+    start = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        record_timing(kind, time.perf_counter_ns() - start)
+
+
+DB_QUERY_SECONDS = registry.histogram(
+    "hc_db_query_duration_seconds",
+    "Database statement execution time"
+)
+
+
+def instrument_engine(sync_engine):
+    """Record statement time for every cursor execute on an engine"""
+    from sqlalchemy import event
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("hc_query_start_ns", []).append(time.perf_counter_ns())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("hc_query_start_ns")
+        if not starts:
+            return
+        elapsed_ns = time.perf_counter_ns() - starts.pop()
+        DB_QUERY_SECONDS.observe(elapsed_ns / 1e9)
+        record_timing("db", elapsed_ns)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _handle_error(exception_context):
+        conn = exception_context.connection
+        if conn is not None:
+            starts = conn.info.get("hc_query_start_ns")
+            if starts:
+                starts.pop()
@@ -1,20 +1,97 @@
 """Custom middleware"""
 from fastapi import Request
+from typing import List, Optional, Union
+import ipaddress
+import os
 import time
 import logging
 
+from api.metrics import registry, start_request_timings
+
 logger = logging.getLogger(__name__)
 
+IPNetwork = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+
+def parse_networks(value: str) -> List[IPNetwork]:
+    """Comma-separated addresses/CIDRs (e.g. "10.0.0.0/8,127.0.0.1")"""
+    return [ipaddress.ip_network(item.strip(), strict=False) for item in value.split(",") if item.strip()]
+
+
+# Reverse proxies whose X-Forwarded-For is trusted (none by default)
+TRUSTED_PROXIES = parse_networks(os.getenv("TRUSTED_PROXIES", ""))
+
+REQUEST_SECONDS = registry.histogram(
+    "hc_http_request_duration_seconds",
+    "HTTP request latency by route",
+    labels=("method", "route", "status")
+)
+REQUEST_DB_SECONDS = registry.histogram(
+    "hc_http_request_db_seconds",
+    "Database time spent per HTTP request",
+    labels=("method", "route")
+)
+REQUEST_QR_SECONDS = registry.histogram(
+    "hc_http_request_qr_seconds",
+    "QR rendering time spent per HTTP request",
+    labels=("method", "route")
+)
+
+
+def _trusted(address: str, trusted: List[IPNetwork]) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in trusted)
+
+
+def client_ip(request: Request, trusted: Optional[List[IPNetwork]] = None) -> Optional[str]:
+    """
+    Client address behind TRUSTED_PROXIES: X-Forwarded-For is read right to
+    left, skipping trusted proxies, and the first other hop is the client.
+    Requests not coming from a trusted proxy use the peer address.
+    """
+    trusted = TRUSTED_PROXIES if trusted is None else trusted
+    peer = request.client.host if request.client else None
+    if peer is None or not _trusted(peer, trusted):
+        return peer
+    hops = [hop.strip() for value in request.headers.getlist("x-forwarded-for") for hop in value.split(",")]
+    hops = [hop for hop in hops if hop]
+    for hop in reversed(hops):
+        if not _trusted(hop, trusted):
+            return hop
+    # Every hop is a trusted proxy: the leftmost one is as close as we get
+    return hops[0] if hops else peer
+
 
-async def logging_middleware(request: Request, call_next):
-    """Log all requests"""
-    start_time = time.time()
-    response = await call_next(request)
-    process_time = time.time() - start_time
-    logger.info(
-        f"{request.method} {request.url.path} - {response.status_code} - {process_time:.3f}s"
-    )
-    return response
+def route_template(request: Request) -> str:
+    """Matched route path (e.g. /v1/donations/{invoice_id}) to bound label cardinality"""
+    route = request.scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+async def timing_middleware(request: Request, call_next):
+    """Record per-route latency, DB time and QR time for every request"""
+    start_ns = time.perf_counter_ns()
+    timings = start_request_timings()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        elapsed = (time.perf_counter_ns() - start_ns) / 1e9
+        db_seconds = timings.get("db", 0) / 1e9
+        qr_seconds = timings.get("qr", 0) / 1e9
+        route = route_template(request)
+        REQUEST_SECONDS.observe(elapsed, request.method, route, str(status))
+        REQUEST_DB_SECONDS.observe(db_seconds, request.method, route)
+        REQUEST_QR_SECONDS.observe(qr_seconds, request.method, route)
+        logger.info(
+            f"{request.method} {request.url.path} - {status} - {elapsed:.3f}s "
+            f"(db {db_seconds:.3f}s, qr {qr_seconds:.3f}s)"
+        )
 
 
 async def error_handler(request: Request, call_next):
@@ -25,9 +102,3 @@ async def error_handler(request: Request, call_next):
     except Exception as e:
         logger.error(f"Error: {str(e)}", exc_info=True)
         raise
-
-
-
-
-
-
@@ -1,6 +1,9 @@
 """Admin API endpoints"""
 from fastapi import APIRouter, Depends
+from fastapi.concurrency import run_in_threadpool
 from api.auth import get_current_user
+from api.services.task_metrics import task_metrics, task_summary
+from api.statements import statements
 router = APIRouter()
 
 @router.get("/ledger")
@@ -8,8 +11,13 @@ async def get_ledger(user: dict = Depends(get_current_user)):
     """Admin-only ledger export"""
     pass
 
+@router.get("/statements")
+async def get_statement_stats(user: dict = Depends(get_current_user)):
+    """Admin: named SQL statement lookup and per-connection use counters"""
+    return statements.stats()
 
-
-
-
-
+@router.get("/tasks")
+async def get_task_stats(user: dict = Depends(get_current_user)):
+    """Admin: per-task queue wait / run time percentiles, payload sizes and retries"""
+    await run_in_threadpool(task_metrics.collect)
+    return task_summary()
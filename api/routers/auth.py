@@ -2,28 +2,81 @@
 Authentication and Login API endpoints
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi import APIRouter, Depends, HTTPException, Header, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel, EmailStr
 from typing import Optional
 from datetime import datetime, timedelta
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+from jose import jwt
+import math
 import os
 
-from api.database import get_db
-from api.auth import verify_token
+from api.database import get_async_db
+from api.auth import ALGORITHM, SECRET_KEY, get_current_user
+from api.middleware import client_ip as get_client_ip
+from api.services.login_throttle import login_throttle
+from api.services.passwords import PasswordHasherSaturated, password_hasher, pwd_context
+from api.services.user_cache import TTLCache
+from api.statements import statements
 
 router = APIRouter()
 security = HTTPBearer()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 # JWT Configuration
-SECRET_KEY = os.getenv("JWT_SECRET", "your-secret-key-change-in-production")
-ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Profiles served by /me (USER_CACHE_TTL seconds, USER_CACHE_MAX_ENTRIES)
+user_cache: "TTLCache[str, UserResponse]" = TTLCache()
+
+SELECT_USER_ID_BY_EMAIL = statements.register(
+    "auth.select_user_id_by_email",
+    "SELECT id FROM users WHERE email = :email"
+)
+
+INSERT_USER = statements.register("auth.insert_user", """
+    INSERT INTO users (
+        id, email, display_name, role, created_at, updated_at,
+        "_id", "_createdDate", "_updatedDate", "_owner"
+    ) VALUES (
+        :id, :email, :display_name, :role, NOW(), NOW(),
+        :_id, NOW(), NOW(), 'system'
+    )
+    RETURNING id, email, display_name, role, created_at
+""")
+
+INSERT_USER_AUTHENTICATION = statements.register("auth.insert_user_authentication", """
+    INSERT INTO user_authentication (
+        "_id", "_createdDate", "_updatedDate", user_id, username,
+        password_hash, email, is_active
+    ) VALUES (
+        :_id, NOW(), NOW(), :user_id, :username,
+        :password_hash, :email, true
+    )
+""")
+
+SELECT_LOGIN = statements.register("auth.select_login", """
+    SELECT ua.user_id, ua.password_hash, ua.is_active, ua.is_locked,
+           u.email, u.role
+    FROM user_authentication ua
+    JOIN users u ON u.id = ua.user_id
+    WHERE ua.email = :email
+""")
+
+RECORD_SUCCESSFUL_LOGIN = statements.register("auth.record_successful_login", """
+    UPDATE user_authentication
+    SET failed_login_attempts = 0,
+        last_login = NOW(),
+        password_hash = COALESCE(:password_hash, password_hash)
+    WHERE user_id = :user_id
+""")
+
+SELECT_USER_PROFILE = statements.register("auth.select_user_profile", """
+    SELECT id, email, display_name, role, created_at
+    FROM users
+    WHERE id = :user_id
+""")
+
 
 class UserLogin(BaseModel):
     email: EmailStr
@@ -55,15 +108,24 @@ class UserResponse(BaseModel):
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify password against hash"""
+    """Verify password against hash (blocking; routes use password_hasher)"""
     return pwd_context.verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    """Hash password"""
+    """Hash password (blocking; routes use password_hasher)"""
     return pwd_context.hash(password)
 
 
+def too_busy() -> HTTPException:
+    """429 returned while the password hashing pool is saturated"""
+    return HTTPException(
+        status_code=429,
+        detail="Too many authentication requests, retry shortly",
+        headers={"Retry-After": "1"}
+    )
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create JWT access token"""
     to_encode = data.copy()
@@ -79,7 +141,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
 @router.post("/register", response_model=UserResponse)
 async def register_user(
     user_data: UserRegister,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Register a new user
@@ -87,46 +149,28 @@ async def register_user(
     import uuid
     
     # Check if user already exists
-    query = "SELECT id FROM users WHERE email = :email"
-    result = db.execute(query, {"email": user_data.email})
+    result = await statements.execute(db, SELECT_USER_ID_BY_EMAIL, {"email": user_data.email})
     if result.fetchone():
         raise HTTPException(status_code=400, detail="Email already registered")
     
     # Create user
     user_id = str(uuid.uuid4())
-    password_hash = get_password_hash(user_data.password)
-    
-    insert_query = """
-        INSERT INTO users (
-            id, email, display_name, role, created_at, updated_at,
-            "_id", "_createdDate", "_updatedDate", "_owner"
-        ) VALUES (
-            :id, :email, :display_name, :role, NOW(), NOW(),
-            :_id, NOW(), NOW(), 'system'
-        )
-        RETURNING id, email, display_name, role, created_at
-    """
+    try:
+        password_hash = await password_hasher.hash(user_data.password)
+    except PasswordHasherSaturated:
+        raise too_busy()
     
-    result = db.execute(insert_query, {
+    result = await statements.execute(db, INSERT_USER, {
         "id": user_id,
         "_id": user_id,
         "email": user_data.email,
         "display_name": user_data.display_name or user_data.email.split("@")[0],
         "role": user_data.role
     })
+    row = result.fetchone()
     
     # Create authentication record
-    auth_query = """
-        INSERT INTO user_authentication (
-            "_id", "_createdDate", "_updatedDate", user_id, username,
-            password_hash, email, is_active
-        ) VALUES (
-            :_id, NOW(), NOW(), :user_id, :username,
-            :password_hash, :email, true
-        )
-    """
-    
-    db.execute(auth_query, {
+    await statements.execute(db, INSERT_USER_AUTHENTICATION, {
         "_id": str(uuid.uuid4()),
         "user_id": user_id,
         "username": user_data.email,
@@ -134,11 +178,10 @@ async def register_user(
         "email": user_data.email
     })
     
-    db.commit()
-    row = result.fetchone()
+    await db.commit()
     
     return UserResponse(
-        id=row[0],
+        id=str(row[0]),
         email=row[1],
         display_name=row[2],
         role=row[3],
@@ -149,27 +192,34 @@ async def register_user(
 @router.post("/login", response_model=TokenResponse)
 async def login_user(
     login_data: UserLogin,
-    db: Session = Depends(get_db)
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Login user and return JWT token
+    Failed attempts are throttled per email and client address; failure
+    counts reach user_authentication through batched flushes
     """
-    # Find user by email
-    query = """
-        SELECT ua.user_id, ua.password_hash, ua.is_active, ua.is_locked,
-               u.email, u.role
-        FROM user_authentication ua
-        JOIN users u ON u.id = ua.user_id
-        WHERE ua.email = :email
-    """
+    # Forwarded address when the request came through a trusted proxy
+    client_ip = get_client_ip(request)
+    retry_after = await login_throttle.retry_after(login_data.email, client_ip)
+    if retry_after:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many failed login attempts",
+            headers={"Retry-After": str(math.ceil(retry_after))}
+        )
     
-    result = db.execute(query, {"email": login_data.email})
+    # Find user by email
+    result = await statements.execute(db, SELECT_LOGIN, {"email": login_data.email})
     user = result.fetchone()
     
     if not user:
+        await login_throttle.record_failure(login_data.email, client_ip)
         raise HTTPException(status_code=401, detail="Invalid email or password")
     
     user_id, password_hash, is_active, is_locked, email, role = user
+    user_id = str(user_id)
     
     # Check if account is locked
     if is_locked:
@@ -179,28 +229,25 @@ async def login_user(
     if not is_active:
         raise HTTPException(status_code=403, detail="Account is inactive")
     
-    # Verify password
-    if not verify_password(login_data.password, password_hash):
-        # Update failed login attempts
-        update_query = """
-            UPDATE user_authentication
-            SET failed_login_attempts = failed_login_attempts + 1,
-                last_failed_login = NOW()
-            WHERE user_id = :user_id
-        """
-        db.execute(update_query, {"user_id": user_id})
-        db.commit()
+    # Verify password (off the event loop; 429 when the hashing pool is saturated)
+    try:
+        valid, new_hash = await password_hasher.verify_and_update(login_data.password, password_hash)
+    except PasswordHasherSaturated:
+        raise too_busy()
+    if not valid:
+        # Count the failure (persisted in the next batched flush)
+        await login_throttle.record_failure(login_data.email, client_ip, user_id)
         raise HTTPException(status_code=401, detail="Invalid email or password")
     
-    # Reset failed login attempts on successful login
-    update_query = """
-        UPDATE user_authentication
-        SET failed_login_attempts = 0,
-            last_login = NOW()
-        WHERE user_id = :user_id
-    """
-    db.execute(update_query, {"user_id": user_id})
-    db.commit()
+    await login_throttle.record_success(login_data.email, user_id)
+    
+    # Reset failed login attempts on successful login (and upgrade the
+    # hash if it was made with a different BCRYPT_ROUNDS)
+    await statements.execute(db, RECORD_SUCCESSFUL_LOGIN, {
+        "user_id": user_id,
+        "password_hash": new_hash
+    })
+    await db.commit()
     
     # Create access token
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -219,44 +266,40 @@ async def login_user(
     )
 
 
-@router.get("/me", response_model=UserResponse)
-async def get_current_user_info(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-):
-    """
-    Get current authenticated user information
-    """
-    token = credentials.credentials
-    
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(status_code=401, detail="Invalid token")
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
+async def load_user_profile(db: AsyncSession, user_id: str) -> Optional[UserResponse]:
+    """User profile, served from the short-TTL user cache when possible"""
+    profile = user_cache.get(user_id)
+    if profile is not None:
+        return profile
     
-    # Get user from database
-    query = """
-        SELECT id, email, display_name, role, created_at
-        FROM users
-        WHERE id = :user_id
-    """
-    
-    result = db.execute(query, {"user_id": user_id})
+    result = await statements.execute(db, SELECT_USER_PROFILE, {"user_id": user_id})
     user = result.fetchone()
-    
     if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+        return None
     
-    return UserResponse(
-        id=user[0],
+    profile = UserResponse(
+        id=str(user[0]),
         email=user[1],
         display_name=user[2],
         role=user[3],
         created_at=user[4]
     )
+    user_cache.set(user_id, profile)
+    return profile
+
+
+@router.get("/me", response_model=UserResponse)
+async def get_current_user_info(
+    user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get current authenticated user information
+    """
+    profile = await load_user_profile(db, user["user_id"])
+    if profile is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return profile
 
 
 @router.post("/logout")
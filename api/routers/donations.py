@@ -4,21 +4,76 @@ Enhanced with QR code generation and Wix integration
 """
 
 from fastapi import APIRouter, Depends, HTTPException, Header, Request
-from sqlalchemy.orm import Session
-from typing import Optional
-from pydantic import BaseModel, EmailStr
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Dict, List, Optional, Tuple
+from pydantic import BaseModel, EmailStr, ValidationError
+import asyncio
 import uuid
-from datetime import datetime
-import qrcode
-import io
-import base64
+from datetime import datetime, timezone
+import json
 import os
 
-from api.database import get_db
-from api.auth import verify_hmac_signature, get_current_user
+from api.database import get_async_db
+from api.metrics import timed
+from api.auth import get_current_user
+from api.services.donation_events import (
+    SSE_HEARTBEAT_SECONDS,
+    SSE_MAX_STREAM_SECONDS,
+    TERMINAL_STATUSES,
+    donation_events,
+    format_sse,
+)
+from api.services.qr import qr_service
+from api.services.response_cache import donation_invoice_key, donation_txid_key, response_cache
+from api.services.wallet_pool import wallet_pool
+from api.signing import verify_signature
+from api.statements import statements
 
 router = APIRouter()
 
+# Upper bound on rows accepted by POST /bulk in one request
+BULK_MAX_ROWS = int(os.getenv("BULK_DONATION_MAX_ROWS", "5000"))
+
+# Column order for COPY in create_donations_bulk
+BULK_COPY_COLUMNS = [
+    "id", "_id", "invoice_id", "created_at", "donor_name", "donor_email",
+    "anonymous", "chain", "token", "amount_crypto", "amount_usd",
+    "to_address", "from_address", "memo", "earmark", "status",
+    "_createdDate", "_updatedDate", "_owner", "metadata",
+]
+
+INSERT_DONATION = statements.register("donations.insert", """
+    INSERT INTO donations (
+        id, "_id", invoice_id, created_at, created_by, donor_name, donor_email,
+        anonymous, chain, token, amount_crypto, amount_usd,
+        to_address, from_address, memo, earmark, status,
+        "_createdDate", "_updatedDate", "_owner", metadata
+    ) VALUES (
+        :id, :_id, :invoice_id, NOW(), :created_by, :donor_name, :donor_email,
+        :anonymous, :chain, :token, :amount_crypto, :amount_usd,
+        :to_address, :from_address, :memo, :earmark, 'created',
+        NOW(), NOW(), 'system', CAST(:metadata AS jsonb)
+    )
+    RETURNING id, created_at
+""")
+
+SELECT_DONATION_BY_INVOICE = statements.register("donations.select_by_invoice", """
+    SELECT id, created_at, donor_name, donor_email, chain, token,
+           amount_crypto, amount_usd, to_address, from_address, memo,
+           txid, confirmations, status, earmark
+    FROM donations
+    WHERE invoice_id = :invoice_id
+""")
+
+SELECT_DONATION_BY_TXID = statements.register("donations.select_by_txid", """
+    SELECT id, created_at, chain, token, amount_crypto, amount_usd,
+           to_address, from_address, memo, txid, confirmations, status
+    FROM donations
+    WHERE txid = :txid
+""")
+
 
 class DonationCreate(BaseModel):
     chain: str
@@ -33,6 +88,7 @@ class DonationCreate(BaseModel):
     donor_email: Optional[EmailStr] = None
     anonymous: Optional[bool] = False
     source: Optional[str] = "api"  # api|wix|webhook
+    qr_format: Optional[str] = None  # png|svg (defaults to QR_DEFAULT_FORMAT)
 
 
 class DonationResponse(BaseModel):
@@ -49,87 +105,135 @@ class DonationResponse(BaseModel):
     created_at: datetime
 
 
-def generate_qr_base64(content: str) -> str:
-    """Generate QR code and return as base64"""
-    qr = qrcode.QRCode(version=1, box_size=10, border=5)
-    qr.add_data(content)
-    qr.make(fit=True)
-    img = qr.make_image(fill_color="black", back_color="white")
-    buff = io.BytesIO()
-    img.save(buff, format='PNG')
-    return base64.b64encode(buff.getvalue()).decode()
+def verify_caller(body: bytes, x_api_key: Optional[str], x_hc_signature: Optional[str]):
+    """Verify API key or HMAC signature"""
+    API_KEY = os.getenv("WC_API_KEY", "changeme")
+    if x_api_key and x_api_key != API_KEY:
+        raise HTTPException(status_code=401, detail="Invalid API key")
+    
+    if x_hc_signature:
+        if not verify_signature("hc", body, x_hc_signature):
+            raise HTTPException(status_code=401, detail="Invalid signature")
+
+
+def assign_address(donation: DonationCreate):
+    """Fill in a receiving address for donations that don't specify one"""
+    if not donation.to_address:
+        # Rotate through active wallets for this chain (in-memory pool)
+        donation.to_address = wallet_pool.acquire(donation.chain)
+        if not donation.to_address:
+            # Generate or derive address (implement wallet derivation logic)
+            donation.to_address = f"PLACEHOLDER_ADDRESS_{donation.chain.upper()}"
+
+
+def parse_bulk_body(body: bytes) -> List[Any]:
+    """Parse a JSON array or NDJSON (one object per line) request body"""
+    stripped = body.strip()
+    if stripped.startswith(b"["):
+        try:
+            rows = json.loads(stripped)
+        except json.JSONDecodeError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid JSON: {e}")
+        return rows
+    rows = []
+    for line_no, line in enumerate(stripped.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            rows.append(json.loads(line))
+        except json.JSONDecodeError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid NDJSON on line {line_no}: {e}")
+    return rows
+
+
+def validate_bulk_rows(rows: List[Any]) -> Tuple[List[Optional[Dict[str, Any]]], List[Tuple[int, DonationCreate]]]:
+    """
+    Validate every bulk row (model and QR format) before any side effects.
+    Returns per-row results with rejections filled in, and the accepted
+    (index, donation) pairs.
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(rows)
+    accepted: List[Tuple[int, DonationCreate]] = []
+    for index, row in enumerate(rows):
+        try:
+            donation = DonationCreate.model_validate(row)
+            qr_service.resolve_format(donation.qr_format)
+        except ValidationError as e:
+            results[index] = {"index": index, "status": "rejected", "errors": e.errors(include_url=False)}
+            continue
+        except ValueError as e:
+            results[index] = {"index": index, "status": "rejected", "errors": [{"msg": str(e)}]}
+            continue
+        accepted.append((index, donation))
+    return results, accepted
+
+
+def bulk_copy_record(donation: DonationCreate, donation_id: str, invoice_id: str, now: datetime) -> tuple:
+    """
+    One COPY row in BULK_COPY_COLUMNS order. now must be timezone-aware:
+    created_at is timestamptz while the Wix _createdDate/_updatedDate
+    columns are timestamp without time zone (stored as naive UTC).
+    """
+    naive_now = now.astimezone(timezone.utc).replace(tzinfo=None)
+    return (
+        donation_id, donation_id, invoice_id, now, donation.donor_name, donation.donor_email,
+        donation.anonymous, donation.chain, donation.token, donation.amount_crypto, donation.amount_usd,
+        donation.to_address, donation.from_address, donation.memo, donation.earmark, "created",
+        naive_now, naive_now, "system",
+        json.dumps({"source": donation.source, "invoice_id": invoice_id}),
+    )
 
 
-@router.post("/create", response_model=DonationResponse)
+@router.post(
+    "/create",
+    response_model=DonationResponse,
+    openapi_extra={"requestBody": {
+        "required": True,
+        "content": {"application/json": {"schema": DonationCreate.model_json_schema()}},
+    }}
+)
 async def create_donation(
-    donation: DonationCreate,
     request: Request,
     x_hc_signature: Optional[str] = Header(None),
     x_api_key: Optional[str] = Header(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Create a new donation invoice
     Returns invoice_id, address, memo, qr_url
+    The raw body is read once: the signature is checked over it and the
+    same buffer is validated into DonationCreate.
     """
+    body = await request.body()
+    
     # Verify API key or HMAC signature
-    API_KEY = os.getenv("WC_API_KEY", "changeme")
-    if x_api_key and x_api_key != API_KEY:
-        raise HTTPException(status_code=401, detail="Invalid API key")
+    verify_caller(body, x_api_key, x_hc_signature)
     
-    if x_hc_signature:
-        body = await request.body()
-        if not verify_hmac_signature(body, x_hc_signature):
-            raise HTTPException(status_code=401, detail="Invalid signature")
+    try:
+        donation = DonationCreate.model_validate_json(body)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
     
     # Generate invoice ID
     invoice_id = f"INV-{uuid.uuid4().hex[:12].upper()}"
     
     # Get or create wallet address
-    if not donation.to_address:
-        # Query for available wallet address for this chain
-        wallet_query = """
-            SELECT address FROM wallets
-            WHERE chain = :chain AND active = true
-            LIMIT 1
-        """
-        result = db.execute(wallet_query, {"chain": donation.chain})
-        wallet = result.fetchone()
-        if wallet:
-            donation.to_address = wallet[0]
-        else:
-            # Generate or derive address (implement wallet derivation logic)
-            donation.to_address = f"PLACEHOLDER_ADDRESS_{donation.chain.upper()}"
+    assign_address(donation)
     
     # Create donation record
     donation_id = str(uuid.uuid4())
     
-    # Generate QR code
-    qr_content = donation.to_address
-    if donation.memo:
-        qr_content = f"{donation.to_address}:{donation.memo}"
-    qr_base64 = generate_qr_base64(qr_content)
-    qr_url = f"data:image/png;base64,{qr_base64}"
+    # Generate QR code (cached, rendered off the event loop)
+    try:
+        qr_url = await qr_service.render(donation.to_address, donation.memo, donation.qr_format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     # Insert into database
-    query = """
-        INSERT INTO donations (
-            id, "_id", created_at, created_by, donor_name, donor_email,
-            anonymous, chain, token, amount_crypto, amount_usd,
-            to_address, from_address, memo, earmark, status,
-            "_createdDate", "_updatedDate", "_owner", metadata
-        ) VALUES (
-            :id, :_id, NOW(), :created_by, :donor_name, :donor_email,
-            :anonymous, :chain, :token, :amount_crypto, :amount_usd,
-            :to_address, :from_address, :memo, :earmark, 'created',
-            NOW(), NOW(), 'system', :metadata
-        )
-        RETURNING id, created_at
-    """
-    
-    result = db.execute(query, {
+    result = await statements.execute(db, INSERT_DONATION, {
         "id": donation_id,
         "_id": donation_id,
+        "invoice_id": invoice_id,
         "created_by": None,  # Will be set if user is authenticated
         "donor_name": donation.donor_name,
         "donor_email": donation.donor_email,
@@ -142,14 +246,14 @@ async def create_donation(
         "from_address": donation.from_address,
         "memo": donation.memo,
         "earmark": donation.earmark,
-        "metadata": {"source": donation.source, "invoice_id": invoice_id}
+        "metadata": json.dumps({"source": donation.source, "invoice_id": invoice_id})
     })
     
-    db.commit()
     row = result.fetchone()
+    await db.commit()
     
     return DonationResponse(
-        id=row[0],
+        id=str(row[0]),
         invoice_id=invoice_id,
         chain=donation.chain,
         token=donation.token,
@@ -163,26 +267,91 @@ async def create_donation(
     )
 
 
-@router.get("/{invoice_id}")
-async def get_donation(
-    invoice_id: str,
-    db: Session = Depends(get_db)
+@router.post("/bulk")
+async def create_donations_bulk(
+    request: Request,
+    x_hc_signature: Optional[str] = Header(None),
+    x_api_key: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get donation record by invoice_id"""
-    query = """
-        SELECT id, created_at, donor_name, donor_email, chain, token,
-               amount_crypto, amount_usd, to_address, from_address, memo,
-               txid, confirmations, status, earmark
-        FROM donations
-        WHERE metadata->>'invoice_id' = :invoice_id
     """
+    Create many donation invoices in one request
+    Body is a JSON array or NDJSON of DonationCreate objects; one signature
+    check and one COPY cover the whole batch. Returns per-row results.
+    """
+    body = await request.body()
+    verify_caller(body, x_api_key, x_hc_signature)
     
-    result = db.execute(query, {"invoice_id": invoice_id})
-    row = result.fetchone()
+    rows = parse_bulk_body(body)
+    if not isinstance(rows, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array or NDJSON")
+    if len(rows) > BULK_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"At most {BULK_MAX_ROWS} donations per request")
     
-    if not row:
-        raise HTTPException(status_code=404, detail="Donation not found")
+    # Validate every row first so rejected rows never take a pool address
+    results, accepted = validate_bulk_rows(rows)
+    for _, donation in accepted:
+        assign_address(donation)
     
+    # Render QR codes concurrently (cached per address+memo)
+    qr_urls = await asyncio.gather(
+        *(qr_service.render(d.to_address, d.memo, d.qr_format) for _, d in accepted),
+        return_exceptions=True
+    )
+    
+    now = datetime.now(timezone.utc)
+    records = []
+    created = []
+    for (index, donation), qr_url in zip(accepted, qr_urls):
+        if isinstance(qr_url, ValueError):
+            results[index] = {"index": index, "status": "rejected", "errors": [{"msg": str(qr_url)}]}
+            continue
+        if isinstance(qr_url, BaseException):
+            raise qr_url
+        donation_id = str(uuid.uuid4())
+        invoice_id = f"INV-{uuid.uuid4().hex[:12].upper()}"
+        records.append(bulk_copy_record(donation, donation_id, invoice_id, now))
+        created.append((index, DonationResponse(
+            id=donation_id,
+            invoice_id=invoice_id,
+            chain=donation.chain,
+            token=donation.token,
+            amount_crypto=donation.amount_crypto,
+            amount_usd=donation.amount_usd,
+            to_address=donation.to_address,
+            memo=donation.memo,
+            qr_url=qr_url,
+            status="created",
+            created_at=now
+        )))
+    
+    # Single COPY: all valid rows are written atomically or not at all
+    if records:
+        conn = await db.connection()
+        raw = await conn.get_raw_connection()
+        with timed("db"):
+            await raw.driver_connection.copy_records_to_table(
+                "donations", records=records, columns=BULK_COPY_COLUMNS
+            )
+        await db.commit()
+    
+    for index, response in created:
+        results[index] = {"index": index, "status": "created", **response.model_dump()}
+    
+    return {
+        "received": len(rows),
+        "created": len(created),
+        "rejected": len(rows) - len(created),
+        "results": results
+    }
+
+
+async def fetch_donation(db: AsyncSession, invoice_id: str) -> Optional[Dict[str, Any]]:
+    """Load a donation record by invoice_id"""
+    result = await statements.execute(db, SELECT_DONATION_BY_INVOICE, {"invoice_id": invoice_id})
+    row = result.fetchone()
+    if not row:
+        return None
     return {
         "id": row[0],
         "created_at": row[1],
@@ -202,36 +371,112 @@ async def get_donation(
     }
 
 
+@router.get("/{invoice_id}")
+async def get_donation(
+    invoice_id: str,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get donation record by invoice_id (cached; supports If-None-Match)"""
+    entry = await response_cache.get_or_load(
+        donation_invoice_key(invoice_id),
+        lambda: fetch_donation(db, invoice_id)
+    )
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Donation not found")
+    
+    return response_cache.respond(entry, if_none_match)
+
+
+@router.get("/{invoice_id}/events")
+async def stream_donation_events(
+    invoice_id: str,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Server-sent events stream of a donation's status
+    Sends the current status immediately, then every change until the
+    donation reaches a terminal status
+    """
+    # Subscribe before reading so no change between the read and the
+    # subscription is missed
+    queue = donation_events.subscribe(invoice_id)
+    try:
+        donation = await fetch_donation(db, invoice_id)
+    except Exception:
+        donation_events.unsubscribe(invoice_id, queue)
+        raise
+    # Return the pooled connection; the stream itself never touches the database
+    await db.close()
+    if donation is None:
+        donation_events.unsubscribe(invoice_id, queue)
+        raise HTTPException(status_code=404, detail="Donation not found")
+    
+    async def stream():
+        try:
+            current = {
+                "invoice_id": invoice_id,
+                "status": donation["status"],
+                "confirmations": donation["confirmations"],
+                "txid": donation["txid"]
+            }
+            yield format_sse("status", current)
+            if current["status"] in TERMINAL_STATUSES:
+                return
+            
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + SSE_MAX_STREAM_SECONDS
+            while loop.time() < deadline:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse("status", event)
+                if event["status"] in TERMINAL_STATUSES:
+                    return
+        finally:
+            donation_events.unsubscribe(invoice_id, queue)
+    
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get("/tx/{txid}")
 async def get_donation_by_txid(
     txid: str,
-    db: Session = Depends(get_db)
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Lookup donation by transaction ID"""
-    query = """
-        SELECT id, created_at, chain, token, amount_crypto, amount_usd,
-               to_address, from_address, memo, txid, confirmations, status
-        FROM donations
-        WHERE txid = :txid
-    """
-    
-    result = db.execute(query, {"txid": txid})
-    row = result.fetchone()
+    """Lookup donation by transaction ID (cached; supports If-None-Match)"""
+    async def load():
+        result = await statements.execute(db, SELECT_DONATION_BY_TXID, {"txid": txid})
+        row = result.fetchone()
+        if not row:
+            return None
+        return {
+            "id": row[0],
+            "created_at": row[1],
+            "chain": row[2],
+            "token": row[3],
+            "amount_crypto": float(row[4]),
+            "amount_usd": float(row[5]),
+            "to_address": row[6],
+            "from_address": row[7],
+            "memo": row[8],
+            "txid": row[9],
+            "confirmations": row[10],
+            "status": row[11]
+        }
     
-    if not row:
+    entry = await response_cache.get_or_load(donation_txid_key(txid), load)
+    if entry is None:
         raise HTTPException(status_code=404, detail="Donation not found")
     
-    return {
-        "id": row[0],
-        "created_at": row[1],
-        "chain": row[2],
-        "token": row[3],
-        "amount_crypto": float(row[4]),
-        "amount_usd": float(row[5]),
-        "to_address": row[6],
-        "from_address": row[7],
-        "memo": row[8],
-        "txid": row[9],
-        "confirmations": row[10],
-        "status": row[11]
-    }
+    return response_cache.respond(entry, if_none_match)
@@ -1,22 +1,42 @@
 """Webhooks API endpoints"""
-from fastapi import APIRouter, Request, Header
+from fastapi import APIRouter, Request, Header, HTTPException, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
+import json
+
+from api.database import get_async_db
+from api.services.webhook_ingest import ingest_webhook
+from api.signing import get_verifier, provider_allowed
+
 router = APIRouter()
 
-@router.post("/{provider}")
+@router.post("/{provider}", status_code=202)
 async def receive_webhook(
     provider: str,
     request: Request,
-    x_hc_signature: Optional[str] = Header(None)
+    x_hc_signature: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Authenticated webhook ingest (HMAC)"""
+    """
+    Authenticated webhook ingest (HMAC)
+    Stored once per distinct body and processed by the webhook consumer
+    """
+    provider = provider.lower()
+    # WEBHOOK_PROVIDERS or a WEBHOOK_SECRET_<PROVIDER> of its own
+    if not provider_allowed(provider):
+        raise HTTPException(status_code=404, detail="Unknown webhook provider")
+    # Without a secret any HMAC keyed with "" would verify
+    verifier = get_verifier(provider)
+    if verifier is None:
+        raise HTTPException(status_code=503, detail=f"Webhooks for {provider} are not configured")
     body = await request.body()
-    # Verify HMAC signature
-    # Process webhook
-    pass
-
-
-
-
-
-
+    # Verify HMAC signature (WEBHOOK_SECRET_<PROVIDER> or WEBHOOK_SECRET)
+    if not verifier.verify(body, x_hc_signature):
+        raise HTTPException(status_code=401, detail="Invalid signature")
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON payload")
+    # Queue for processing (deduplicated by body hash)
+    webhook_id, duplicate = await ingest_webhook(db, provider, body, payload)
+    return {"status": "accepted", "webhook_id": webhook_id, "duplicate": duplicate}
@@ -4,22 +4,41 @@ Handles webhooks and API calls from Wix
 """
 
 from fastapi import APIRouter, Request, Header, HTTPException, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 from pydantic import BaseModel
 import uuid
-import hmac
-import hashlib
+import json
 import os
 from datetime import datetime
 
-from api.database import get_db
+from api.database import get_async_db
+from api.services.qr import qr_service
+from api.services.wallet_pool import wallet_pool
+from api.services.webhook_ingest import ingest_webhook
+from api.signing import verify_signature
+from api.statements import statements
 
 router = APIRouter()
 
 # Get API key from environment
 WC_API_KEY = os.getenv("WC_API_KEY", "changeme")
 
+INSERT_WIX_DONATION = statements.register("wix.insert_donation", """
+    INSERT INTO donations (
+        id, invoice_id, created_at, created_by, donor_name, donor_email,
+        chain, token, amount_crypto, amount_usd,
+        to_address, memo, status, earmark,
+        "_id", "_createdDate", "_updatedDate", "_owner", metadata
+    ) VALUES (
+        :id, :invoice_id, NOW(), NULL, :donor_name, :donor_email,
+        :chain, :token, :amount_crypto, :amount_usd,
+        :to_address, :memo, 'created', :earmark,
+        :_id, NOW(), NOW(), 'system', CAST(:metadata AS jsonb)
+    )
+    RETURNING id, invoice_id
+""")
+
 
 class WixDonationRequest(BaseModel):
     chain: str
@@ -28,6 +47,7 @@ class WixDonationRequest(BaseModel):
     donorInfo: Optional[dict] = None
     earmark: Optional[str] = "general"
     memo: Optional[str] = None
+    qrFormat: Optional[str] = None
 
 
 class WixWebhookPayload(BaseModel):
@@ -38,21 +58,15 @@ class WixWebhookPayload(BaseModel):
 
 
 def verify_wix_signature(request_body: bytes, signature: str) -> bool:
-    """Verify Wix webhook signature"""
-    webhook_secret = os.getenv("WEBHOOK_SECRET", "")
-    expected_signature = hmac.new(
-        webhook_secret.encode(),
-        request_body,
-        hashlib.sha256
-    ).hexdigest()
-    return hmac.compare_digest(signature, expected_signature)
+    """Verify Wix webhook signature (WEBHOOK_SECRET_WIX or WEBHOOK_SECRET)"""
+    return verify_signature("wix", request_body, signature)
 
 
 @router.post("/v1/donations/create")
 async def create_donation_from_wix(
     donation_data: WixDonationRequest,
     x_api_key: Optional[str] = Header(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Create donation invoice from Wix
@@ -66,30 +80,18 @@ async def create_donation_from_wix(
     invoice_id = str(uuid.uuid4())
     donation_id = str(uuid.uuid4())
     
-    # Get wallet address (simplified - in production, use wallet service)
-    # For now, use a placeholder or get from wallets table
-    to_address = "XxxSampleAddressFromWalletPool"  # Replace with actual wallet logic
+    # Get wallet address from the shared in-memory pool
+    to_address = wallet_pool.acquire(donation_data.chain)
+    if not to_address:
+        # Generate or derive address (implement wallet derivation logic)
+        to_address = f"PLACEHOLDER_ADDRESS_{donation_data.chain.upper()}"
     memo = donation_data.memo or f"HingeCraft-{invoice_id[:8]}"
     
-    # Generate QR code (simplified - in production, use qrcode library)
-    qr_content = f"{to_address}{(':' + memo) if memo else ''}"
-    qr_b64 = generate_qr_base64(qr_content)
-    
-    # Insert donation record
-    query = """
-        INSERT INTO donations (
-            id, created_at, created_by, donor_name, donor_email,
-            chain, token, amount_crypto, amount_usd,
-            to_address, memo, status, earmark,
-            "_id", "_createdDate", "_updatedDate", "_owner"
-        ) VALUES (
-            :id, NOW(), NULL, :donor_name, :donor_email,
-            :chain, :token, :amount_crypto, :amount_usd,
-            :to_address, :memo, 'created', :earmark,
-            :_id, NOW(), NOW(), 'system'
-        )
-        RETURNING id, invoice_id
-    """
+    # Generate QR code (cached, rendered off the event loop)
+    try:
+        qr_url = await qr_service.render(to_address, memo, donation_data.qrFormat)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     # Determine token from chain
     token_map = {
@@ -110,9 +112,11 @@ async def create_donation_from_wix(
     # For now, assume 1:1 crypto:USD (in production, use exchange rate API)
     amount_crypto = donation_data.amountUsd
     
-    db.execute(query, {
+    # Insert donation record
+    await statements.execute(db, INSERT_WIX_DONATION, {
         "id": donation_id,
         "_id": donation_id,
+        "invoice_id": invoice_id,
         "donor_name": donor_name,
         "donor_email": donor_email,
         "chain": donation_data.chain,
@@ -121,30 +125,32 @@ async def create_donation_from_wix(
         "amount_usd": donation_data.amountUsd,
         "to_address": to_address,
         "memo": memo,
-        "earmark": donation_data.earmark
+        "earmark": donation_data.earmark,
+        "metadata": json.dumps({"source": donation_data.source, "invoice_id": invoice_id})
     })
-    db.commit()
+    await db.commit()
     
     return {
         "invoice_id": invoice_id,
         "address": to_address,
         "memo": memo,
-        "qr_url": f"data:image/png;base64,{qr_b64}",
+        "qr_url": qr_url,
         "chain": donation_data.chain,
         "token": token,
         "amount_usd": donation_data.amountUsd
     }
 
 
-@router.post("/webhooks/wix")
+@router.post("/webhooks/wix", status_code=202)
 async def receive_wix_webhook(
     request: Request,
     x_wix_signature: Optional[str] = Header(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Receive webhook from Wix
     Example payload: {"event":"form_submit","source":"wix:donate_form","data":{...}}
+    Stored once per distinct body and processed by the webhook consumer
     """
     body = await request.body()
     
@@ -154,56 +160,21 @@ async def receive_wix_webhook(
             raise HTTPException(status_code=401, detail="Invalid signature")
     
     # Parse payload
-    import json
-    payload = json.loads(body)
-    
-    # Store webhook
-    webhook_id = str(uuid.uuid4())
-    query = """
-        INSERT INTO webhooks (
-            id, provider, payload, received_at, processed
-        ) VALUES (
-            :id, 'wix', :payload, NOW(), false
-        )
-    """
-    
-    db.execute(query, {
-        "id": webhook_id,
-        "payload": json.dumps(payload)
-    })
-    db.commit()
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON payload")
     
-    # Process webhook based on event type
-    event_type = payload.get("event")
-    if event_type == "form_submit":
-        # Handle form submission
-        data = payload.get("data", {})
-        # Process donation or other form data
-        pass
+    # Store webhook (deduplicated by body hash); processing is asynchronous
+    webhook_id, duplicate = await ingest_webhook(db, "wix", body, payload)
     
-    return {"status": "received", "webhook_id": webhook_id}
-
-
-def generate_qr_base64(content: str) -> str:
-    """Generate QR code and return as base64"""
-    try:
-        import qrcode
-        import io
-        import base64
-        
-        img = qrcode.make(content)
-        buff = io.BytesIO()
-        img.save(buff, format='PNG')
-        return base64.b64encode(buff.getvalue()).decode()
-    except ImportError:
-        # Fallback if qrcode not installed
-        return ""
+    return {"status": "accepted", "webhook_id": webhook_id, "duplicate": duplicate}
 
 
 @router.get("/v1/wix/sync")
 async def sync_wix_content(
     x_api_key: Optional[str] = Header(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Sync content from Wix CMS to database
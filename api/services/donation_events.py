@@ -0,0 +1,86 @@
+"""
+Donation status events
+In-process pub/sub feeding the per-invoice SSE stream; fed across processes
+by donation_changes notifications
+"""
+
+from typing import Any, Dict, Set
+import asyncio
+import json
+import logging
+import os
+
+from api.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+SSE_MAX_STREAM_SECONDS = float(os.getenv("SSE_MAX_STREAM_SECONDS", "1800"))
+SSE_QUEUE_SIZE = int(os.getenv("SSE_QUEUE_SIZE", "16"))
+
+# Statuses after which a payer's stream is closed
+TERMINAL_STATUSES = {"confirmed", "failed", "reconciled"}
+
+SUBSCRIBERS = registry.gauge(
+    "hc_donation_event_subscribers",
+    "Open donation status streams"
+)
+EVENTS_PUBLISHED = registry.counter(
+    "hc_donation_events_published_total",
+    "Donation status events delivered to in-process subscribers"
+)
+
+
+class DonationEventBroker:
+    """Fan-out of donation status changes to subscribers keyed by invoice_id"""
+
+    def __init__(self, queue_size: int = SSE_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._count = 0
+
+    def subscribe(self, invoice_id: str) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(invoice_id, set()).add(queue)
+        self._count += 1
+        SUBSCRIBERS.set(self._count)
+        return queue
+
+    def unsubscribe(self, invoice_id: str, queue: asyncio.Queue):
+        queues = self._subscribers.get(invoice_id)
+        if not queues or queue not in queues:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[invoice_id]
+        self._count -= 1
+        SUBSCRIBERS.set(self._count)
+
+    def publish(self, invoice_id: str, event: Dict[str, Any]):
+        """Deliver an event; slow subscribers lose their oldest pending event"""
+        for queue in self._subscribers.get(invoice_id, ()):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+            EVENTS_PUBLISHED.inc()
+
+    async def handle_donation_change(self, payload: str):
+        """donation_changes notification handler"""
+        change = json.loads(payload)
+        invoice_id = change.get("invoice_id")
+        if invoice_id and invoice_id in self._subscribers:
+            self.publish(invoice_id, {
+                "invoice_id": invoice_id,
+                "status": change.get("status"),
+                "confirmations": change.get("confirmations"),
+                "txid": change.get("txid"),
+            })
+
+
+def format_sse(event: str, data: Any) -> str:
+    """Encode one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+# Shared broker for the API process
+donation_events = DonationEventBroker()
@@ -0,0 +1,257 @@
+"""
+Login throttling
+Failed logins are counted in a sliding window (in process, or in Redis so
+all API workers share it) and lock the account or client address out for
+a while once they pass a limit. Per-user failure counts are written to
+user_authentication in periodic batches instead of one UPDATE per attempt.
+"""
+
+from collections import deque
+from datetime import datetime, timezone
+from typing import Deque, Dict, List, Optional, Tuple
+import asyncio
+import logging
+import os
+import threading
+import time
+import uuid
+
+from api.database import AsyncSessionLocal
+from api.metrics import registry
+from api.statements import statements
+
+logger = logging.getLogger(__name__)
+
+# memory | redis
+LOGIN_THROTTLE_BACKEND = os.getenv("LOGIN_THROTTLE_BACKEND", "memory")
+LOGIN_FAILURE_WINDOW = float(os.getenv("LOGIN_FAILURE_WINDOW", "900"))
+LOGIN_MAX_FAILURES = int(os.getenv("LOGIN_MAX_FAILURES", "5"))
+LOGIN_MAX_FAILURES_PER_IP = int(os.getenv("LOGIN_MAX_FAILURES_PER_IP", "50"))
+LOGIN_LOCKOUT_SECONDS = float(os.getenv("LOGIN_LOCKOUT_SECONDS", "900"))
+LOGIN_FLUSH_INTERVAL = float(os.getenv("LOGIN_FLUSH_INTERVAL", "5"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+
+LOGIN_FAILURES = registry.counter(
+    "hc_login_failures_total",
+    "Failed login attempts"
+)
+LOGIN_THROTTLED = registry.counter(
+    "hc_login_throttled_total",
+    "Login attempts rejected while locked out, by lockout scope",
+    labels=("scope",)
+)
+LOGIN_FLUSHED = registry.counter(
+    "hc_login_failure_rows_flushed_total",
+    "user_authentication rows updated by batched failure flushes"
+)
+
+# One row per failure; failures at or before the account's last successful
+# login or password change were already reset and are not counted
+FLUSH_FAILED_LOGINS = statements.register("auth.flush_failed_logins", """
+    UPDATE user_authentication AS ua
+    SET failed_login_attempts = COALESCE(ua.failed_login_attempts, 0) + v.failures,
+        last_failed_login = v.failed_at
+    FROM (
+        SELECT f.user_id, count(*) AS failures, max(f.failed_at) AS failed_at
+        FROM unnest(
+            CAST(:user_ids AS text[]),
+            CAST(:failed_at AS timestamptz[])
+        ) AS f(user_id, failed_at)
+        JOIN user_authentication AS u ON u.user_id::text = f.user_id
+        WHERE f.failed_at > COALESCE(GREATEST(u.last_login, u.password_changed_date), '-infinity')
+        GROUP BY f.user_id
+    ) AS v
+    WHERE ua.user_id::text = v.user_id
+""")
+
+
+class InMemoryThrottleBackend:
+    """Per-process sliding windows and lockouts"""
+
+    def __init__(self):
+        self._windows: Dict[str, Deque[float]] = {}
+        self._locked_until: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+
+    async def add_failure(self, key: str, window: float) -> int:
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_sweep >= window:
+                self._sweep(now, window)
+            events = self._windows.setdefault(key, deque())
+            events.append(now)
+            while events and events[0] <= now - window:
+                events.popleft()
+            return len(events)
+
+    def _sweep(self, now: float, window: float):
+        """Drop windows with no failure inside the window and expired lockouts (lock held)"""
+        for key in [k for k, events in self._windows.items() if not events or events[-1] <= now - window]:
+            del self._windows[key]
+        for key in [k for k, until in self._locked_until.items() if until <= now]:
+            del self._locked_until[key]
+        self._last_sweep = now
+
+    def __len__(self) -> int:
+        """Keys currently tracked (windows or lockouts)"""
+        return len(self._windows.keys() | self._locked_until.keys())
+
+    async def lock(self, key: str, seconds: float):
+        with self._lock:
+            self._locked_until[key] = time.monotonic() + seconds
+
+    async def locked_for(self, key: str) -> float:
+        """Seconds left on a lockout (0 when not locked)"""
+        with self._lock:
+            until = self._locked_until.get(key)
+            if until is None:
+                return 0.0
+            remaining = until - time.monotonic()
+            if remaining <= 0:
+                del self._locked_until[key]
+                self._windows.pop(key, None)
+                return 0.0
+            return remaining
+
+    async def reset(self, key: str):
+        with self._lock:
+            self._windows.pop(key, None)
+            self._locked_until.pop(key, None)
+
+
+class RedisThrottleBackend:
+    """Sliding windows shared by all API workers (sorted set per key)"""
+
+    def __init__(self, url: str = REDIS_URL, prefix: str = "hc:login:"):
+        import redis.asyncio as redis
+
+        self.client = redis.from_url(url)
+        self.prefix = prefix
+
+    async def add_failure(self, key: str, window: float) -> int:
+        now = time.time()
+        window_key = self.prefix + "fail:" + key
+        pipe = self.client.pipeline()
+        pipe.zadd(window_key, {uuid.uuid4().hex: now})
+        pipe.zremrangebyscore(window_key, 0, now - window)
+        pipe.zcard(window_key)
+        pipe.expire(window_key, int(window) + 1)
+        _, _, count, _ = await pipe.execute()
+        return count
+
+    async def lock(self, key: str, seconds: float):
+        await self.client.set(self.prefix + "lock:" + key, 1, px=int(seconds * 1000))
+
+    async def locked_for(self, key: str) -> float:
+        ttl_ms = await self.client.pttl(self.prefix + "lock:" + key)
+        return ttl_ms / 1000 if ttl_ms and ttl_ms > 0 else 0.0
+
+    async def reset(self, key: str):
+        await self.client.delete(self.prefix + "fail:" + key, self.prefix + "lock:" + key)
+
+
+def email_key(email: str) -> str:
+    return "email:" + email.strip().lower()
+
+
+def ip_key(ip: str) -> str:
+    return "ip:" + ip
+
+
+class LoginThrottle:
+    """Sliding-window failure limits with lockout and batched persistence"""
+
+    def __init__(self, backend=None):
+        self.backend = backend or InMemoryThrottleBackend()
+        # user_id -> failure times since the last flush
+        self._pending: Dict[str, List[datetime]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def _scopes(self, email: str, ip: Optional[str]) -> List[Tuple[str, str, int]]:
+        scopes = [("email", email_key(email), LOGIN_MAX_FAILURES)]
+        if ip:
+            scopes.append(("ip", ip_key(ip), LOGIN_MAX_FAILURES_PER_IP))
+        return scopes
+
+    async def retry_after(self, email: str, ip: Optional[str] = None) -> float:
+        """Seconds until this email/address may try again (0 if not locked out)"""
+        for scope, key, _ in self._scopes(email, ip):
+            remaining = await self.backend.locked_for(key)
+            if remaining > 0:
+                LOGIN_THROTTLED.inc(scope)
+                return remaining
+        return 0.0
+
+    async def record_failure(self, email: str, ip: Optional[str] = None, user_id: Optional[str] = None):
+        """Count a failed attempt, locking out scopes that pass their limit"""
+        LOGIN_FAILURES.inc()
+        for scope, key, limit in self._scopes(email, ip):
+            if await self.backend.add_failure(key, LOGIN_FAILURE_WINDOW) >= limit:
+                await self.backend.lock(key, LOGIN_LOCKOUT_SECONDS)
+                logger.warning(f"Login lockout for {scope} {key.split(':', 1)[1]}")
+        if user_id:
+            self._pending.setdefault(user_id, []).append(datetime.now(timezone.utc))
+
+    async def record_success(self, email: str, user_id: Optional[str] = None):
+        """Clear the account's window; the login itself resets the stored count"""
+        await self.backend.reset(email_key(email))
+        if user_id:
+            self._pending.pop(user_id, None)
+
+    async def flush(self) -> int:
+        """
+        Write pending per-user failures in one UPDATE. A login that succeeds
+        while the batch is in flight resets the count and stamps last_login,
+        and the UPDATE skips failures from before it.
+        """
+        if not self._pending:
+            return 0
+        pending, self._pending = self._pending, {}
+        rows = [(user_id, failed_at) for user_id, times in pending.items() for failed_at in times]
+        try:
+            async with AsyncSessionLocal() as db:
+                await statements.execute(db, FLUSH_FAILED_LOGINS, {
+                    "user_ids": [user_id for user_id, _ in rows],
+                    "failed_at": [failed_at for _, failed_at in rows],
+                })
+                await db.commit()
+        except Exception as e:
+            logger.error(f"Failed to flush login failures: {e}")
+            # Keep the failures for the next flush
+            for user_id, times in pending.items():
+                self._pending[user_id] = times + self._pending.get(user_id, [])
+            return 0
+        LOGIN_FLUSHED.inc(amount=len(pending))
+        return len(pending)
+
+    async def _flush_loop(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            await self.flush()
+
+    def start(self, interval: float = LOGIN_FLUSH_INTERVAL):
+        """Start the periodic flusher"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_loop(interval))
+
+    async def stop(self):
+        """Stop the flusher and write whatever is still pending"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+def _build_login_throttle() -> LoginThrottle:
+    if LOGIN_THROTTLE_BACKEND == "redis":
+        return LoginThrottle(RedisThrottleBackend())
+    return LoginThrottle()
+
+
+# Shared throttle for the auth routes
+login_throttle = _build_login_throttle()
@@ -0,0 +1,156 @@
+"""
+Postgres LISTEN/NOTIFY listener
+One dedicated asyncpg connection per API worker dispatching NOTIFY payloads
+to in-process handlers. A supervisor task reconnects with backoff when the
+connection drops (Postgres restart, failover) and re-issues every LISTEN;
+notifications sent while disconnected are lost, so reconnect handlers
+resynchronise whatever depends on them.
+"""
+
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+import asyncio
+import logging
+import os
+
+import asyncpg
+
+from api.database import ASYNC_DATABASE_URL
+
+logger = logging.getLogger(__name__)
+
+NotificationHandler = Callable[[str], Awaitable[None]]
+ReconnectHandler = Callable[[], Awaitable[None]]
+
+# Reconnect delay doubles from the minimum up to the maximum while Postgres is unreachable
+NOTIFY_RECONNECT_MIN_SECONDS = float(os.getenv("NOTIFY_RECONNECT_MIN_SECONDS", "1"))
+NOTIFY_RECONNECT_MAX_SECONDS = float(os.getenv("NOTIFY_RECONNECT_MAX_SECONDS", "30"))
+# How often a connection is checked in case the drop wasn't reported
+NOTIFY_HEALTH_CHECK_SECONDS = float(os.getenv("NOTIFY_HEALTH_CHECK_SECONDS", "15"))
+
+# Channel notified by the donations trigger in 08_crypto_treasury.sql when
+# status, confirmations or txid change (payload: JSON from notify_donation_changed)
+DONATION_CHANGES_CHANNEL = "donation_changes"
+
+
+def _asyncpg_dsn(url: str) -> str:
+    """asyncpg takes a plain postgresql:// DSN (no SQLAlchemy driver suffix)"""
+    return url.replace("postgresql+asyncpg://", "postgresql://", 1)
+
+
+class PgNotificationListener:
+    """Dispatches Postgres notifications to registered coroutine handlers"""
+
+    def __init__(self, dsn: str = ASYNC_DATABASE_URL,
+                 reconnect_min: float = NOTIFY_RECONNECT_MIN_SECONDS,
+                 reconnect_max: float = NOTIFY_RECONNECT_MAX_SECONDS,
+                 health_check: float = NOTIFY_HEALTH_CHECK_SECONDS):
+        self.dsn = _asyncpg_dsn(dsn)
+        self.reconnect_min = reconnect_min
+        self.reconnect_max = reconnect_max
+        self.health_check = health_check
+        self.handlers: Dict[str, List[NotificationHandler]] = {}
+        self.reconnect_handlers: List[ReconnectHandler] = []
+        self.connects = 0
+        self._connection: Optional[asyncpg.Connection] = None
+        self._supervisor: Optional[asyncio.Task] = None
+        self._lost: Optional[asyncio.Event] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    def add_handler(self, channel: str, handler: NotificationHandler):
+        """Register a handler for a channel (call before start())"""
+        self.handlers.setdefault(channel, []).append(handler)
+
+    def add_reconnect_handler(self, handler: ReconnectHandler):
+        """Called after the connection is re-established (not on the first connect)"""
+        self.reconnect_handlers.append(handler)
+
+    @property
+    def is_listening(self) -> bool:
+        return self._connection is not None and not self._connection.is_closed()
+
+    async def start(self):
+        """Start the supervisor that connects and LISTENs on every registered channel"""
+        if self._supervisor is not None or not self.handlers:
+            return
+        self._lost = asyncio.Event()
+        self._supervisor = asyncio.create_task(self._supervise())
+
+    async def stop(self):
+        """Stop reconnecting and close the listener connection"""
+        if self._supervisor is not None:
+            self._supervisor.cancel()
+            try:
+                await self._supervisor
+            except asyncio.CancelledError:
+                pass
+            self._supervisor = None
+        await self._close()
+
+    async def _connect(self):
+        self._lost.clear()
+        connection = await asyncpg.connect(self.dsn)
+        try:
+            connection.add_termination_listener(lambda _: self._lost.set())
+            for channel in self.handlers:
+                await connection.add_listener(channel, self._on_notification)
+        except BaseException:
+            connection.terminate()
+            raise
+        self._connection = connection
+        self.connects += 1
+        logger.info(f"Listening on {', '.join(self.handlers)}")
+
+    async def _close(self):
+        if self._connection is not None:
+            connection, self._connection = self._connection, None
+            try:
+                await connection.close(timeout=5)
+            except Exception:
+                connection.terminate()
+
+    async def _wait_until_lost(self):
+        """Return once the connection is closed (reported or found by a health check)"""
+        while True:
+            try:
+                await asyncio.wait_for(self._lost.wait(), self.health_check)
+                return
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await asyncio.wait_for(self._connection.execute("SELECT 1"), self.health_check)
+            except Exception:
+                return
+
+    async def _supervise(self):
+        delay = self.reconnect_min
+        while True:
+            try:
+                await self._connect()
+            except Exception as e:
+                logger.error(f"Notification listener connect failed, retrying in {delay:.0f}s: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.reconnect_max)
+                continue
+            delay = self.reconnect_min
+            if self.connects > 1:
+                for handler in self.reconnect_handlers:
+                    await self._dispatch(handler, "reconnect")
+            await self._wait_until_lost()
+            logger.warning("Notification listener connection lost, reconnecting")
+            await self._close()
+
+    def _on_notification(self, connection, pid: int, channel: str, payload: str):
+        for handler in self.handlers.get(channel, []):
+            task = asyncio.create_task(self._dispatch(handler, channel, payload))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, handler: Callable[..., Awaitable[None]], channel: str, *args):
+        try:
+            await handler(*args)
+        except Exception as e:
+            logger.error(f"Error handling {channel} notification: {e}")
+
+
+# Shared listener for the API process
+notification_listener = PgNotificationListener()
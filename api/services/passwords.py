@@ -0,0 +1,104 @@
+"""
+Password hashing service
+Runs bcrypt on a small dedicated thread pool so hashing never blocks the
+event loop, and sheds load (PasswordHasherSaturated) once too many hashes
+are already pending
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+import asyncio
+import os
+import time
+
+from passlib.context import CryptContext
+
+from api.metrics import registry
+
+# bcrypt cost factor for new hashes; existing hashes with another cost are
+# upgraded on the next successful login (check with bench_password_hashing)
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Hashes allowed to run or wait at once before callers get PasswordHasherSaturated
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", str(PASSWORD_HASH_WORKERS * 8)))
+
+PASSWORD_HASH_SECONDS = registry.histogram(
+    "hc_password_hash_seconds",
+    "bcrypt hash/verify time on the hashing pool",
+    labels=("operation",)
+)
+PASSWORD_HASH_PENDING = registry.gauge(
+    "hc_password_hash_pending",
+    "bcrypt operations running or queued"
+)
+PASSWORD_HASH_REJECTED = registry.counter(
+    "hc_password_hash_rejected_total",
+    "bcrypt operations rejected because the hashing pool was saturated"
+)
+
+
+def build_context(rounds: int = BCRYPT_ROUNDS) -> CryptContext:
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+
+
+pwd_context = build_context()
+
+
+class PasswordHasherSaturated(Exception):
+    """Raised when the hashing pool already has max_pending operations"""
+
+
+class PasswordHasher:
+    """bcrypt on a bounded thread pool"""
+
+    def __init__(
+        self,
+        context: CryptContext = pwd_context,
+        max_workers: int = PASSWORD_HASH_WORKERS,
+        max_pending: int = PASSWORD_HASH_MAX_PENDING
+    ):
+        self.context = context
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+        # Only touched from the event loop thread
+        self._pending = 0
+
+    def _timed(self, operation: str, fn, *args):
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            PASSWORD_HASH_SECONDS.observe(time.perf_counter() - start, operation)
+
+    async def _run(self, operation: str, fn, *args):
+        if self._pending >= self.max_pending:
+            PASSWORD_HASH_REJECTED.inc()
+            raise PasswordHasherSaturated(f"{self._pending} password operations pending")
+        self._pending += 1
+        PASSWORD_HASH_PENDING.set(self._pending)
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, self._timed, operation, fn, *args)
+        finally:
+            self._pending -= 1
+            PASSWORD_HASH_PENDING.set(self._pending)
+
+    async def hash(self, password: str) -> str:
+        """bcrypt hash at the configured cost"""
+        return await self._run("hash", self.context.hash, password)
+
+    async def verify_and_update(self, password: str, password_hash: str) -> Tuple[bool, Optional[str]]:
+        """(valid, new_hash); new_hash is set when the stored hash uses an outdated cost"""
+        return await self._run("verify", self.context.verify_and_update, password, password_hash)
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def shutdown(self):
+        """Stop the hashing pool"""
+        self._executor.shutdown(wait=False)
+
+
+# Shared hasher for the auth routes
+password_hasher = PasswordHasher()
@@ -0,0 +1,163 @@
+"""
+QR code service
+Renders payment QR codes off the event loop and caches them by address+memo
+"""
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Tuple
+import asyncio
+import base64
+import io
+import os
+import threading
+import time
+
+import qrcode
+import qrcode.image.svg
+
+from api.metrics import registry, timed
+
+QR_CACHE_SIZE = int(os.getenv("QR_CACHE_SIZE", "1024"))
+QR_RENDER_WORKERS = int(os.getenv("QR_RENDER_WORKERS", "2"))
+QR_DEFAULT_FORMAT = os.getenv("QR_DEFAULT_FORMAT", "png")
+
+QR_RENDER_SECONDS = registry.histogram(
+    "hc_qr_render_seconds",
+    "QR render time on the render pool (cache misses only)",
+    labels=("format",)
+)
+QR_CACHE_LOOKUPS = registry.counter(
+    "hc_qr_cache_lookups_total",
+    "QR cache lookups by result",
+    labels=("result",)
+)
+
+
+def _build_qr(content: str) -> qrcode.QRCode:
+    qr = qrcode.QRCode(version=1, box_size=10, border=5)
+    qr.add_data(content)
+    qr.make(fit=True)
+    return qr
+
+
+def render_png(content: str) -> bytes:
+    """Render a QR code as PNG bytes (PIL)"""
+    img = _build_qr(content).make_image(fill_color="black", back_color="white")
+    buff = io.BytesIO()
+    img.save(buff, format="PNG")
+    return buff.getvalue()
+
+
+def render_svg(content: str) -> bytes:
+    """Render a QR code as a single-path SVG (no PIL, smaller payload)"""
+    img = _build_qr(content).make_image(image_factory=qrcode.image.svg.SvgPathImage)
+    buff = io.BytesIO()
+    img.save(buff)
+    return buff.getvalue()
+
+
+# format name -> (mime type, renderer)
+QR_FORMATS: Dict[str, Tuple[str, Callable[[str], bytes]]] = {
+    "png": ("image/png", render_png),
+    "svg": ("image/svg+xml", render_svg),
+}
+
+
+def register_qr_format(name: str, mime: str, renderer: Callable[[str], bytes]):
+    """Register an additional QR output format"""
+    QR_FORMATS[name] = (mime, renderer)
+
+
+def qr_content(address: str, memo: Optional[str] = None) -> str:
+    """Payload encoded in the QR code"""
+    return f"{address}:{memo}" if memo else address
+
+
+class QRService:
+    """LRU-cached QR renderer backed by a thread pool"""
+
+    def __init__(
+        self,
+        cache_size: int = QR_CACHE_SIZE,
+        max_workers: int = QR_RENDER_WORKERS,
+        default_format: str = QR_DEFAULT_FORMAT
+    ):
+        self.cache_size = cache_size
+        self.default_format = default_format
+        self._cache: "OrderedDict[Tuple[str, Optional[str], str], str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="qr-render")
+        self.hits = 0
+        self.misses = 0
+
+    def resolve_format(self, fmt: Optional[str]) -> str:
+        """Normalized format name (default when None); ValueError if unsupported"""
+        fmt = (fmt or self.default_format).lower()
+        if fmt not in QR_FORMATS:
+            raise ValueError(f"Unsupported QR format: {fmt}")
+        return fmt
+
+    def _cached(self, key: Tuple[str, Optional[str], str]) -> Optional[str]:
+        with self._lock:
+            data_url = self._cache.get(key)
+            if data_url is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+        QR_CACHE_LOOKUPS.inc("hit" if data_url is not None else "miss")
+        return data_url
+
+    def _store(self, key: Tuple[str, Optional[str], str], data_url: str):
+        with self._lock:
+            self._cache[key] = data_url
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _render(self, address: str, memo: Optional[str], fmt: str) -> str:
+        mime, renderer = QR_FORMATS[fmt]
+        start = time.perf_counter()
+        encoded = base64.b64encode(renderer(qr_content(address, memo))).decode()
+        QR_RENDER_SECONDS.observe(time.perf_counter() - start, fmt)
+        return f"data:{mime};base64,{encoded}"
+
+    def render_sync(self, address: str, memo: Optional[str] = None, fmt: Optional[str] = None) -> str:
+        """Return a QR data URL, rendering on the calling thread on a cache miss"""
+        fmt = self.resolve_format(fmt)
+        key = (address, memo, fmt)
+        data_url = self._cached(key)
+        if data_url is None:
+            self.misses += 1
+            data_url = self._render(address, memo, fmt)
+            self._store(key, data_url)
+        return data_url
+
+    async def render(self, address: str, memo: Optional[str] = None, fmt: Optional[str] = None) -> str:
+        """Return a QR data URL; cache misses are rendered on the thread pool"""
+        fmt = self.resolve_format(fmt)
+        key = (address, memo, fmt)
+        with timed("qr"):
+            data_url = self._cached(key)
+            if data_url is None:
+                self.misses += 1
+                loop = asyncio.get_running_loop()
+                data_url = await loop.run_in_executor(self._executor, self._render, address, memo, fmt)
+                self._store(key, data_url)
+        return data_url
+
+    def stats(self) -> Dict[str, int]:
+        """Cache counters"""
+        return {
+            "size": len(self._cache),
+            "capacity": self.cache_size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def shutdown(self):
+        """Stop the render pool"""
+        self._executor.shutdown(wait=False)
+
+
+# Shared instance used by the donation routers
+qr_service = QRService()
@@ -0,0 +1,196 @@
+"""
+Read-through response cache
+Caches serialized donation lookups with a TTL, serves ETag/304 for
+unchanged polls, and is invalidated by donation_changes notifications
+"""
+
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+
+from api.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# memory | redis
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory")
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "15"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "10000"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+
+CACHE_LOOKUPS = registry.counter(
+    "hc_response_cache_lookups_total",
+    "Response cache lookups by result",
+    labels=("result",)
+)
+
+# (etag, body)
+CacheEntry = Tuple[str, bytes]
+
+
+def donation_invoice_key(invoice_id: str) -> str:
+    return f"donation:invoice:{invoice_id}"
+
+
+def donation_txid_key(txid: str) -> str:
+    return f"donation:txid:{txid}"
+
+
+class InMemoryCacheBackend:
+    """Per-process TTL + LRU cache"""
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, CacheEntry]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires_at, entry = item
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    async def set(self, key: str, entry: CacheEntry, ttl: float):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, entry)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def delete(self, keys: Iterable[str]):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+
+class RedisCacheBackend:
+    """Cache shared by all API workers (redis.asyncio)"""
+
+    def __init__(self, url: str = REDIS_URL, prefix: str = "hc:response:"):
+        import redis.asyncio as redis
+
+        self.client = redis.from_url(url)
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        value = await self.client.get(self.prefix + key)
+        if value is None:
+            return None
+        etag, _, body = value.partition(b"\n")
+        return etag.decode(), body
+
+    async def set(self, key: str, entry: CacheEntry, ttl: float):
+        etag, body = entry
+        await self.client.set(self.prefix + key, etag.encode() + b"\n" + body, px=int(ttl * 1000))
+
+    async def delete(self, keys: Iterable[str]):
+        keys = [self.prefix + key for key in keys]
+        if keys:
+            await self.client.delete(*keys)
+
+
+class ResponseCache:
+    """TTL response cache with ETag support and request coalescing"""
+
+    def __init__(self, backend=None, ttl: float = RESPONSE_CACHE_TTL):
+        self.backend = backend or InMemoryCacheBackend()
+        self.ttl = ttl
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    @staticmethod
+    def encode(payload: Any) -> CacheEntry:
+        """Serialize a payload once and derive its ETag from the bytes"""
+        body = json.dumps(jsonable_encoder(payload), separators=(",", ":")).encode()
+        etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+        return etag, body
+
+    async def get_or_load(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Optional[Any]]]
+    ) -> Optional[CacheEntry]:
+        """Cached entry for key, loading (once per key across concurrent callers) on a miss"""
+        entry = await self.backend.get(key)
+        if entry is not None:
+            CACHE_LOOKUPS.inc("hit")
+            return entry
+        CACHE_LOOKUPS.inc("miss")
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            payload = await loader()
+            entry = self.encode(payload) if payload is not None else None
+            if entry is not None:
+                await self.backend.set(key, entry, self.ttl)
+            future.set_result(entry)
+            return entry
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark retrieved so waiter-less failures don't log "never retrieved"
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    @staticmethod
+    def respond(entry: CacheEntry, if_none_match: Optional[str]) -> Response:
+        """200 with the cached body, or 304 if the client already has this ETag"""
+        etag, body = entry
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if if_none_match:
+            candidates = {tag.strip() for tag in if_none_match.split(",")}
+            if "*" in candidates or etag in candidates or f"W/{etag}" in candidates:
+                return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    async def invalidate(self, *keys: str):
+        await self.backend.delete(keys)
+
+    async def invalidate_donation(
+        self,
+        invoice_id: Optional[str] = None,
+        txids: Iterable[Optional[str]] = ()
+    ):
+        """Evict cached lookups for a donation"""
+        keys = [donation_txid_key(txid) for txid in txids if txid]
+        if invoice_id:
+            keys.append(donation_invoice_key(invoice_id))
+        await self.invalidate(*keys)
+
+    async def handle_donation_change(self, payload: str):
+        """donation_changes notification handler (payload from notify_donation_changed)"""
+        change = json.loads(payload)
+        await self.invalidate_donation(
+            change.get("invoice_id"),
+            (change.get("txid"), change.get("old_txid"))
+        )
+
+
+def _build_response_cache() -> ResponseCache:
+    if RESPONSE_CACHE_BACKEND == "redis":
+        return ResponseCache(RedisCacheBackend())
+    return ResponseCache()
+
+
+# Shared cache for donation lookups
+response_cache = _build_response_cache()
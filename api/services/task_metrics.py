@@ -0,0 +1,238 @@
+"""
+Celery task metrics
+Workers (and anything that publishes tasks) record queue wait, run time,
+payload size, retries and outcomes per task name into Redis hashes; the
+API mirrors them into its registry so they are served from /metrics next
+to the HTTP metrics.
+"""
+
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import atexit
+import logging
+import os
+import threading
+import time
+
+from api.metrics import Counter, Histogram, registry
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+TASK_METRICS_ENABLED = os.getenv("TASK_METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+# Seconds the API reuses a Redis snapshot between /metrics scrapes
+TASK_METRICS_REFRESH_SECONDS = float(os.getenv("TASK_METRICS_REFRESH_SECONDS", "5"))
+# Seconds publish-side observations are buffered before one pipelined write
+TASK_METRICS_FLUSH_SECONDS = float(os.getenv("TASK_METRICS_FLUSH_SECONDS", "1"))
+
+TASK_SECONDS_BUCKETS = (
+    0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 1800.0
+)
+PAYLOAD_BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+QUEUE_WAIT = registry.histogram(
+    "hc_celery_task_queue_wait_seconds",
+    "Time from publish to a worker starting the task",
+    labels=("task",),
+    buckets=TASK_SECONDS_BUCKETS
+)
+RUNTIME = registry.histogram(
+    "hc_celery_task_runtime_seconds",
+    "Task execution time on the worker",
+    labels=("task", "state"),
+    buckets=TASK_SECONDS_BUCKETS
+)
+PAYLOAD = registry.histogram(
+    "hc_celery_task_payload_bytes",
+    "Serialized task arguments size at publish",
+    labels=("task",),
+    buckets=PAYLOAD_BYTES_BUCKETS
+)
+RETRIES = registry.counter(
+    "hc_celery_task_retries_total",
+    "Task retries",
+    labels=("task",)
+)
+
+HISTOGRAMS: Dict[str, Histogram] = {h.name: h for h in (QUEUE_WAIT, RUNTIME, PAYLOAD)}
+COUNTERS: Dict[str, Counter] = {c.name: c for c in (RETRIES,)}
+
+# Separates label values inside a Redis hash field
+_SEP = "\x1f"
+
+
+class TaskMetricsStore:
+    """Redis hashes of bucket counts/sums shared by all workers and API processes"""
+
+    def __init__(self, url: str = REDIS_URL, prefix: str = "hc:task_metrics:"):
+        import redis
+
+        self.client = redis.from_url(url, socket_timeout=1, socket_connect_timeout=1)
+        self.prefix = prefix
+
+    def observe(self, histogram: Histogram, value: float, *labels: str):
+        label_key = _SEP.join(labels)
+        bucket = bisect_left(histogram.buckets, value)
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hincrby(self.prefix + histogram.name, f"{label_key}|b{bucket}", 1)
+        pipe.hincrbyfloat(self.prefix + histogram.name, f"{label_key}|sum", value)
+        pipe.execute()
+
+    def inc(self, counter: Counter, *labels: str, amount: int = 1):
+        self.client.hincrby(self.prefix + counter.name, _SEP.join(labels), amount)
+
+    def increment(self, fields: Dict[Tuple[str, str], float]):
+        """Apply buffered (metric name, hash field) increments in one round trip"""
+        pipe = self.client.pipeline(transaction=False)
+        for (name, field), amount in fields.items():
+            if field.endswith("|sum"):
+                pipe.hincrbyfloat(self.prefix + name, field, amount)
+            else:
+                pipe.hincrby(self.prefix + name, field, int(amount))
+        pipe.execute()
+
+    def load(self):
+        """Copy every stored series into the local registry metrics"""
+        pipe = self.client.pipeline(transaction=False)
+        names = list(HISTOGRAMS) + list(COUNTERS)
+        for name in names:
+            pipe.hgetall(self.prefix + name)
+        for name, fields in zip(names, pipe.execute()):
+            fields = {k.decode(): v.decode() for k, v in fields.items()}
+            if name in COUNTERS:
+                for label_key, value in fields.items():
+                    COUNTERS[name].set_total(float(value), *label_key.split(_SEP))
+                continue
+            histogram = HISTOGRAMS[name]
+            series: Dict[str, Tuple[List[int], float]] = {}
+            for field, value in fields.items():
+                label_key, _, suffix = field.rpartition("|")
+                counts, total = series.setdefault(label_key, ([0] * (len(histogram.buckets) + 1), 0.0))
+                if suffix == "sum":
+                    series[label_key] = (counts, float(value))
+                else:
+                    counts[int(suffix[1:])] = int(value)
+            for label_key, (counts, total) in series.items():
+                histogram.set_counts(counts, total, *label_key.split(_SEP))
+
+
+class TaskMetricsRecorder:
+    """
+    Records task events; failures to reach Redis never affect the task.
+    Publish-side observations happen inside apply_async, so they are only
+    buffered there and written by a background flusher every
+    TASK_METRICS_FLUSH_SECONDS (and at exit).
+    """
+
+    def __init__(self, store_factory=TaskMetricsStore, flush_interval: float = TASK_METRICS_FLUSH_SECONDS):
+        self._store_factory = store_factory
+        self._store: Optional[TaskMetricsStore] = None
+        self._lock = threading.Lock()
+        self._loaded_at = 0.0
+        self.flush_interval = flush_interval
+        self._buffer: Dict[Tuple[str, str], float] = defaultdict(float)
+        self._buffer_lock = threading.Lock()
+        # Process that owns the flusher thread (threads don't survive fork)
+        self._flusher_pid: Optional[int] = None
+
+    @property
+    def store(self) -> TaskMetricsStore:
+        if self._store is None:
+            with self._lock:
+                if self._store is None:
+                    self._store = self._store_factory()
+        return self._store
+
+    def _safely(self, fn, *args, **kwargs):
+        if not TASK_METRICS_ENABLED:
+            return
+        try:
+            fn(*args, **kwargs)
+        except Exception as e:
+            logger.debug(f"Task metrics unavailable: {e}")
+
+    def _buffer_observe(self, histogram: Histogram, value: float, *labels: str):
+        label_key = _SEP.join(labels)
+        bucket = bisect_left(histogram.buckets, value)
+        with self._buffer_lock:
+            self._ensure_flusher()
+            self._buffer[(histogram.name, f"{label_key}|b{bucket}")] += 1
+            self._buffer[(histogram.name, f"{label_key}|sum")] += value
+
+    def _ensure_flusher(self):
+        """Start the flusher in this process (called with _buffer_lock held)"""
+        pid = os.getpid()
+        if self._flusher_pid == pid:
+            return
+        if self._flusher_pid is not None:
+            # Forked child: the parent flushes what it buffered
+            self._buffer.clear()
+        else:
+            atexit.register(self.flush)
+        self._flusher_pid = pid
+        threading.Thread(target=self._flush_loop, name="task-metrics-flush", daemon=True).start()
+
+    def _flush_loop(self):
+        pid = os.getpid()
+        while self._flusher_pid == pid:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        """Write buffered observations (dropped if Redis is unreachable)"""
+        with self._buffer_lock:
+            if not self._buffer:
+                return
+            fields, self._buffer = self._buffer, defaultdict(float)
+        self._safely(self.store.increment, fields)
+
+    def published(self, task: str, payload_bytes: int):
+        if TASK_METRICS_ENABLED:
+            self._buffer_observe(PAYLOAD, payload_bytes, task)
+
+    def started(self, task: str, queue_wait: Optional[float]):
+        if queue_wait is not None:
+            self._safely(self.store.observe, QUEUE_WAIT, max(queue_wait, 0.0), task)
+
+    def finished(self, task: str, state: str, runtime: float):
+        self._safely(self.store.observe, RUNTIME, runtime, task, state)
+
+    def retried(self, task: str):
+        self._safely(self.store.inc, RETRIES, task)
+
+    def collect(self):
+        """Registry collector for the API: refresh mirrored series (rate limited)"""
+        now = time.monotonic()
+        if now - self._loaded_at < TASK_METRICS_REFRESH_SECONDS:
+            return
+        self._loaded_at = now
+        self._safely(self.store.load)
+
+
+def task_summary(quantiles: Sequence[float] = (0.5, 0.95, 0.99)) -> Dict[str, Dict[str, Any]]:
+    """Per-task counts and percentile estimates from the mirrored histograms"""
+    summary: Dict[str, Dict[str, Any]] = {}
+
+    def entry(task: str) -> Dict[str, Any]:
+        return summary.setdefault(task, {"states": {}, "retries": 0})
+
+    def percentiles(histogram: Histogram, *labels: str) -> Dict[str, Optional[float]]:
+        return {
+            f"p{int(q * 100)}": (round(v, 4) if (v := histogram.quantile(q, *labels)) is not None else None)
+            for q in quantiles
+        }
+
+    for (task,), (counts, _) in QUEUE_WAIT.snapshot().items():
+        entry(task)["queue_wait_seconds"] = {"count": sum(counts), **percentiles(QUEUE_WAIT, task)}
+    for (task, state), (counts, _) in RUNTIME.snapshot().items():
+        entry(task)["states"][state] = {"count": sum(counts), **percentiles(RUNTIME, task, state)}
+    for (task,), (counts, _) in PAYLOAD.snapshot().items():
+        entry(task)["payload_bytes"] = {"count": sum(counts), **percentiles(PAYLOAD, task)}
+    for (task,), value in RETRIES.snapshot().items():
+        entry(task)["retries"] = int(value)
+    return summary
+
+
+# Shared recorder (workers record, the API collects)
+task_metrics = TaskMetricsRecorder()
@@ -0,0 +1,110 @@
+"""
+Wallet address pool
+Active receiving addresses per chain, loaded at startup and handed out
+without a database round trip
+"""
+
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import logging
+import os
+import threading
+
+from api.database import AsyncSessionLocal
+from api.statements import statements
+
+logger = logging.getLogger(__name__)
+
+# round_robin | lru
+WALLET_POOL_STRATEGY = os.getenv("WALLET_POOL_STRATEGY", "round_robin")
+
+# Channel notified by the wallets trigger in 08_crypto_treasury.sql (payload: chain)
+WALLETS_CHANNEL = "wallets_changed"
+
+SELECT_ACTIVE_WALLETS = statements.register("wallet_pool.select_active", """
+    SELECT chain, address FROM wallets
+    WHERE active = true
+    ORDER BY created_at, address
+""")
+
+SELECT_ACTIVE_WALLETS_FOR_CHAIN = statements.register("wallet_pool.select_active_for_chain", """
+    SELECT chain, address FROM wallets
+    WHERE active = true AND chain = :chain
+    ORDER BY created_at, address
+""")
+
+
+class WalletPool:
+    """In-memory rotation over active wallet addresses"""
+
+    STRATEGIES = ("round_robin", "lru")
+
+    def __init__(self, strategy: str = WALLET_POOL_STRATEGY):
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"Unknown wallet pool strategy: {strategy}")
+        self.strategy = strategy
+        self._addresses: Dict[str, List[str]] = {}
+        self._cursors: Dict[str, int] = {}
+        self._lru: Dict[str, "OrderedDict[str, None]"] = {}
+        self._lock = threading.Lock()
+
+    def _replace(self, chain: str, addresses: List[str]):
+        with self._lock:
+            if not addresses:
+                self._addresses.pop(chain, None)
+                self._cursors.pop(chain, None)
+                self._lru.pop(chain, None)
+                return
+            self._addresses[chain] = addresses
+            self._cursors[chain] = self._cursors.get(chain, 0) % len(addresses)
+            # Keep usage order for surviving addresses; new ones go first
+            previous = self._lru.get(chain, OrderedDict())
+            order = OrderedDict((a, None) for a in addresses if a not in previous)
+            order.update((a, None) for a in previous if a in addresses)
+            self._lru[chain] = order
+
+    async def load(self, chain: Optional[str] = None):
+        """Load active addresses for all chains (or one chain) from the database"""
+        async with AsyncSessionLocal() as db:
+            if chain:
+                result = await statements.execute(db, SELECT_ACTIVE_WALLETS_FOR_CHAIN, {"chain": chain})
+            else:
+                result = await statements.execute(db, SELECT_ACTIVE_WALLETS)
+            rows = result.fetchall()
+
+        loaded: Dict[str, List[str]] = {}
+        for row_chain, address in rows:
+            loaded.setdefault(row_chain.lower(), []).append(address)
+
+        chains = [chain.lower()] if chain else set(loaded) | set(self._addresses)
+        for name in chains:
+            self._replace(name, loaded.get(name, []))
+        logger.info(f"Wallet pool loaded {len(rows)} addresses")
+
+    async def handle_notification(self, payload: str):
+        """Refresh on wallets_changed; payload is the affected chain"""
+        await self.load(payload or None)
+
+    def acquire(self, chain: str) -> Optional[str]:
+        """Next address for a chain, or None if the chain has no active wallets"""
+        chain = chain.lower()
+        with self._lock:
+            addresses = self._addresses.get(chain)
+            if not addresses:
+                return None
+            if self.strategy == "lru":
+                order = self._lru[chain]
+                address = next(iter(order))
+                order.move_to_end(address)
+                return address
+            cursor = self._cursors[chain]
+            self._cursors[chain] = (cursor + 1) % len(addresses)
+            return addresses[cursor]
+
+    def stats(self) -> Dict[str, int]:
+        """Active address count per chain"""
+        return {chain: len(addresses) for chain, addresses in self._addresses.items()}
+
+
+# Shared pool used by both donation routers
+wallet_pool = WalletPool()
@@ -0,0 +1,82 @@
+"""
+Webhook ingestion
+Stores each delivery once, keyed by a hash of its raw body, so provider
+retries are acknowledged without being stored or processed again.
+Processing happens later in the webhook consumer task.
+"""
+
+from typing import Any, Dict, Optional, Tuple
+import hashlib
+import json
+import uuid
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.metrics import registry
+from api.statements import statements
+
+WEBHOOKS_INGESTED = registry.counter(
+    "hc_webhooks_ingested_total",
+    "Webhook deliveries accepted, by provider and whether they were duplicates",
+    labels=("provider", "duplicate")
+)
+
+INSERT_WEBHOOK = statements.register("webhooks.insert", """
+    INSERT INTO webhooks (
+        id, provider, event_type, payload, idempotency_key, received_at, processed
+    ) VALUES (
+        :id, :provider, :event_type, CAST(:payload AS jsonb), :idempotency_key, NOW(), false
+    )
+    ON CONFLICT (provider, idempotency_key) DO NOTHING
+    RETURNING id
+""")
+
+SELECT_WEBHOOK_BY_KEY = statements.register("webhooks.select_by_idempotency_key", """
+    SELECT id FROM webhooks
+    WHERE provider = :provider AND idempotency_key = :idempotency_key
+""")
+
+
+def idempotency_key(body: bytes) -> str:
+    """sha256 of the raw request body"""
+    return hashlib.sha256(body).hexdigest()
+
+
+def event_type_of(payload: Any) -> Optional[str]:
+    """Event name from the common payload shapes ({"event": ...} / {"type": ...})"""
+    if isinstance(payload, dict):
+        event = payload.get("event") or payload.get("type")
+        return str(event) if event is not None else None
+    return None
+
+
+async def ingest_webhook(
+    db: AsyncSession,
+    provider: str,
+    body: bytes,
+    payload: Optional[Any] = None
+) -> Tuple[str, bool]:
+    """
+    Store a webhook delivery for asynchronous processing.
+    Returns (webhook_id, duplicate); duplicates return the original row's id.
+    """
+    if payload is None:
+        payload = json.loads(body)
+    key = idempotency_key(body)
+    params: Dict[str, Any] = {"provider": provider, "idempotency_key": key}
+
+    result = await statements.execute(db, INSERT_WEBHOOK, {
+        **params,
+        "id": str(uuid.uuid4()),
+        "event_type": event_type_of(payload),
+        "payload": json.dumps(payload),
+    })
+    webhook_id = result.scalar()
+    duplicate = webhook_id is None
+    if duplicate:
+        result = await statements.execute(db, SELECT_WEBHOOK_BY_KEY, params)
+        webhook_id = result.scalar()
+    await db.commit()
+
+    WEBHOOKS_INGESTED.inc(provider, "true" if duplicate else "false")
+    return str(webhook_id), duplicate
@@ -0,0 +1,109 @@
+"""
+HMAC request signing
+One verifier per provider holding pre-keyed HMAC objects, so each check
+is a copy() + update() over the raw body instead of re-reading the secret
+and re-deriving the key. Secrets can be rotated by listing the new and
+previous secret together.
+"""
+
+from typing import Dict, Iterable, List, Optional, Union
+import hashlib
+import hmac
+import os
+import threading
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+# Shared secret used by providers without their own WEBHOOK_SECRET_<PROVIDER>
+DEFAULT_SECRET_ENV = "WEBHOOK_SECRET"
+# Providers accepted with the shared secret; a provider with its own
+# WEBHOOK_SECRET_<PROVIDER> is accepted whether listed or not
+WEBHOOK_PROVIDERS = frozenset(
+    p.strip().lower() for p in os.getenv("WEBHOOK_PROVIDERS", "nowpayments,stripe").split(",") if p.strip()
+)
+
+
+def provider_allowed(provider: str) -> bool:
+    """True for listed providers and providers with their own secret"""
+    provider = provider.lower()
+    return provider in WEBHOOK_PROVIDERS or os.getenv(f"{DEFAULT_SECRET_ENV}_{provider.upper()}") is not None
+
+
+def provider_secrets(provider: str) -> List[str]:
+    """
+    Secrets accepted for a provider, newest first.
+    WEBHOOK_SECRET_<PROVIDER> (or WEBHOOK_SECRET) may hold a comma-separated
+    list, e.g. "new,old" while a rotation is rolled out to senders.
+    """
+    raw = os.getenv(f"{DEFAULT_SECRET_ENV}_{provider.upper()}")
+    if raw is None:
+        raw = os.getenv(DEFAULT_SECRET_ENV, "")
+    secrets = [s.strip() for s in raw.split(",") if s.strip()]
+    # An unset secret keys with b"" (previous behaviour of the API verifiers)
+    return secrets or [""]
+
+
+class HmacVerifier:
+    """Verifies hex HMAC signatures against one or more pre-keyed secrets"""
+
+    def __init__(self, secrets: Iterable[str], digestmod=hashlib.sha256):
+        secrets = list(secrets) or [""]
+        self.configured = any(secrets)
+        self._keyed = [hmac.new(s.encode(), digestmod=digestmod) for s in secrets]
+
+    def sign(self, body: Buffer) -> str:
+        """Hex signature of body with the current (first) secret"""
+        mac = self._keyed[0].copy()
+        mac.update(body)
+        return mac.hexdigest()
+
+    def verify(self, body: Buffer, signature: Optional[str]) -> bool:
+        """True if signature matches body under any accepted secret"""
+        if not signature:
+            return False
+        signature = signature.strip()
+        # Accept GitHub/Stripe style "sha256=<hex>"
+        if "=" in signature:
+            signature = signature.split("=", 1)[1]
+        matched = False
+        for keyed in self._keyed:
+            mac = keyed.copy()
+            mac.update(body)
+            # Compare against every secret so timing doesn't reveal which matched
+            matched |= hmac.compare_digest(mac.hexdigest(), signature)
+        return matched
+
+
+_verifiers: Dict[str, HmacVerifier] = {}
+_lock = threading.Lock()
+
+
+def get_verifier(provider: str) -> Optional[HmacVerifier]:
+    """
+    Cached verifier for a provider (built from the environment on first use),
+    or None for providers that aren't allowed or have no secret. Only
+    configured verifiers are cached, so arbitrary names can't grow the cache.
+    """
+    provider = provider.lower()
+    verifier = _verifiers.get(provider)
+    if verifier is None:
+        if not provider_allowed(provider):
+            return None
+        verifier = HmacVerifier(provider_secrets(provider))
+        if not verifier.configured:
+            return None
+        with _lock:
+            verifier = _verifiers.setdefault(provider, verifier)
+    return verifier
+
+
+def reload_verifiers():
+    """Drop cached verifiers so rotated secrets are picked up from the environment"""
+    with _lock:
+        _verifiers.clear()
+
+
+def verify_signature(provider: str, body: Buffer, signature: Optional[str]) -> bool:
+    """Verify a provider's HMAC signature over the raw request body"""
+    verifier = get_verifier(provider)
+    return verifier is not None and verifier.verify(body, signature)
@@ -0,0 +1,90 @@
+"""
+Named SQL statement registry
+Compiles raw SQL once per process and counts lookups and per-connection
+first uses (asyncpg keeps the actual prepared statements in its own
+per-connection cache, see PREPARED_STATEMENT_CACHE_SIZE in api/database.py)
+"""
+
+from sqlalchemy import text
+from sqlalchemy.engine import Result
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.elements import TextClause
+from typing import Any, Dict, Optional
+import threading
+
+# Key in the pooled connection's info dict holding the statement names
+# already executed on that connection (cleared by the pool on reconnect)
+USED_INFO_KEY = "hc_used_statements"
+
+COUNTER_NAMES = ("lookups", "connection_first_uses", "connection_reuses")
+
+
+class StatementRegistry:
+    """Registry of named raw SQL statements"""
+
+    def __init__(self):
+        self._statements: Dict[str, TextClause] = {}
+        self._sql: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[str, int]] = {}
+
+    def register(self, name: str, sql: str) -> str:
+        """Compile a statement once and register it under a name"""
+        with self._lock:
+            if name in self._sql:
+                if self._sql[name] != sql:
+                    raise ValueError(f"Statement {name} already registered with different SQL")
+                return name
+            self._statements[name] = text(sql)
+            self._sql[name] = sql
+            self._counters[name] = dict.fromkeys(COUNTER_NAMES, 0)
+        return name
+
+    def get(self, name: str) -> TextClause:
+        """Return the compiled statement for a name"""
+        try:
+            statement = self._statements[name]
+        except KeyError:
+            raise KeyError(f"Statement {name} is not registered")
+        self._counters[name]["lookups"] += 1
+        return statement
+
+    async def execute(
+        self,
+        db: AsyncSession,
+        name: str,
+        params: Optional[Dict[str, Any]] = None
+    ) -> Result:
+        """Execute a named statement on the session's pooled connection"""
+        statement = self.get(name)
+        conn = await db.connection()
+        used = conn.info.setdefault(USED_INFO_KEY, set())
+        if name in used:
+            self._counters[name]["connection_reuses"] += 1
+        else:
+            self._counters[name]["connection_first_uses"] += 1
+            used.add(name)
+        return await db.execute(statement, params or {})
+
+    def stats(self) -> Dict[str, Any]:
+        """Lookup and per-connection use counters, totalled and per statement"""
+        totals = dict.fromkeys(COUNTER_NAMES, 0)
+        per_statement = {}
+        for name, counters in self._counters.items():
+            per_statement[name] = dict(counters)
+            for key, value in counters.items():
+                totals[key] += value
+        return {
+            "statements": len(self._statements),
+            **totals,
+            "per_statement": per_statement,
+        }
+
+    def reset_stats(self):
+        """Reset all counters (statements stay registered)"""
+        for counters in self._counters.values():
+            counters.update(dict.fromkeys(COUNTER_NAMES, 0))
+
+
+# Process-wide registry shared by all routers
+statements = StatementRegistry()
@@ -0,0 +1,108 @@
+"""
+Unit Tests for JWT verification
+TokenCache expiry at the token's exp and decode_token caching, plus the
+/auth/me profile TTLCache
+"""
+
+from unittest import mock
+import time
+import unittest
+
+from fastapi import HTTPException
+from jose import jwt
+
+from api import auth
+from api.auth import ALGORITHM, SECRET_KEY, TokenCache, decode_token, token_cache
+from api.services.user_cache import TTLCache
+
+
+def _token(**claims) -> str:
+    claims.setdefault("sub", "user-1")
+    return jwt.encode(claims, SECRET_KEY, algorithm=ALGORITHM)
+
+
+class TestTokenCache(unittest.TestCase):
+    """Test the decoded-claims cache"""
+
+    def test_entry_expires_at_exp(self):
+        """Test claims are served until exp and dropped from then on"""
+        cache = TokenCache()
+        cache.set("t", {"sub": "u", "exp": 1000})
+        with mock.patch("api.auth.time.time", return_value=999.5):
+            self.assertEqual(cache.get("t"), {"sub": "u", "exp": 1000})
+        with mock.patch("api.auth.time.time", return_value=1000.0):
+            self.assertIsNone(cache.get("t"))
+        self.assertEqual(len(cache._entries), 0)
+
+    def test_token_without_exp_not_cached(self):
+        """Test tokens that never expire are not cached"""
+        cache = TokenCache()
+        cache.set("t", {"sub": "u"})
+        self.assertIsNone(cache.get("t"))
+
+    def test_lru_bound(self):
+        """Test the least recently used token is evicted past max_entries"""
+        cache = TokenCache(max_entries=2)
+        exp = time.time() + 60
+        for token in ("a", "b"):
+            cache.set(token, {"sub": token, "exp": exp})
+        cache.get("a")
+        cache.set("c", {"sub": "c", "exp": exp})
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("a"))
+
+
+class TestDecodeToken(unittest.TestCase):
+    """Test decode_token against the shared cache"""
+
+    def setUp(self):
+        token_cache.clear()
+        self.addCleanup(token_cache.clear)
+
+    def test_cached_until_exp(self):
+        """Test a valid token is decoded once and re-verified after it expires"""
+        exp = int(time.time()) + 60
+        token = _token(exp=exp)
+        with mock.patch.object(auth.jwt, "decode", wraps=auth.jwt.decode) as decode:
+            self.assertEqual(decode_token(token)["sub"], "user-1")
+            self.assertEqual(decode_token(token)["sub"], "user-1")
+            self.assertEqual(decode.call_count, 1)
+            with mock.patch("api.auth.time.time", return_value=exp):
+                # The cache misses at exp, and jose rejects the expired token
+                with mock.patch("jose.jwt.timegm", return_value=exp + 1):
+                    with self.assertRaises(HTTPException) as raised:
+                        decode_token(token)
+            self.assertEqual(raised.exception.status_code, 401)
+            self.assertEqual(decode.call_count, 2)
+
+    def test_invalid_tokens_rejected(self):
+        """Test bad signatures and tokens without sub are 401 and not cached"""
+        forged = jwt.encode({"sub": "u", "exp": time.time() + 60}, "other", algorithm=ALGORITHM)
+        no_sub = jwt.encode({"exp": time.time() + 60}, SECRET_KEY, algorithm=ALGORITHM)
+        for token in (forged, no_sub, "garbage"):
+            with self.assertRaises(HTTPException) as raised:
+                decode_token(token)
+            self.assertEqual(raised.exception.status_code, 401)
+            self.assertIsNone(token_cache.get(token))
+
+
+class TestTTLCache(unittest.TestCase):
+    """Test the profile cache"""
+
+    def test_expiry_and_delete(self):
+        """Test entries expire after ttl and can be evicted early"""
+        cache: "TTLCache[str, dict]" = TTLCache(ttl=30, max_entries=10)
+        with mock.patch("api.services.user_cache.time.monotonic", return_value=100.0):
+            cache.set("a", {"id": "a"})
+            cache.set("b", {"id": "b"})
+        with mock.patch("api.services.user_cache.time.monotonic", return_value=129.9):
+            self.assertEqual(cache.get("a"), {"id": "a"})
+            cache.delete("b")
+            self.assertIsNone(cache.get("b"))
+        with mock.patch("api.services.user_cache.time.monotonic", return_value=130.0):
+            self.assertIsNone(cache.get("a"))
+        self.assertEqual(len(cache), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+"""
+Integration Tests for the donation confirmation poller
+poll_pending_confirmations / apply_confirmations against a seeded
+FakeChainClient and the database at DATABASE_URL (skipped when unreachable)
+"""
+
+import unittest
+import uuid
+
+from sqlalchemy import text
+
+from api.database import engine
+from api.workers import tasks
+from api.workers.chain_clients import TX_FAILED, FakeChainClient, register_chain_client
+
+
+def _database_available() -> bool:
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT pipeline_dispatched_at FROM donations LIMIT 0"))
+        return True
+    except Exception:
+        return False
+
+
+@unittest.skipUnless(_database_available(), "donations table not reachable at DATABASE_URL")
+class TestConfirmationPoller(unittest.TestCase):
+    """Test bulk confirmation updates driven by a fake chain"""
+
+    def setUp(self):
+        # A chain of its own so other pending donations in the database don't interfere
+        self.chain = f"testchain{uuid.uuid4().hex[:8]}"
+        self.required = tasks.DEFAULT_REQUIRED_CONFIRMATIONS
+        self.fake = FakeChainClient(self.chain, max_batch_size=2)
+        register_chain_client(self.chain, self.fake)
+        self.ids = {}
+
+    def tearDown(self):
+        with engine.begin() as conn:
+            conn.execute(text("DELETE FROM donations WHERE chain = :chain"), {"chain": self.chain})
+
+    def _donation(self, txid: str, status: str = "pending") -> str:
+        donation_id = str(uuid.uuid4())
+        with engine.begin() as conn:
+            conn.execute(text("""
+                INSERT INTO donations (id, chain, token, amount_crypto, amount_usd, to_address, status, txid)
+                VALUES (:id, :chain, 'TEST', 1, 5, 'addr', :status, :txid)
+            """), {"id": donation_id, "chain": self.chain, "status": status, "txid": txid})
+        self.ids[txid] = donation_id
+        return donation_id
+
+    def _row(self, txid: str):
+        with engine.connect() as conn:
+            return conn.execute(text("""
+                SELECT status, confirmations, pipeline_dispatched_at
+                FROM donations WHERE id = :id
+            """), {"id": self.ids[txid]}).one()
+
+    def test_poll_confirms_in_batches(self):
+        """Test txids are looked up in client-sized batches and only final ones confirm"""
+        for txid in ("a", "b", "c", "d", "e"):
+            self._donation(txid)
+        self.fake.set("a", self.required)
+        self.fake.set("b", self.required - 1)
+        self.fake.set("c", TX_FAILED)
+        self.fake.set("d", self.required + 3)
+
+        confirmed = tasks.poll_pending_confirmations()
+
+        self.assertEqual(sorted(confirmed[self.chain]), sorted([self.ids["a"], self.ids["d"]]))
+        self.assertEqual(self.fake.calls, 3)
+        self.assertEqual(self._row("a").status, "confirmed")
+        self.assertIsNotNone(self._row("a").pipeline_dispatched_at)
+        self.assertEqual(tuple(self._row("b")[:2]), ("pending", self.required - 1))
+        self.assertIsNone(self._row("b").pipeline_dispatched_at)
+        self.assertEqual(tuple(self._row("c")[:2]), ("failed", 0))
+        # Unknown to the chain yet: untouched
+        self.assertEqual(tuple(self._row("e")[:2]), ("pending", 0))
+
+    def test_poll_confirms_after_blocks_are_mined(self):
+        """Test a pending donation confirms once the chain advances past the threshold"""
+        self._donation("slow")
+        self.fake.set("slow", self.required - 2)
+        self.assertEqual(tasks.poll_pending_confirmations()[self.chain], [])
+        self.fake.advance(2)
+        self.assertEqual(tasks.poll_pending_confirmations()[self.chain], [self.ids["slow"]])
+        # Already confirmed: not reported again
+        self.fake.advance(1)
+        self.assertNotIn(self.chain, tasks.poll_pending_confirmations())
+
+    def test_apply_confirmations_only_touches_pending(self):
+        """Test donations that already left 'pending' keep their status"""
+        self._donation("held", status="flagged")
+        self._donation("fresh")
+        confirmed = tasks.apply_confirmations(self.chain, {"held": self.required, "fresh": self.required})
+        self.assertEqual(confirmed, [self.ids["fresh"]])
+        self.assertEqual(self._row("held").status, "flagged")
+
+    def test_auto_mining_fake_confirms_without_seeding(self):
+        """Test the CHAIN_CLIENT_MODE=fake client confirms anything polled often enough"""
+        register_chain_client(self.chain, FakeChainClient(self.chain, auto_mine=self.required // 2 + 1))
+        self._donation("unseeded")
+        self.assertEqual(tasks.poll_pending_confirmations()[self.chain], [])
+        self.assertEqual(tasks.poll_pending_confirmations()[self.chain], [self.ids["unseeded"]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,149 @@
+"""
+Tests for POST /v1/donations/bulk
+Body parsing, row validation before address assignment, the COPY records,
+and (against DATABASE_URL, skipped when unreachable) the COPY itself
+"""
+
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+import asyncio
+import json
+import unittest
+import uuid
+
+import httpx
+from fastapi import FastAPI, HTTPException
+from sqlalchemy import text
+
+from api.database import async_engine, engine
+from api.routers import donations
+from api.routers.donations import (
+    BULK_COPY_COLUMNS, DonationCreate, bulk_copy_record, parse_bulk_body, validate_bulk_rows
+)
+from api.services.wallet_pool import wallet_pool
+
+
+def _app() -> FastAPI:
+    app = FastAPI()
+    app.include_router(donations.router, prefix="/v1/donations")
+    return app
+
+
+def _row(**overrides):
+    row = {"chain": "ethereum", "token": "ETH", "amount_crypto": 0.5, "amount_usd": 1500.25}
+    row.update(overrides)
+    return row
+
+
+def _database_available() -> bool:
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1 FROM donations LIMIT 0"))
+        return True
+    except Exception:
+        return False
+
+
+class TestBulkParsing(unittest.TestCase):
+    """Test body parsing and per-row validation"""
+
+    def test_json_array_and_ndjson(self):
+        """Test both body formats parse to the same rows, skipping blank NDJSON lines"""
+        rows = [_row(), _row(chain="bitcoin")]
+        self.assertEqual(parse_bulk_body(json.dumps(rows).encode()), rows)
+        ndjson = b"\n".join(json.dumps(r).encode() for r in rows)
+        self.assertEqual(parse_bulk_body(b"\n" + ndjson.replace(b"\n", b"\n\n") + b"\n"), rows)
+
+    def test_invalid_ndjson_reports_line(self):
+        """Test a broken NDJSON line is a 400 naming the line"""
+        with self.assertRaises(HTTPException) as raised:
+            parse_bulk_body(json.dumps(_row()).encode() + b"\n{not json")
+        self.assertEqual(raised.exception.status_code, 400)
+        self.assertIn("line 2", raised.exception.detail)
+
+    def test_rows_rejected_individually(self):
+        """Test invalid rows and unsupported QR formats are rejected while the rest are accepted"""
+        rows = [_row(), {"chain": "ethereum"}, _row(qr_format="gif"), _row(amount_usd="lots"), "scalar"]
+        results, accepted = validate_bulk_rows(rows)
+        self.assertEqual([index for index, _ in accepted], [0])
+        self.assertIsNone(results[0])
+        self.assertEqual([r["status"] for r in results[1:]], ["rejected"] * 4)
+        self.assertIn("gif", results[2]["errors"][0]["msg"])
+        self.assertEqual(results[3]["errors"][0]["loc"], ("amount_usd",))
+
+
+class TestBulkCopyRecord(unittest.TestCase):
+    """Test the generated COPY rows"""
+
+    def test_record_matches_columns(self):
+        """Test values line up with BULK_COPY_COLUMNS with str ids and float amounts"""
+        donation = DonationCreate(**_row(to_address="0xabc", donor_email="d@example.com", memo="m"))
+        donation_id = str(uuid.uuid4())
+        now = datetime(2026, 3, 1, 12, 0, tzinfo=timezone.utc)
+        record = dict(zip(BULK_COPY_COLUMNS, bulk_copy_record(donation, donation_id, "INV-1", now)))
+        self.assertEqual(len(record), len(BULK_COPY_COLUMNS))
+        self.assertEqual((record["id"], record["_id"]), (donation_id, donation_id))
+        self.assertEqual((record["amount_crypto"], record["amount_usd"]), (0.5, 1500.25))
+        self.assertEqual(record["status"], "created")
+        self.assertEqual(json.loads(record["metadata"]), {"source": "api", "invoice_id": "INV-1"})
+
+    def test_timestamps(self):
+        """Test created_at stays aware and the Wix columns are the same instant as naive UTC"""
+        donation = DonationCreate(**_row(to_address="0xabc"))
+        now = datetime(2026, 3, 1, 14, 0, tzinfo=timezone(timedelta(hours=2)))
+        record = dict(zip(BULK_COPY_COLUMNS, bulk_copy_record(donation, "id", "INV-1", now)))
+        self.assertIs(record["created_at"], now)
+        self.assertIsNone(record["_createdDate"].tzinfo)
+        self.assertEqual(record["_createdDate"], datetime(2026, 3, 1, 12, 0))
+        self.assertEqual(record["_updatedDate"], record["_createdDate"])
+
+
+class TestBulkEndpoint(unittest.IsolatedAsyncioTestCase):
+    """Test address assignment and the COPY through the endpoint"""
+
+    async def asyncTearDown(self):
+        await async_engine.dispose()
+
+    async def _post(self, rows):
+        transport = httpx.ASGITransport(app=_app())
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/v1/donations/bulk", content=json.dumps(rows))
+
+    async def test_rejected_rows_take_no_address(self):
+        """Test a batch of invalid rows never touches the wallet pool or the database"""
+        with mock.patch.object(wallet_pool, "acquire", wraps=wallet_pool.acquire) as acquire:
+            response = await self._post([{"chain": "ethereum"}, _row(qr_format="gif")])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["rejected"], 2)
+        acquire.assert_not_called()
+
+    @unittest.skipUnless(_database_available(), "donations table not reachable at DATABASE_URL")
+    async def test_copy_writes_accepted_rows(self):
+        """Test accepted rows are copied with their types intact and only they get addresses"""
+        chain = f"testbulk{uuid.uuid4().hex[:8]}"
+        rows = [_row(chain=chain), {"chain": chain}, _row(chain=chain, qr_format="gif"), _row(chain=chain, memo="m")]
+        try:
+            with mock.patch.object(wallet_pool, "acquire", wraps=wallet_pool.acquire) as acquire:
+                response = await self._post(rows)
+            body = response.json()
+            self.assertEqual((body["created"], body["rejected"]), (2, 2))
+            self.assertEqual(acquire.call_count, 2)
+            with engine.connect() as conn:
+                stored = conn.execute(text("""
+                    SELECT amount_crypto, amount_usd, status, invoice_id,
+                           "_createdDate" = (created_at AT TIME ZONE 'UTC') AS same_instant
+                    FROM donations WHERE chain = :chain ORDER BY memo NULLS FIRST
+                """), {"chain": chain}).fetchall()
+            self.assertEqual([(float(r[0]), float(r[1]), r[2]) for r in stored], [(0.5, 1500.25, "created")] * 2)
+            self.assertEqual(
+                sorted(r[3] for r in stored),
+                sorted(body["results"][i]["invoice_id"] for i in (0, 3))
+            )
+            self.assertTrue(all(r[4] for r in stored))
+        finally:
+            with engine.begin() as conn:
+                conn.execute(text("DELETE FROM donations WHERE chain = :chain"), {"chain": chain})
+
+
+if __name__ == "__main__":
+    unittest.main()
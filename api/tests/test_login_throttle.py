@@ -0,0 +1,104 @@
+"""
+Tests for login throttling
+Lockouts on the in-memory backend, and (against DATABASE_URL, skipped when
+unreachable) batched failure flushes racing a successful login
+"""
+
+from unittest import mock
+import unittest
+import uuid
+
+from sqlalchemy import text
+
+from api.database import async_engine, engine
+from api.routers.auth import RECORD_SUCCESSFUL_LOGIN
+from api.services import login_throttle as throttle_module
+from api.services.login_throttle import InMemoryThrottleBackend, LoginThrottle
+from api.statements import statements
+
+
+def _database_available() -> bool:
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT failed_login_attempts, last_login FROM user_authentication LIMIT 0"))
+        return True
+    except Exception:
+        return False
+
+
+class TestLockouts(unittest.IsolatedAsyncioTestCase):
+    """Test per-email and per-address lockouts"""
+
+    async def test_email_locked_after_limit(self):
+        """Test an email is locked once it reaches LOGIN_MAX_FAILURES and cleared by a success"""
+        throttle = LoginThrottle(InMemoryThrottleBackend())
+        with mock.patch.object(throttle_module, "LOGIN_MAX_FAILURES", 2):
+            await throttle.record_failure("A@example.com", "203.0.113.1")
+            self.assertEqual(await throttle.retry_after("a@example.com"), 0)
+            await throttle.record_failure("a@example.com", "203.0.113.2")
+        self.assertGreater(await throttle.retry_after("a@example.com"), 0)
+        self.assertEqual(await throttle.retry_after("b@example.com", "203.0.113.1"), 0)
+        await throttle.record_success("a@example.com")
+        self.assertEqual(await throttle.retry_after("a@example.com"), 0)
+
+    async def test_address_locked_across_emails(self):
+        """Test one address failing against many emails is locked on its own"""
+        throttle = LoginThrottle(InMemoryThrottleBackend())
+        with mock.patch.object(throttle_module, "LOGIN_MAX_FAILURES_PER_IP", 3):
+            for n in range(3):
+                await throttle.record_failure(f"user{n}@example.com", "198.51.100.7")
+        self.assertGreater(await throttle.retry_after("new@example.com", "198.51.100.7"), 0)
+        self.assertEqual(await throttle.retry_after("new@example.com", "198.51.100.8"), 0)
+
+
+@unittest.skipUnless(_database_available(), "user_authentication not reachable at DATABASE_URL")
+class TestFailureFlush(unittest.IsolatedAsyncioTestCase):
+    """Test batched failure counts against user_authentication"""
+
+    def setUp(self):
+        self.user_id = str(uuid.uuid4())
+        with engine.begin() as conn:
+            conn.execute(text("""
+                INSERT INTO user_authentication (user_id, username, password_hash)
+                VALUES (:user_id, :username, 'x')
+            """), {"user_id": self.user_id, "username": f"throttle-{self.user_id}"})
+
+    def tearDown(self):
+        with engine.begin() as conn:
+            conn.execute(text("DELETE FROM user_authentication WHERE user_id = :user_id"), {"user_id": self.user_id})
+
+    async def asyncTearDown(self):
+        await async_engine.dispose()
+
+    def _attempts(self) -> int:
+        with engine.connect() as conn:
+            return conn.execute(text(
+                "SELECT failed_login_attempts FROM user_authentication WHERE user_id = :user_id"
+            ), {"user_id": self.user_id}).scalar()
+
+    async def test_flush_adds_failures(self):
+        """Test pending failures are added to the stored count in one flush"""
+        throttle = LoginThrottle(InMemoryThrottleBackend())
+        for _ in range(3):
+            await throttle.record_failure("f@example.com", None, self.user_id)
+        self.assertEqual(await throttle.flush(), 1)
+        self.assertEqual(self._attempts(), 3)
+        self.assertEqual(await throttle.flush(), 0)
+
+    async def test_success_during_flush_wins(self):
+        """Test failures from before a login that resets the count aren't added back by an in-flight flush"""
+        throttle = LoginThrottle(InMemoryThrottleBackend())
+        await throttle.record_failure("f@example.com", None, self.user_id)
+        await throttle.record_failure("f@example.com", None, self.user_id)
+        # The login succeeds (and resets the count) after the batch was taken but before it is written
+        with engine.begin() as conn:
+            conn.execute(statements.get(RECORD_SUCCESSFUL_LOGIN), {"user_id": self.user_id, "password_hash": None})
+        await throttle.flush()
+        self.assertEqual(self._attempts(), 0)
+        await throttle.record_failure("f@example.com", None, self.user_id)
+        await throttle.flush()
+        self.assertEqual(self._attempts(), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+"""
+Unit Tests for request helpers
+client_ip behind trusted and untrusted proxies
+"""
+
+import unittest
+
+from starlette.requests import Request
+
+from api.middleware import client_ip, parse_networks
+
+PROXIES = parse_networks("10.0.0.0/8, 2001:db8::1")
+
+
+def _request(peer, *forwarded) -> Request:
+    headers = [(b"x-forwarded-for", value.encode()) for value in forwarded]
+    return Request({
+        "type": "http", "method": "POST", "path": "/", "headers": headers,
+        "client": (peer, 1234) if peer else None,
+    })
+
+
+class TestClientIp(unittest.TestCase):
+    """Test the address login throttling keys on"""
+
+    def test_untrusted_peer_ignores_header(self):
+        """Test a direct client can't choose its address with X-Forwarded-For"""
+        self.assertEqual(client_ip(_request("203.0.113.5", "198.51.100.1"), PROXIES), "203.0.113.5")
+
+    def test_no_trusted_proxies_by_default(self):
+        """Test the peer address is used when no proxies are trusted"""
+        self.assertEqual(client_ip(_request("10.0.0.2", "198.51.100.1"), []), "10.0.0.2")
+
+    def test_forwarded_client_behind_proxy(self):
+        """Test the rightmost untrusted hop is the client, not a spoofed leftmost value"""
+        request = _request("10.0.0.2", "1.2.3.4, 198.51.100.1", "10.0.0.9")
+        self.assertEqual(client_ip(request, PROXIES), "198.51.100.1")
+
+    def test_ipv6_proxy(self):
+        """Test IPv6 proxies and clients are matched by address"""
+        self.assertEqual(client_ip(_request("2001:db8::1", "2001:db8::99"), PROXIES), "2001:db8::99")
+
+    def test_only_trusted_hops(self):
+        """Test the leftmost hop is used when every hop is a trusted proxy, and the peer without a header"""
+        self.assertEqual(client_ip(_request("10.0.0.2", "10.0.0.3, 10.0.0.4"), PROXIES), "10.0.0.3")
+        self.assertEqual(client_ip(_request("10.0.0.2"), PROXIES), "10.0.0.2")
+        self.assertIsNone(client_ip(_request(None, "198.51.100.1"), PROXIES))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+"""
+Integration Tests for PgNotificationListener
+Delivery and reconnection after the listener's connection is dropped,
+against the database at DATABASE_URL (skipped when unreachable)
+"""
+
+import asyncio
+import unittest
+
+import asyncpg
+
+from api.services.notifications import PgNotificationListener, _asyncpg_dsn
+from api.database import ASYNC_DATABASE_URL
+
+CHANNEL = "hc_test_notifications"
+
+
+async def _database_available() -> bool:
+    try:
+        connection = await asyncpg.connect(_asyncpg_dsn(ASYNC_DATABASE_URL), timeout=2)
+    except Exception:
+        return False
+    await connection.close()
+    return True
+
+
+@unittest.skipUnless(asyncio.run(_database_available()), "Postgres not reachable at DATABASE_URL")
+class TestPgNotificationListener(unittest.IsolatedAsyncioTestCase):
+    """Test NOTIFY dispatch survives a dropped connection"""
+
+    async def asyncSetUp(self):
+        self.received = asyncio.Queue()
+        self.reconnects = 0
+        self.listener = PgNotificationListener(reconnect_min=0.05, reconnect_max=0.2, health_check=0.2)
+        self.listener.add_handler(CHANNEL, self.received.put)
+        self.listener.add_reconnect_handler(self._on_reconnect)
+        self.admin = await asyncpg.connect(self.listener.dsn)
+
+    async def asyncTearDown(self):
+        await self.listener.stop()
+        await self.admin.close()
+
+    async def _on_reconnect(self):
+        self.reconnects += 1
+
+    async def _until_listening(self, connects: int):
+        for _ in range(200):
+            if self.listener.is_listening and self.listener.connects >= connects:
+                return
+            await asyncio.sleep(0.02)
+        self.fail("listener did not (re)connect")
+
+    async def _notify(self, payload: str) -> str:
+        await self.admin.execute("SELECT pg_notify($1, $2)", CHANNEL, payload)
+        return await asyncio.wait_for(self.received.get(), 2)
+
+    async def test_reconnects_after_connection_is_terminated(self):
+        """Test LISTEN is re-issued and reconnect handlers run after the backend is killed"""
+        await self.listener.start()
+        await self._until_listening(1)
+        self.assertEqual(await self._notify("before"), "before")
+
+        pid = self.listener._connection.get_server_pid()
+        await self.admin.execute("SELECT pg_terminate_backend($1)", pid)
+        await self._until_listening(2)
+
+        self.assertNotEqual(self.listener._connection.get_server_pid(), pid)
+        self.assertEqual(await self._notify("after"), "after")
+        self.assertEqual(self.reconnects, 1)
+
+    async def test_retries_until_postgres_is_reachable(self):
+        """Test a failed first connect is retried instead of giving up"""
+        dsn = self.listener.dsn
+        self.listener.dsn = "postgresql://postgres@127.0.0.1:1/unreachable"
+        await self.listener.start()
+        await asyncio.sleep(0.15)
+        self.assertFalse(self.listener.is_listening)
+        self.listener.dsn = dsn
+        await self._until_listening(1)
+        self.assertEqual(await self._notify("late"), "late")
+
+
+if __name__ == "__main__":
+    unittest.main()
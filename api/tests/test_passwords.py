@@ -0,0 +1,56 @@
+"""
+Unit Tests for the password hashing service
+Rehash-on-verify for outdated bcrypt costs and load shedding on the hashing pool
+"""
+
+import asyncio
+import unittest
+
+from api.services.passwords import PasswordHasher, PasswordHasherSaturated, build_context
+
+# Low costs keep bcrypt fast in tests
+ROUNDS = 4
+
+
+class TestPasswordHasher(unittest.IsolatedAsyncioTestCase):
+    """Test hashing and verification on the pool"""
+
+    async def asyncSetUp(self):
+        self.hasher = PasswordHasher(build_context(ROUNDS), max_workers=2, max_pending=4)
+
+    async def asyncTearDown(self):
+        self.hasher.shutdown()
+
+    async def test_hash_uses_configured_cost(self):
+        """Test new hashes use the context's cost and verify without an update"""
+        password_hash = await self.hasher.hash("correct horse")
+        self.assertTrue(password_hash.startswith(f"$2b$0{ROUNDS}$"))
+        self.assertEqual(await self.hasher.verify_and_update("correct horse", password_hash), (True, None))
+
+    async def test_outdated_cost_rehashed_on_verify(self):
+        """Test a hash with another cost verifies and comes back rehashed at the current cost"""
+        old_hash = build_context(ROUNDS + 1).hash("correct horse")
+        valid, new_hash = await self.hasher.verify_and_update("correct horse", old_hash)
+        self.assertTrue(valid)
+        self.assertIsNotNone(new_hash)
+        self.assertTrue(new_hash.startswith(f"$2b$0{ROUNDS}$"))
+        self.assertEqual(await self.hasher.verify_and_update("correct horse", new_hash), (True, None))
+
+    async def test_wrong_password_not_rehashed(self):
+        """Test a failed verify never yields a replacement hash"""
+        old_hash = build_context(ROUNDS + 1).hash("correct horse")
+        self.assertEqual(await self.hasher.verify_and_update("wrong", old_hash), (False, None))
+
+    async def test_saturated_pool_sheds_load(self):
+        """Test calls beyond max_pending fail fast and the pending count recovers"""
+        results = await asyncio.gather(
+            *(self.hasher.hash("pw") for _ in range(6)), return_exceptions=True
+        )
+        rejected = [r for r in results if isinstance(r, PasswordHasherSaturated)]
+        self.assertEqual(len(rejected), 2)
+        self.assertEqual(self.hasher.pending, 0)
+        self.assertIsInstance(await self.hasher.hash("pw"), str)
+
+
+if __name__ == "__main__":
+    unittest.main()
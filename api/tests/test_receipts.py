@@ -0,0 +1,125 @@
+"""
+Unit Tests for the receipt engine
+The streamed receipt is checked as a PDF by walking its cross-reference
+table: every offset must land on its object, the content stream length
+must match, and startxref must point at the table.
+"""
+
+from datetime import datetime, timezone
+from decimal import Decimal
+from types import SimpleNamespace
+import os
+import re
+import tempfile
+import unittest
+import uuid
+
+from api.workers.receipts import (
+    ChunkReader, LocalReceiptStore, ReceiptTemplate, pdf_escape, receipt_fields, receipt_key
+)
+
+
+def _row(**overrides):
+    row = dict(
+        id=uuid.UUID("00000000-0000-0000-0000-000000000001"), invoice_id="INV-1",
+        created_at=datetime(2026, 3, 1, 12, 0, tzinfo=timezone.utc), donor_name="Ada (Lovelace)",
+        anonymous=False, amount_usd=Decimal("1234.5"), amount_crypto=Decimal("0.5"),
+        token="ETH", chain="ethereum", txid="0xabc", earmark=None,
+    )
+    row.update(overrides)
+    return SimpleNamespace(**row)
+
+
+def parse_pdf(data: bytes) -> dict:
+    """Objects of a single-revision PDF by number, validating its structure"""
+    assert data.startswith(b"%PDF-1."), "missing header"
+    assert data.endswith(b"%%EOF\n"), "missing %%EOF"
+    startxref = int(re.search(rb"startxref\n(\d+)\n%%EOF\n$", data).group(1))
+    assert data[startxref:].startswith(b"xref\n"), "startxref does not point at the xref table"
+    first, count = map(int, re.match(rb"xref\n(\d+) (\d+)\n", data[startxref:]).groups())
+    entries = data[startxref:].split(b"\n")[2:2 + count]
+    assert first == 0 and entries[0] == b"0000000000 65535 f ", "bad free entry"
+    trailer = data[data.index(b"trailer", startxref):]
+    assert int(re.search(rb"/Size (\d+)", trailer).group(1)) == count, "trailer /Size mismatch"
+    objects = {}
+    for number, entry in enumerate(entries[1:], start=1):
+        assert len(entry) == 19 and entry.endswith(b" 00000 n "), f"bad xref entry {entry!r}"
+        offset = int(entry[:10])
+        header = b"%d 0 obj\n" % number
+        assert data[offset:].startswith(header), f"xref offset of object {number} is wrong"
+        end = data.index(b"endobj\n", offset)
+        objects[number] = data[offset + len(header):end]
+    for number, body in objects.items():
+        match = re.match(rb"<< /Length (\d+) >>\nstream\n", body)
+        if match:
+            length = int(match.group(1))
+            assert body[match.end() + length:] == b"\nendstream\n", f"object {number} /Length mismatch"
+    return objects
+
+
+class TestReceiptTemplate(unittest.TestCase):
+    """Test rendered receipts are well-formed PDFs"""
+
+    def setUp(self):
+        self.template = ReceiptTemplate()
+
+    def test_receipt_is_valid_pdf(self):
+        """Test the streamed chunks form a PDF with a consistent xref table"""
+        data = b"".join(self.template.render(receipt_fields(_row())))
+        objects = parse_pdf(data)
+        self.assertEqual(len(objects), 6)
+        self.assertIn(b"/Root 1 0 R", data[data.rindex(b"trailer"):])
+        self.assertIn(b"/Type /Catalog", objects[1])
+        content = objects[6]
+        self.assertIn(b"(Donor: Ada \\(Lovelace\\)) Tj", content)
+        self.assertIn(b"(Amount: USD 1,234.50) Tj", content)
+        self.assertIn(b"(Designation: general) Tj", content)
+
+    def test_offsets_hold_for_any_content_length(self):
+        """Test the xref stays valid as field lengths change the content stream"""
+        for donor in ("", "x" * 500, "Zoë \\ (back) slash", "名前"):
+            parse_pdf(b"".join(self.template.render(receipt_fields(_row(donor_name=donor)))))
+
+    def test_anonymous_and_missing_fields(self):
+        """Test anonymous donors and missing txids render placeholders"""
+        fields = receipt_fields(_row(anonymous=True, txid=None, invoice_id=None))
+        self.assertEqual(fields["donor"], "Anonymous")
+        self.assertEqual(fields["txid"], "-")
+        self.assertEqual(fields["receipt_number"], "00000000-0000-0000-0000-000000000001")
+
+    def test_pdf_escape(self):
+        """Test literal-string delimiters are escaped and unmappable characters replaced"""
+        self.assertEqual(pdf_escape("a(b)\\c"), "a\\(b\\)\\\\c")
+        self.assertEqual(pdf_escape("é名"), "é?")
+        self.assertEqual(pdf_escape(None), "")
+
+
+class TestReceiptStreaming(unittest.TestCase):
+    """Test receipts are written from chunks without assembling them"""
+
+    def test_chunk_reader(self):
+        """Test sized and unsized reads return the chunks in order and count bytes"""
+        reader = ChunkReader([b"abc", b"", b"defg", b"h"])
+        self.assertEqual(reader.read(2), b"ab")
+        self.assertEqual(reader.read(4), b"cdef")
+        self.assertEqual(reader.read(), b"gh")
+        self.assertEqual(reader.read(3), b"")
+        self.assertEqual(reader.bytes_read, 8)
+
+    def test_local_store_writes_valid_pdf(self):
+        """Test a stored receipt is the rendered PDF at its year-partitioned key"""
+        row = _row()
+        with tempfile.TemporaryDirectory() as directory:
+            size, url = LocalReceiptStore(directory).put(
+                receipt_key(row), ReceiptTemplate().render(receipt_fields(row))
+            )
+            path = os.path.join(directory, "receipts", "2026", f"{row.id}.pdf")
+            self.assertEqual(url, f"file://{path}")
+            with open(path, "rb") as f:
+                data = f.read()
+        self.assertEqual(size, len(data))
+        parse_pdf(data)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+"""
+Unit Tests for the response cache
+ETag/304 responses, TTL expiry and request coalescing on the in-memory backend
+"""
+
+from unittest import mock
+import asyncio
+import json
+import unittest
+
+from api.services.response_cache import (
+    InMemoryCacheBackend, ResponseCache, donation_invoice_key, donation_txid_key
+)
+
+
+class TestResponseCacheETag(unittest.TestCase):
+    """Test ETag derivation and conditional responses"""
+
+    def setUp(self):
+        self.entry = ResponseCache.encode({"invoice_id": "INV-1", "amount_usd": 10})
+
+    def test_etag_follows_body(self):
+        """Test identical payloads share an ETag and changed payloads don't"""
+        etag, body = self.entry
+        self.assertEqual(json.loads(body), {"invoice_id": "INV-1", "amount_usd": 10})
+        self.assertEqual(ResponseCache.encode({"invoice_id": "INV-1", "amount_usd": 10})[0], etag)
+        self.assertNotEqual(ResponseCache.encode({"invoice_id": "INV-1", "amount_usd": 11})[0], etag)
+        self.assertTrue(etag.startswith('"') and etag.endswith('"'))
+
+    def test_200_without_matching_etag(self):
+        """Test a missing or stale If-None-Match gets the body and ETag"""
+        etag, body = self.entry
+        for if_none_match in (None, '"stale"'):
+            response = ResponseCache.respond(self.entry, if_none_match)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.body, body)
+            self.assertEqual(response.headers["etag"], etag)
+
+    def test_304_on_matching_etag(self):
+        """Test strong, weak, listed and wildcard matches all get an empty 304"""
+        etag, _ = self.entry
+        for if_none_match in (etag, f"W/{etag}", f'"other", {etag}', "*"):
+            response = ResponseCache.respond(self.entry, if_none_match)
+            self.assertEqual(response.status_code, 304, if_none_match)
+            self.assertEqual(response.body, b"")
+            self.assertEqual(response.headers["etag"], etag)
+
+
+class TestResponseCacheLoading(unittest.IsolatedAsyncioTestCase):
+    """Test read-through loading, coalescing and invalidation"""
+
+    async def test_concurrent_misses_load_once(self):
+        """Test concurrent callers for one key share a single loader call"""
+        cache = ResponseCache(InMemoryCacheBackend(), ttl=60)
+        release = asyncio.Event()
+        calls = 0
+
+        async def loader():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return {"n": calls}
+
+        waiters = [asyncio.create_task(cache.get_or_load("k", loader)) for _ in range(5)]
+        await asyncio.sleep(0)
+        release.set()
+        entries = await asyncio.gather(*waiters)
+        self.assertEqual(calls, 1)
+        self.assertEqual(len(set(entries)), 1)
+        # Served from the backend afterwards
+        self.assertEqual(await cache.get_or_load("k", loader), entries[0])
+        self.assertEqual(calls, 1)
+
+    async def test_loader_failure_reaches_all_waiters(self):
+        """Test a failing load raises in every coalesced caller and isn't cached"""
+        cache = ResponseCache(InMemoryCacheBackend(), ttl=60)
+        release = asyncio.Event()
+
+        async def loader():
+            await release.wait()
+            raise RuntimeError("db down")
+
+        waiters = [asyncio.create_task(cache.get_or_load("k", loader)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*waiters, return_exceptions=True)
+        self.assertTrue(all(isinstance(r, RuntimeError) for r in results))
+        self.assertEqual(cache._inflight, {})
+
+        async def recovered():
+            return {"ok": True}
+
+        self.assertIsNotNone(await cache.get_or_load("k", recovered))
+
+    async def test_missing_row_not_cached(self):
+        """Test a loader returning None yields None and loads again next time"""
+        cache = ResponseCache(InMemoryCacheBackend(), ttl=60)
+        loader = mock.AsyncMock(return_value=None)
+        self.assertIsNone(await cache.get_or_load("k", loader))
+        self.assertIsNone(await cache.get_or_load("k", loader))
+        self.assertEqual(loader.await_count, 2)
+
+    async def test_ttl_expiry(self):
+        """Test entries are reloaded once their TTL has passed"""
+        cache = ResponseCache(InMemoryCacheBackend(), ttl=5)
+        loader = mock.AsyncMock(return_value={"v": 1})
+        with mock.patch("api.services.response_cache.time.monotonic", return_value=100.0):
+            await cache.get_or_load("k", loader)
+            await cache.get_or_load("k", loader)
+        self.assertEqual(loader.await_count, 1)
+        with mock.patch("api.services.response_cache.time.monotonic", return_value=105.0):
+            await cache.get_or_load("k", loader)
+        self.assertEqual(loader.await_count, 2)
+
+    async def test_donation_change_invalidates_keys(self):
+        """Test a donation_changes payload evicts the invoice and both txid keys"""
+        backend = InMemoryCacheBackend()
+        cache = ResponseCache(backend, ttl=60)
+        keys = [donation_invoice_key("INV-1"), donation_txid_key("0xold"), donation_txid_key("0xnew")]
+        for key in keys + ["other"]:
+            await backend.set(key, ResponseCache.encode({}), 60)
+        await cache.handle_donation_change(json.dumps({"invoice_id": "INV-1", "txid": "0xnew", "old_txid": "0xold"}))
+        for key in keys:
+            self.assertIsNone(await backend.get(key))
+        self.assertIsNotNone(await backend.get("other"))
+
+    async def test_lru_bound(self):
+        """Test the in-memory backend evicts the least recently used entry past max_entries"""
+        backend = InMemoryCacheBackend(max_entries=2)
+        entry = ResponseCache.encode({})
+        await backend.set("a", entry, 60)
+        await backend.set("b", entry, 60)
+        await backend.get("a")
+        await backend.set("c", entry, 60)
+        self.assertIsNone(await backend.get("b"))
+        self.assertIsNotNone(await backend.get("a"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+"""
+Integration Tests for the compliance gate
+screen_donations with registered screening providers against the database
+at DATABASE_URL (skipped when unreachable)
+"""
+
+import unittest
+import uuid
+
+from sqlalchemy import text
+
+from api.database import engine
+from api.workers import tasks
+from api.workers.screening import (
+    FakeScreeningProvider, ScreeningProvider, ScreeningResult, register_screening_provider
+)
+
+
+def _database_available() -> bool:
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT aml_score, ofac_flag FROM donations LIMIT 0"))
+        return True
+    except Exception:
+        return False
+
+
+class FailingProvider(ScreeningProvider):
+    name = "failing"
+
+    def screen(self, donations):
+        raise ConnectionError("provider down")
+
+
+@unittest.skipUnless(_database_available(), "donations table not reachable at DATABASE_URL")
+class TestScreenDonations(unittest.TestCase):
+    """Test screening outcomes and that it fails closed"""
+
+    def setUp(self):
+        self.chain = f"testscreen{uuid.uuid4().hex[:8]}"
+        self.addCleanup(register_screening_provider, None)
+
+    def tearDown(self):
+        with engine.begin() as conn:
+            conn.execute(text("DELETE FROM donations WHERE chain = :chain"), {"chain": self.chain})
+
+    def _donation(self, amount_usd: float = 5, ofac_flag: bool = False) -> str:
+        donation_id = str(uuid.uuid4())
+        with engine.begin() as conn:
+            conn.execute(text("""
+                INSERT INTO donations (id, chain, token, amount_crypto, amount_usd, to_address, status, ofac_flag)
+                VALUES (:id, :chain, 'TEST', 1, :amount_usd, 'addr', 'confirmed', :ofac_flag)
+            """), {"id": donation_id, "chain": self.chain, "amount_usd": amount_usd, "ofac_flag": ofac_flag})
+        return donation_id
+
+    def _row(self, donation_id: str):
+        with engine.connect() as conn:
+            return conn.execute(text(
+                "SELECT status, aml_score, ofac_flag FROM donations WHERE id = :id"
+            ), {"id": donation_id}).one()
+
+    def test_provider_results_applied(self):
+        """Test clean donations pass and sanctioned, high-risk and large ones are held"""
+        clean, sanctioned, risky, large = (self._donation(), self._donation(), self._donation(),
+                                           self._donation(amount_usd=tasks.COMPLIANCE_KYC_THRESHOLD_USD))
+        register_screening_provider(FakeScreeningProvider({
+            clean: ScreeningResult(10),
+            sanctioned: ScreeningResult(5, sanctions_match=True),
+            risky: ScreeningResult(99),
+        }))
+        self.assertEqual(tasks.screen_donations([clean, sanctioned, risky, large]), [clean])
+        self.assertEqual(tuple(self._row(clean)), ("confirmed", 10, False))
+        self.assertEqual(tuple(self._row(sanctioned)), ("flagged", 5, True))
+        self.assertEqual(self._row(risky).status, "flagged")
+        self.assertEqual(self._row(large).status, "kyc_required")
+
+    def test_no_provider_holds_unscreened(self):
+        """Test nothing is cleared without a provider, and known OFAC hits are still flagged"""
+        pending, known_hit = self._donation(), self._donation(ofac_flag=True)
+        register_screening_provider(None)
+        with self.assertLogs("api.workers.tasks", "ERROR"):
+            self.assertEqual(tasks.screen_donations([pending, known_hit]), [])
+        self.assertEqual(self._row(pending).status, "unscreened")
+        self.assertIsNone(self._row(pending).aml_score)
+        self.assertEqual(self._row(known_hit).status, "flagged")
+
+    def test_omitted_results_held(self):
+        """Test donations the provider didn't return are held as unscreened"""
+        screened, omitted = self._donation(), self._donation()
+
+        class PartialProvider(FakeScreeningProvider):
+            def screen(self, donations):
+                return {screened: ScreeningResult(0)}
+
+        register_screening_provider(PartialProvider())
+        self.assertEqual(tasks.screen_donations([screened, omitted]), [screened])
+        self.assertEqual(self._row(omitted).status, "unscreened")
+
+    def test_provider_failure_not_cleared(self):
+        """Test a provider error clears nothing and leaves donations confirmed for a retry"""
+        donation_id = self._donation()
+        register_screening_provider(FailingProvider())
+        with self.assertLogs("api.workers.tasks", "ERROR"):
+            self.assertEqual(tasks.screen_donations([donation_id]), [])
+        self.assertEqual(self._row(donation_id).status, "confirmed")
+
+
+if __name__ == "__main__":
+    unittest.main()
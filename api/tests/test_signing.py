@@ -0,0 +1,110 @@
+"""
+Unit Tests for HMAC request signing
+Secret rotation, signature formats and the webhook provider allow-list
+"""
+
+from unittest import mock
+import hashlib
+import hmac
+import os
+import unittest
+
+from api import signing
+from api.signing import HmacVerifier, get_verifier, provider_secrets, reload_verifiers, verify_signature
+
+BODY = b'{"event":"donation.confirmed"}'
+
+
+def _sign(secret: str, body: bytes = BODY) -> str:
+    return hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+class TestHmacVerifier(unittest.TestCase):
+    """Test verification against one or more secrets"""
+
+    def test_rotation_accepts_old_and_new(self):
+        """Test both secrets of a rotation verify and new signatures use the first"""
+        verifier = HmacVerifier(["new", "old"])
+        self.assertTrue(verifier.verify(BODY, _sign("new")))
+        self.assertTrue(verifier.verify(BODY, _sign("old")))
+        self.assertFalse(verifier.verify(BODY, _sign("other")))
+        self.assertEqual(verifier.sign(BODY), _sign("new"))
+
+    def test_retired_secret_rejected(self):
+        """Test a secret dropped from the list no longer verifies"""
+        self.assertFalse(HmacVerifier(["new"]).verify(BODY, _sign("old")))
+
+    def test_signature_formats(self):
+        """Test prefixed and padded signatures verify and empty ones don't"""
+        verifier = HmacVerifier(["secret"])
+        self.assertTrue(verifier.verify(BODY, f"sha256={_sign('secret')}"))
+        self.assertTrue(verifier.verify(memoryview(BODY), f" {_sign('secret')} "))
+        self.assertFalse(verifier.verify(BODY, None))
+        self.assertFalse(verifier.verify(BODY, ""))
+        self.assertFalse(verifier.verify(BODY + b" ", _sign("secret")))
+
+    def test_unconfigured(self):
+        """Test a verifier without secrets reports itself unconfigured"""
+        self.assertFalse(HmacVerifier([]).configured)
+        self.assertTrue(HmacVerifier(["s"]).configured)
+
+
+class TestProviderVerifiers(unittest.TestCase):
+    """Test per-provider secrets from the environment"""
+
+    def setUp(self):
+        reload_verifiers()
+        self.addCleanup(reload_verifiers)
+
+    def _env(self, **env):
+        """Replace every WEBHOOK_SECRET* variable with env for the test"""
+        patcher = mock.patch.dict(os.environ)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        for key in [k for k in os.environ if k.startswith("WEBHOOK_SECRET")]:
+            del os.environ[key]
+        os.environ.update(env)
+
+    def test_provider_secret_list(self):
+        """Test a comma-separated provider secret overrides the shared one"""
+        self._env(WEBHOOK_SECRET="shared", WEBHOOK_SECRET_STRIPE="new, old")
+        self.assertEqual(provider_secrets("stripe"), ["new", "old"])
+        self.assertEqual(provider_secrets("nowpayments"), ["shared"])
+
+    def test_rotation_through_reload(self):
+        """Test rotated secrets take effect after reload_verifiers"""
+        self._env(WEBHOOK_SECRET_STRIPE="old")
+        self.assertTrue(verify_signature("stripe", BODY, _sign("old")))
+        os.environ["WEBHOOK_SECRET_STRIPE"] = "new,old"
+        self.assertFalse(verify_signature("stripe", BODY, _sign("new")))
+        reload_verifiers()
+        self.assertTrue(verify_signature("stripe", BODY, _sign("new")))
+        self.assertTrue(verify_signature("stripe", BODY, _sign("old")))
+
+    def test_unknown_provider_not_cached(self):
+        """Test providers outside the allow-list get no verifier even with a shared secret"""
+        self._env(WEBHOOK_SECRET="shared")
+        with mock.patch.object(signing, "WEBHOOK_PROVIDERS", frozenset({"stripe"})):
+            self.assertIsNotNone(get_verifier("Stripe"))
+            for name in ("random", "random2"):
+                self.assertIsNone(get_verifier(name))
+                self.assertFalse(verify_signature(name, BODY, _sign("shared")))
+            self.assertEqual(set(signing._verifiers), {"stripe"})
+
+    def test_own_secret_allows_unlisted_provider(self):
+        """Test a provider with its own secret is accepted without being listed"""
+        self._env(WEBHOOK_SECRET_CUSTOM="s")
+        with mock.patch.object(signing, "WEBHOOK_PROVIDERS", frozenset()):
+            self.assertTrue(verify_signature("custom", BODY, _sign("s")))
+
+    def test_listed_provider_without_secret(self):
+        """Test a listed provider with no secret has no verifier and isn't cached"""
+        self._env()
+        with mock.patch.object(signing, "WEBHOOK_PROVIDERS", frozenset({"stripe"})):
+            self.assertIsNone(get_verifier("stripe"))
+            self.assertFalse(verify_signature("stripe", BODY, _sign("")))
+        self.assertEqual(signing._verifiers, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
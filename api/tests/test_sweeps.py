@@ -0,0 +1,145 @@
+"""
+Unit Tests for the wallet sweep planner
+collect_transfers, plan_sweeps and plan_naive on in-memory wallet rows
+"""
+
+from decimal import Decimal
+import unittest
+
+from api.workers.sweeps import (
+    ChainFeeModel, SweepTransfer, collect_transfers, plan_naive, plan_sweeps, simulate
+)
+
+FEE_MODELS = {
+    "utxo": ChainFeeModel(
+        "utxo", base_fee=Decimal("1"), per_input=Decimal("0.5"), per_output=Decimal("0.25"),
+        max_inputs=3, min_sweep=Decimal("2")
+    ),
+    "account": ChainFeeModel("account", base_fee=Decimal("1"), min_sweep=Decimal("0")),
+    "ops": ChainFeeModel(
+        "multi_op", base_fee=Decimal("1"), per_input=Decimal("1"), max_inputs=2, min_sweep=Decimal("0")
+    ),
+}
+
+
+def transfer(chain: str, source: str, amount: str, to: str = "cold", ops=()) -> SweepTransfer:
+    return SweepTransfer(chain, source, f"addr-{source}", to, f"addr-{to}", Decimal(amount), tuple(ops))
+
+
+def wallet(wallet_id: str, chain: str, balance: str, wallet_type: str = "hot", active: bool = True) -> dict:
+    return {
+        "id": wallet_id, "chain": chain, "address": f"addr-{wallet_id}",
+        "wallet_type": wallet_type, "balance_crypto": balance, "active": active,
+    }
+
+
+class TestPlanSweeps(unittest.TestCase):
+    """Test batching and dust skipping"""
+
+    def test_dust_is_skipped(self):
+        """Test transfers below min_sweep or worth at most twice the marginal fee are left out"""
+        below_min = transfer("utxo", "a", "1.5")
+        fee_bound = transfer("account", "b", "2")
+        kept = transfer("account", "c", "2.01")
+        plan = plan_sweeps([below_min, fee_bound, kept], FEE_MODELS)
+        self.assertEqual(plan.skipped, [below_min, fee_bound])
+        self.assertEqual([tx.transfers for tx in plan.transactions], [[kept]])
+
+    def test_utxo_inputs_split_at_max_inputs(self):
+        """Test inputs to one destination are packed max_inputs per transaction, largest first"""
+        transfers = [transfer("utxo", f"w{i}", str(10 + i)) for i in range(7)]
+        plan = plan_sweeps(transfers, FEE_MODELS)
+        self.assertEqual([len(tx.transfers) for tx in plan.transactions], [3, 3, 1])
+        self.assertEqual(
+            [t.from_wallet_id for t in plan.transactions[0].transfers], ["w6", "w5", "w4"]
+        )
+        self.assertEqual(plan.transactions[0].fee, Decimal("2.75"))
+        self.assertEqual(plan.transactions[2].fee, Decimal("1.75"))
+        self.assertEqual(sum(tx.amount for tx in plan.transactions), sum(t.amount for t in transfers))
+
+    def test_multi_op_split_per_destination(self):
+        """Test multi-op transfers are batched separately for each destination"""
+        transfers = [
+            transfer("ops", "a", "5", to="cold1"),
+            transfer("ops", "b", "6", to="cold1"),
+            transfer("ops", "c", "7", to="cold1"),
+            transfer("ops", "d", "8", to="cold2"),
+        ]
+        plan = plan_sweeps(transfers, FEE_MODELS)
+        self.assertEqual(
+            [(tx.to_address, [t.from_wallet_id for t in tx.transfers]) for tx in plan.transactions],
+            [("addr-cold1", ["c", "b"]), ("addr-cold1", ["a"]), ("addr-cold2", ["d"])]
+        )
+
+    def test_account_chain_merges_transfers_per_sender(self):
+        """Test account chains send one transaction per sender with its transfers merged"""
+        transfers = [
+            transfer("account", "a", "5", ops=["op1"]),
+            transfer("account", "b", "4"),
+            transfer("account", "a", "3", ops=["op2"]),
+        ]
+        plan = plan_sweeps(transfers, FEE_MODELS)
+        self.assertEqual(len(plan.transactions), 2)
+        merged = plan.transactions[0].transfers[0]
+        self.assertEqual((merged.from_wallet_id, merged.amount), ("a", Decimal("8")))
+        self.assertEqual(merged.operation_ids, ("op1", "op2"))
+        self.assertEqual(plan.fees_by_chain(), {"account": Decimal("2")})
+
+    def test_batched_plan_beats_naive(self):
+        """Test the naive baseline sends one transaction per transfer and pays more"""
+        transfers = [transfer("utxo", f"w{i}", "10") for i in range(6)]
+        naive = plan_naive(transfers, FEE_MODELS)
+        batched = plan_sweeps(transfers, FEE_MODELS)
+        self.assertEqual(len(naive.transactions), 6)
+        self.assertEqual(naive.fees_by_chain()["utxo"], Decimal("10.5"))
+        self.assertEqual(batched.fees_by_chain()["utxo"], Decimal("5.5"))
+        self.assertEqual(simulate(batched, FEE_MODELS)["transactions"], 2)
+
+    def test_unknown_chain_left_out(self):
+        """Test a chain without a fee model is reported without aborting the other chains"""
+        with self.assertLogs("api.workers.sweeps", "WARNING"):
+            plan = plan_sweeps([transfer("dogecoin", "a", "10"), transfer("account", "b", "10")], FEE_MODELS)
+        self.assertEqual([tx.chain for tx in plan.transactions], ["account"])
+        self.assertEqual(plan.as_dict()["unsupported_chains"], ["dogecoin"])
+
+
+class TestCollectTransfers(unittest.TestCase):
+    """Test building transfers from wallet and operation rows"""
+
+    def setUp(self):
+        self.cold = wallet("cold", "account", "0", wallet_type="cold")
+        self.destinations = {"account": self.cold}
+
+    def test_receiving_wallets_swept_to_destination(self):
+        """Test active hot/public wallets with a balance are swept in full"""
+        wallets = [
+            self.cold,
+            wallet("hot", "account", "5"),
+            wallet("public", "account", "2", wallet_type="public"),
+            wallet("empty", "account", "0"),
+            wallet("inactive", "account", "9", active=False),
+            wallet("treasury", "account", "9", wallet_type="multisig"),
+            wallet("other_chain", "utxo", "9"),
+        ]
+        transfers = collect_transfers(wallets, [], self.destinations)
+        self.assertEqual(
+            sorted((t.from_wallet_id, t.to_wallet_id, t.amount) for t in transfers),
+            [("hot", "cold", Decimal("5")), ("public", "cold", Decimal("2"))]
+        )
+
+    def test_operations_merged_and_replace_balance_sweep(self):
+        """Test pending operations from one wallet are summed and suppress its balance sweep"""
+        wallets = [self.cold, wallet("hot", "account", "50")]
+        operations = [
+            {"id": "op1", "from_wallet_id": "hot", "to_wallet_id": None, "amount_crypto": "1.5"},
+            {"id": "op2", "from_wallet_id": "hot", "to_wallet_id": "cold", "amount_crypto": "2"},
+            {"id": "op3", "from_wallet_id": "missing", "to_wallet_id": "cold", "amount_crypto": "7"},
+        ]
+        transfers = collect_transfers(wallets, operations, self.destinations)
+        self.assertEqual(len(transfers), 1)
+        self.assertEqual(transfers[0].amount, Decimal("3.5"))
+        self.assertEqual(transfers[0].operation_ids, ("op1", "op2"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,180 @@
+"""
+Unit Tests for Celery task metrics
+Histogram quantiles, loading stored series from Redis into the registry,
+the buffered publish-side counter and start-time eviction in the signal
+handlers. Redis is replaced by an in-memory hash client.
+"""
+
+from collections import defaultdict
+from types import SimpleNamespace
+from unittest import mock
+import unittest
+import uuid
+
+from api.metrics import Histogram
+from api.services.task_metrics import (
+    PAYLOAD, QUEUE_WAIT, RETRIES, RUNTIME, TaskMetricsRecorder, TaskMetricsStore, task_summary
+)
+from api.workers import instrumentation
+
+
+class MemoryHashes:
+    """The hash commands TaskMetricsStore uses, kept in memory"""
+
+    def __init__(self):
+        self.hashes = defaultdict(dict)
+        self.round_trips = 0
+
+    def hincrby(self, key, field, amount):
+        self.hashes[key][field] = int(self.hashes[key].get(field, 0)) + amount
+
+    def hincrbyfloat(self, key, field, amount):
+        self.hashes[key][field] = float(self.hashes[key].get(field, 0)) + amount
+
+    def hgetall(self, key):
+        return {k.encode(): str(v).encode() for k, v in self.hashes[key].items()}
+
+    def pipeline(self, transaction=False):
+        return MemoryPipeline(self)
+
+
+class MemoryPipeline:
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args: self.calls.append((name, args))
+
+    def execute(self):
+        self.client.round_trips += 1
+        return [getattr(self.client, name)(*args) for name, args in self.calls]
+
+
+def _store() -> TaskMetricsStore:
+    store = TaskMetricsStore(url="redis://localhost:1/0")
+    store.client = MemoryHashes()
+    return store
+
+
+class TestQuantiles(unittest.TestCase):
+    """Test quantile estimates from bucket counts"""
+
+    def test_interpolates_within_bucket(self):
+        """Test quantiles interpolate linearly inside the bucket holding the rank"""
+        histogram = Histogram("test_quantile_seconds", "test", buckets=(1.0, 2.0, 4.0))
+        for value in (0.5, 1.5, 1.5, 3.0):
+            histogram.observe(value)
+        self.assertAlmostEqual(histogram.quantile(0.25), 1.0)
+        self.assertAlmostEqual(histogram.quantile(0.5), 1.5)
+        self.assertAlmostEqual(histogram.quantile(1.0), 4.0)
+
+    def test_overflow_and_empty(self):
+        """Test ranks past the last bucket report its bound and empty series None"""
+        histogram = Histogram("test_overflow_seconds", "test", buckets=(1.0,))
+        self.assertIsNone(histogram.quantile(0.5))
+        histogram.observe(10.0)
+        self.assertEqual(histogram.quantile(0.99), 1.0)
+
+
+class TestTaskMetricsStore(unittest.TestCase):
+    """Test the Redis round trip into the registry"""
+
+    def test_load_mirrors_observations(self):
+        """Test stored observations load into the registry and feed task_summary"""
+        task = f"test.{uuid.uuid4().hex}"
+        store = _store()
+        for runtime in (0.02, 0.03, 0.04, 2.0):
+            store.observe(RUNTIME, runtime, task, "SUCCESS")
+        store.observe(QUEUE_WAIT, 0.2, task)
+        store.inc(RETRIES, task, amount=3)
+        store.load()
+
+        counts, total = RUNTIME.snapshot()[(task, "SUCCESS")]
+        self.assertEqual(sum(counts), 4)
+        self.assertAlmostEqual(total, 2.09)
+        self.assertEqual(RETRIES.snapshot()[(task,)], 3)
+        summary = task_summary()[task]
+        self.assertEqual(summary["retries"], 3)
+        self.assertEqual(summary["states"]["SUCCESS"]["count"], 4)
+        # Three of four runs fall in the 0.01-0.05 bucket
+        self.assertLessEqual(summary["states"]["SUCCESS"]["p50"], 0.05)
+        self.assertGreater(summary["states"]["SUCCESS"]["p99"], 1.0)
+        self.assertEqual(summary["queue_wait_seconds"]["count"], 1)
+
+    def test_load_replaces_rather_than_adds(self):
+        """Test loading twice mirrors the stored totals instead of doubling them"""
+        task = f"test.{uuid.uuid4().hex}"
+        store = _store()
+        store.observe(PAYLOAD, 100, task)
+        store.load()
+        store.load()
+        self.assertEqual(sum(PAYLOAD.snapshot()[(task,)][0]), 1)
+
+
+class TestPublishBuffer(unittest.TestCase):
+    """Test publish-side observations are batched off the publishing thread"""
+
+    def test_publishes_flushed_in_one_round_trip(self):
+        """Test many publishes make no Redis calls until one pipelined flush"""
+        task = f"test.{uuid.uuid4().hex}"
+        store = _store()
+        recorder = TaskMetricsRecorder(store_factory=lambda: store, flush_interval=3600)
+        for size in (100, 200, 5000):
+            recorder.published(task, size)
+        self.assertEqual(store.client.round_trips, 0)
+        recorder.flush()
+        self.assertEqual(store.client.round_trips, 1)
+        recorder.flush()
+        self.assertEqual(store.client.round_trips, 1)
+        store.load()
+        counts, total = PAYLOAD.snapshot()[(task,)]
+        self.assertEqual(sum(counts), 3)
+        self.assertEqual(total, 5300)
+
+    def test_unreachable_redis_is_ignored(self):
+        """Test a failing flush doesn't raise and drops the batch"""
+        store = _store()
+        store.client.pipeline = mock.Mock(side_effect=ConnectionError("down"))
+        recorder = TaskMetricsRecorder(store_factory=lambda: store, flush_interval=3600)
+        recorder.published("test.task", 10)
+        recorder.flush()
+        self.assertEqual(dict(recorder._buffer), {})
+
+
+class TestStartedEviction(unittest.TestCase):
+    """Test task start times don't outlive their tasks"""
+
+    def setUp(self):
+        patcher = mock.patch.object(instrumentation, "_started", {})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(instrumentation, "task_metrics")
+        self.task_metrics = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.task = SimpleNamespace(name="test.task", request=SimpleNamespace(headers={}))
+
+    def test_failure_and_revoke_release(self):
+        """Test failed and revoked tasks drop their start time"""
+        instrumentation.on_task_prerun(task_id="a", task=self.task)
+        instrumentation.on_task_prerun(task_id="b", task=self.task)
+        instrumentation.on_task_failure(sender=self.task, task_id="a")
+        instrumentation.on_task_postrun(task_id="a", task=self.task, state="FAILURE")
+        self.assertEqual(self.task_metrics.finished.call_count, 1)
+        self.assertEqual(self.task_metrics.finished.call_args.args[:2], ("test.task", "FAILURE"))
+        instrumentation.on_task_revoked(request=SimpleNamespace(id="b"))
+        self.assertEqual(instrumentation._started, {})
+
+    def test_stale_entries_swept(self):
+        """Test start times past the TTL are dropped when another task starts"""
+        with mock.patch.object(instrumentation, "_last_sweep", 0.0), \
+                mock.patch("api.workers.instrumentation.time.perf_counter", return_value=100.0):
+            instrumentation.on_task_prerun(task_id="killed", task=self.task)
+        later = 100.0 + instrumentation.TASK_METRICS_STARTED_TTL + 61
+        with mock.patch("api.workers.instrumentation.time.perf_counter", return_value=later):
+            instrumentation.on_task_prerun(task_id="next", task=self.task)
+        self.assertEqual(set(instrumentation._started), {"next"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,201 @@
+"""
+Chain clients for confirmation polling
+Each client answers confirmation counts for many txids in one round trip.
+CHAIN_CLIENT_MODE=fake swaps every chain for a FakeChainClient that mines
+CHAIN_FAKE_BLOCKS_PER_POLL blocks per lookup, so donations confirm and
+the pipeline runs without network access.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional
+import logging
+import os
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# rpc | fake
+CHAIN_CLIENT_MODE = os.getenv("CHAIN_CLIENT_MODE", "rpc")
+CHAIN_RPC_TIMEOUT = float(os.getenv("CHAIN_RPC_TIMEOUT", "10"))
+CHAIN_FAKE_BLOCKS_PER_POLL = int(os.getenv("CHAIN_FAKE_BLOCKS_PER_POLL", "1"))
+
+# Confirmation value reported for transactions that failed on chain
+TX_FAILED = -1
+
+EVM_CHAINS = {"ethereum", "polygon"}
+
+
+class ChainClient:
+    """Confirmation lookups for one chain"""
+
+    chain: str = ""
+    # Most txids sent in a single lookup
+    max_batch_size: int = 100
+
+    def get_confirmations(self, txids: List[str]) -> Dict[str, int]:
+        """
+        Confirmation counts by txid (TX_FAILED for reverted/failed
+        transactions); txids the chain doesn't know yet are omitted
+        """
+        raise NotImplementedError
+
+    def get_confirmations_batched(self, txids: List[str]) -> Dict[str, int]:
+        """get_confirmations over max_batch_size chunks"""
+        result: Dict[str, int] = {}
+        for offset in range(0, len(txids), self.max_batch_size):
+            result.update(self.get_confirmations(txids[offset:offset + self.max_batch_size]))
+        return result
+
+
+class FakeChainClient(ChainClient):
+    """
+    In-memory chain for tests and local runs. With auto_mine, every lookup
+    first includes unknown txids in a block and mines auto_mine blocks, so
+    anything queried confirms after a few polls.
+    """
+
+    def __init__(self, chain: str, confirmations: Optional[Dict[str, int]] = None, max_batch_size: int = 100,
+                 auto_mine: int = 0):
+        self.chain = chain
+        self.max_batch_size = max_batch_size
+        self.confirmations: Dict[str, int] = dict(confirmations or {})
+        self.auto_mine = auto_mine
+        self.calls = 0
+
+    def set(self, txid: str, confirmations: int):
+        self.confirmations[txid] = confirmations
+
+    def advance(self, blocks: int = 1):
+        """Mine blocks: every known, non-failed transaction gains confirmations"""
+        for txid, count in self.confirmations.items():
+            if count != TX_FAILED:
+                self.confirmations[txid] = count + blocks
+
+    def get_confirmations(self, txids: List[str]) -> Dict[str, int]:
+        self.calls += 1
+        if self.auto_mine:
+            for txid in txids:
+                self.confirmations.setdefault(txid, 0)
+            self.advance(self.auto_mine)
+        return {txid: self.confirmations[txid] for txid in txids if txid in self.confirmations}
+
+
+class JsonRpcChainClient(ChainClient):
+    """Base for nodes that accept JSON-RPC batch requests"""
+
+    def __init__(self, chain: str, url: str, max_batch_size: int = 100):
+        self.chain = chain
+        self.url = url
+        self.max_batch_size = max_batch_size
+        self._client = httpx.Client(timeout=CHAIN_RPC_TIMEOUT)
+
+    def call_batch(self, calls: Iterable[tuple]) -> List[Any]:
+        """POST one JSON-RPC batch; returns results in call order (None on per-call error)"""
+        payload = [
+            {"jsonrpc": "2.0", "id": index, "method": method, "params": params}
+            for index, (method, params) in enumerate(calls)
+        ]
+        response = self._client.post(self.url, json=payload)
+        response.raise_for_status()
+        by_id = {item.get("id"): item for item in response.json()}
+        return [by_id.get(index, {}).get("result") for index in range(len(payload))]
+
+
+class EvmChainClient(JsonRpcChainClient):
+    """Ethereum-compatible node: eth_blockNumber + eth_getTransactionReceipt in one batch"""
+
+    def get_confirmations(self, txids: List[str]) -> Dict[str, int]:
+        results = self.call_batch(
+            [("eth_blockNumber", [])] + [("eth_getTransactionReceipt", [txid]) for txid in txids]
+        )
+        head = int(results[0], 16)
+        confirmations = {}
+        for txid, receipt in zip(txids, results[1:]):
+            if not receipt or receipt.get("blockNumber") is None:
+                continue
+            if receipt.get("status") == "0x0":
+                confirmations[txid] = TX_FAILED
+            else:
+                confirmations[txid] = head - int(receipt["blockNumber"], 16) + 1
+        return confirmations
+
+
+class BitcoinChainClient(JsonRpcChainClient):
+    """bitcoind (txindex=1): getrawtransaction verbose for every txid in one batch"""
+
+    def get_confirmations(self, txids: List[str]) -> Dict[str, int]:
+        results = self.call_batch([("getrawtransaction", [txid, True]) for txid in txids])
+        return {
+            txid: tx.get("confirmations", 0)
+            for txid, tx in zip(txids, results)
+            if tx
+        }
+
+
+class SolanaChainClient(ChainClient):
+    """Solana getSignatureStatuses (up to 256 signatures per call)"""
+
+    # Reported for finalized signatures (the node returns confirmations: null)
+    FINALIZED_CONFIRMATIONS = 32
+
+    def __init__(self, url: str, max_batch_size: int = 256):
+        self.chain = "solana"
+        self.url = url
+        self.max_batch_size = max_batch_size
+        self._client = httpx.Client(timeout=CHAIN_RPC_TIMEOUT)
+
+    def get_confirmations(self, txids: List[str]) -> Dict[str, int]:
+        response = self._client.post(self.url, json={
+            "jsonrpc": "2.0",
+            "id": 1,
+            "method": "getSignatureStatuses",
+            "params": [txids, {"searchTransactionHistory": True}],
+        })
+        response.raise_for_status()
+        statuses = response.json()["result"]["value"]
+        confirmations = {}
+        for txid, status in zip(txids, statuses):
+            if status is None:
+                continue
+            if status.get("err") is not None:
+                confirmations[txid] = TX_FAILED
+            elif status.get("confirmationStatus") == "finalized":
+                confirmations[txid] = self.FINALIZED_CONFIRMATIONS
+            else:
+                confirmations[txid] = status.get("confirmations") or 0
+        return confirmations
+
+
+_clients: Dict[str, ChainClient] = {}
+
+
+def register_chain_client(chain: str, client: ChainClient):
+    """Use a specific client for a chain (overrides the environment)"""
+    _clients[chain] = client
+
+
+def _build_client(chain: str) -> Optional[ChainClient]:
+    if CHAIN_CLIENT_MODE == "fake":
+        return FakeChainClient(chain, auto_mine=CHAIN_FAKE_BLOCKS_PER_POLL)
+    url = os.getenv(f"CHAIN_RPC_URL_{chain.upper()}")
+    if not url:
+        return None
+    if chain in EVM_CHAINS:
+        return EvmChainClient(chain, url)
+    if chain == "bitcoin":
+        return BitcoinChainClient(chain, url)
+    if chain == "solana":
+        return SolanaChainClient(url)
+    return None
+
+
+def get_chain_client(chain: str) -> Optional[ChainClient]:
+    """Client for a chain (CHAIN_RPC_URL_<CHAIN>), or None if it isn't configured"""
+    client = _clients.get(chain)
+    if client is None:
+        client = _build_client(chain)
+        if client is None:
+            logger.warning(f"No chain client configured for {chain}")
+            return None
+        _clients[chain] = client
+    return client
@@ -0,0 +1,89 @@
+"""
+Celery signal handlers for task metrics
+Publishers stamp each message with its enqueue time and record the payload
+size; workers record queue wait on start, run time and outcome on finish,
+and retries. Everything lands in api.services.task_metrics.
+"""
+
+from typing import Dict
+import json
+import os
+import time
+
+from celery import signals
+
+from api.services.task_metrics import task_metrics
+
+# Message header carrying the publish time (epoch seconds)
+ENQUEUED_AT_HEADER = "hc_enqueued_at"
+
+# Start times older than this are dropped (tasks killed before postrun)
+TASK_METRICS_STARTED_TTL = float(os.getenv("TASK_METRICS_STARTED_TTL", str(6 * 3600)))
+
+# task_id -> perf_counter at task_prerun (per worker process)
+_started: Dict[str, float] = {}
+_last_sweep = 0.0
+
+
+def _sweep_started(now: float):
+    """Drop start times past the TTL, at most once per minute"""
+    global _last_sweep
+    if now - _last_sweep < 60:
+        return
+    _last_sweep = now
+    for task_id in [t for t, started in _started.items() if now - started > TASK_METRICS_STARTED_TTL]:
+        _started.pop(task_id, None)
+
+
+def _payload_bytes(body) -> int:
+    if isinstance(body, (bytes, bytearray)):
+        return len(body)
+    try:
+        return len(json.dumps(body, default=str))
+    except (TypeError, ValueError):
+        return 0
+
+
+@signals.before_task_publish.connect
+def on_before_task_publish(sender=None, body=None, headers=None, **kwargs):
+    if headers is not None:
+        headers[ENQUEUED_AT_HEADER] = time.time()
+    task_metrics.published(sender, _payload_bytes(body))
+
+
+@signals.task_prerun.connect
+def on_task_prerun(task_id=None, task=None, **kwargs):
+    now = time.perf_counter()
+    _sweep_started(now)
+    _started[task_id] = now
+    request = task.request
+    enqueued_at = getattr(request, ENQUEUED_AT_HEADER, None)
+    if enqueued_at is None:
+        enqueued_at = (getattr(request, "headers", None) or {}).get(ENQUEUED_AT_HEADER)
+    task_metrics.started(task.name, time.time() - float(enqueued_at) if enqueued_at else None)
+
+
+@signals.task_postrun.connect
+def on_task_postrun(task_id=None, task=None, state=None, **kwargs):
+    started = _started.pop(task_id, None)
+    if started is not None:
+        task_metrics.finished(task.name, state or "UNKNOWN", time.perf_counter() - started)
+
+
+@signals.task_failure.connect
+def on_task_failure(sender=None, task_id=None, **kwargs):
+    # Recorded here so the start time is released even if postrun never runs
+    started = _started.pop(task_id, None)
+    if started is not None:
+        task_metrics.finished(sender.name, "FAILURE", time.perf_counter() - started)
+
+
+@signals.task_revoked.connect
+def on_task_revoked(request=None, **kwargs):
+    if request is not None:
+        _started.pop(request.id, None)
+
+
+@signals.task_retry.connect
+def on_task_retry(sender=None, **kwargs):
+    task_metrics.retried(sender.name)
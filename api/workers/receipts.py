@@ -0,0 +1,310 @@
+"""
+Donation receipt engine
+The receipt PDF is compiled once per process into static byte segments;
+rendering a receipt only formats its content stream and yields the file
+in chunks, which are streamed to object storage without being assembled
+in memory. Bulk mode renders a date range across a process pool.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timezone
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+import io
+import logging
+import multiprocessing
+import os
+import uuid
+
+from sqlalchemy import text
+
+from api.database import engine, get_db_context
+
+logger = logging.getLogger(__name__)
+
+# minio | local
+RECEIPT_STORAGE = os.getenv("RECEIPT_STORAGE", "minio")
+RECEIPTS_BUCKET = os.getenv("RECEIPTS_BUCKET", "receipts")
+RECEIPTS_LOCAL_DIR = os.getenv("RECEIPTS_LOCAL_DIR", "/tmp/hingecraft-receipts")
+RECEIPT_ORG_NAME = os.getenv("RECEIPT_ORG_NAME", "HingeCraft")
+RECEIPT_ORG_DETAILS = os.getenv("RECEIPT_ORG_DETAILS", "Registered nonprofit organization")
+RECEIPT_BULK_PROCESSES = int(os.getenv("RECEIPT_BULK_PROCESSES", str(os.cpu_count() or 1)))
+RECEIPT_BULK_CHUNK = int(os.getenv("RECEIPT_BULK_CHUNK", "200"))
+
+MINIO_ENDPOINT = os.getenv("MINIO_ENDPOINT", "minio:9000")
+MINIO_ACCESS_KEY = os.getenv("MINIO_ACCESS_KEY", "minioadmin")
+MINIO_SECRET_KEY = os.getenv("MINIO_SECRET_KEY", "minioadmin")
+MINIO_SECURE = os.getenv("MINIO_SECURE", "false").lower() in ("1", "true", "yes")
+
+# Content stream for one US Letter page; {fields} are PDF-escaped strings
+RECEIPT_LAYOUT = """BT
+/F2 20 Tf 72 720 Td ({org_name}) Tj
+/F1 10 Tf 0 -16 Td ({org_details}) Tj
+/F2 14 Tf 0 -40 Td (Donation Receipt {receipt_number}) Tj
+/F1 11 Tf 0 -30 Td (Date: {date}) Tj
+0 -18 Td (Donor: {donor}) Tj
+0 -18 Td (Amount: USD {amount_usd}) Tj
+0 -18 Td (Paid: {amount_crypto} {token} on {chain}) Tj
+0 -18 Td (Transaction: {txid}) Tj
+0 -18 Td (Designation: {earmark}) Tj
+/F1 9 Tf 0 -40 Td (No goods or services were provided in exchange for this contribution.) Tj
+0 -14 Td (Please keep this receipt for your tax records.) Tj
+ET
+"""
+
+RECEIPT_FIELDS = (
+    "org_name", "org_details", "receipt_number", "date", "donor",
+    "amount_usd", "amount_crypto", "token", "chain", "txid", "earmark",
+)
+
+
+def pdf_escape(value: Any) -> str:
+    """Escape a value for a PDF literal string (WinAnsi; unmappable chars become '?')"""
+    value = "" if value is None else str(value)
+    value = value.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    return value.encode("latin-1", "replace").decode("latin-1")
+
+
+class ReceiptTemplate:
+    """Pre-built PDF segments for the receipt layout"""
+
+    def __init__(self, layout: str = RECEIPT_LAYOUT):
+        self.layout = layout
+        static_objects = [
+            b"<< /Type /Catalog /Pages 2 0 R >>",
+            b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 4 0 R /F2 5 0 R >> >> /Contents 6 0 R >>",
+            b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+            b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>",
+        ]
+        prefix = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        self.offsets: List[int] = []
+        for number, body in enumerate(static_objects, start=1):
+            self.offsets.append(len(prefix))
+            prefix += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+        self.prefix = bytes(prefix)
+        self.xref_head = b"xref\n0 7\n0000000000 65535 f \n" + b"".join(
+            b"%010d 00000 n \n" % offset for offset in self.offsets
+        )
+
+    def render(self, fields: Dict[str, Any]) -> Iterator[bytes]:
+        """Yield the PDF for one receipt in chunks"""
+        content = self.layout.format(**{name: pdf_escape(fields.get(name)) for name in RECEIPT_FIELDS})
+        content = content.encode("latin-1")
+        stream = b"6 0 obj\n<< /Length %d >>\nstream\n" % len(content)
+        stream_tail = b"\nendstream\nendobj\n"
+        xref_offset = len(self.prefix) + len(stream) + len(content) + len(stream_tail)
+
+        yield self.prefix
+        yield stream
+        yield content
+        yield stream_tail
+        yield self.xref_head + b"%010d 00000 n \n" % len(self.prefix)
+        yield b"trailer\n<< /Size 7 /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % xref_offset
+
+
+@lru_cache(maxsize=1)
+def get_template() -> ReceiptTemplate:
+    """Receipt template compiled once per process"""
+    return ReceiptTemplate()
+
+
+class ChunkReader(io.RawIOBase):
+    """File-like view over an iterator of byte chunks (for streaming uploads)"""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._buffer = b""
+        self.bytes_read = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            data = self._buffer + b"".join(self._chunks)
+            self._buffer = b""
+        else:
+            while len(self._buffer) < size:
+                chunk = next(self._chunks, None)
+                if chunk is None:
+                    break
+                self._buffer += chunk
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        self.bytes_read += len(data)
+        return data
+
+
+class MinioReceiptStore:
+    """Streams receipts into a MinIO/S3 bucket"""
+
+    provider = "minio"
+
+    def __init__(self, bucket: str = RECEIPTS_BUCKET):
+        from minio import Minio
+
+        self.bucket = bucket
+        self.client = Minio(
+            MINIO_ENDPOINT,
+            access_key=MINIO_ACCESS_KEY,
+            secret_key=MINIO_SECRET_KEY,
+            secure=MINIO_SECURE
+        )
+        if not self.client.bucket_exists(bucket):
+            self.client.make_bucket(bucket)
+
+    def put(self, key: str, chunks: Iterable[bytes]) -> Tuple[int, str]:
+        """Upload without a known length (multipart); returns (size, url)"""
+        reader = ChunkReader(chunks)
+        self.client.put_object(
+            self.bucket, key, reader, length=-1,
+            part_size=5 * 1024 * 1024, content_type="application/pdf"
+        )
+        return reader.bytes_read, f"s3://{self.bucket}/{key}"
+
+
+class LocalReceiptStore:
+    """Writes receipts under a local directory (development, benchmarks)"""
+
+    provider = "local"
+
+    def __init__(self, directory: str = RECEIPTS_LOCAL_DIR):
+        self.bucket = directory
+        self.directory = directory
+
+    def put(self, key: str, chunks: Iterable[bytes]) -> Tuple[int, str]:
+        path = os.path.join(self.directory, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        size = 0
+        with open(path, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+                size += len(chunk)
+        return size, f"file://{path}"
+
+
+@lru_cache(maxsize=1)
+def get_store():
+    """Receipt store for this process (RECEIPT_STORAGE)"""
+    if RECEIPT_STORAGE == "local":
+        return LocalReceiptStore()
+    return MinioReceiptStore()
+
+
+def receipt_fields(row) -> Dict[str, Any]:
+    """Template fields for a donation row"""
+    created_at = row.created_at or datetime.now(timezone.utc)
+    return {
+        "org_name": RECEIPT_ORG_NAME,
+        "org_details": RECEIPT_ORG_DETAILS,
+        "receipt_number": row.invoice_id or str(row.id),
+        "date": created_at.strftime("%Y-%m-%d"),
+        "donor": "Anonymous" if row.anonymous or not row.donor_name else row.donor_name,
+        "amount_usd": f"{row.amount_usd:,.2f}",
+        "amount_crypto": row.amount_crypto,
+        "token": row.token,
+        "chain": row.chain,
+        "txid": row.txid or "-",
+        "earmark": row.earmark or "general",
+    }
+
+
+def receipt_key(row) -> str:
+    year = (row.created_at or datetime.now(timezone.utc)).year
+    return f"receipts/{year}/{row.id}.pdf"
+
+
+SELECT_RECEIPT_DONATIONS = """
+    SELECT id, invoice_id, created_at, donor_name, anonymous, amount_usd,
+           amount_crypto, token, chain, txid, earmark
+    FROM donations
+"""
+
+
+def store_receipts(rows) -> List[str]:
+    """Render, upload and record receipts for donation rows; returns asset ids"""
+    template = get_template()
+    store = get_store()
+    assets = []
+    for row in rows:
+        key = receipt_key(row)
+        size, url = store.put(key, template.render(receipt_fields(row)))
+        assets.append({
+            "id": str(uuid.uuid4()),
+            "donation_id": str(row.id),
+            "key": key,
+            "url": url,
+            "filename": f"receipt-{row.invoice_id or row.id}.pdf",
+            "size": size,
+            "provider": store.provider,
+            "bucket": store.bucket,
+        })
+    if not assets:
+        return []
+    with get_db_context() as db:
+        db.execute(text("""
+            INSERT INTO assets (id, key, url, filename, size, mime, storage_provider, bucket)
+            VALUES (:id, :key, :url, :filename, :size, 'application/pdf', :provider, :bucket)
+            ON CONFLICT (key) DO UPDATE SET size = EXCLUDED.size, url = EXCLUDED.url
+        """), assets)
+        db.execute(text("""
+            UPDATE donations AS d
+            SET receipt_id = a.id, updated_at = NOW()
+            FROM unnest(CAST(:donation_ids AS uuid[]), CAST(:keys AS text[])) AS v(donation_id, key)
+            JOIN assets AS a ON a.key = v.key
+            WHERE d.id = v.donation_id
+        """), {
+            "donation_ids": [a["donation_id"] for a in assets],
+            "keys": [a["key"] for a in assets],
+        })
+    return [a["id"] for a in assets]
+
+
+def generate_receipts(donation_ids: List[str]) -> List[str]:
+    """Generate receipts for specific donations"""
+    if not donation_ids:
+        return []
+    with get_db_context() as db:
+        rows = db.execute(
+            text(SELECT_RECEIPT_DONATIONS + " WHERE id = ANY(CAST(:ids AS uuid[]))"),
+            {"ids": donation_ids}
+        ).fetchall()
+    return store_receipts(rows)
+
+
+def _init_bulk_worker():
+    # Connections inherited from the parent must not be reused after fork
+    engine.dispose(close=False)
+
+
+def generate_receipts_range(
+    start: date,
+    end: date,
+    processes: int = RECEIPT_BULK_PROCESSES,
+    chunk_size: int = RECEIPT_BULK_CHUNK
+) -> int:
+    """
+    Receipts for every confirmed donation created in [start, end) that
+    doesn't have one yet, rendered across a process pool. Returns count.
+    Daemonic processes (Celery prefork children) can't own a pool, so run
+    bulk jobs on a worker started with --pool=solo or --pool=threads.
+    """
+    if processes > 1 and multiprocessing.current_process().daemon:
+        logger.warning("Bulk receipts in a daemonic process; rendering in-process")
+        processes = 1
+    with get_db_context() as db:
+        ids = [str(row.id) for row in db.execute(text("""
+            SELECT id FROM donations
+            WHERE created_at >= :start AND created_at < :end
+              AND status IN ('confirmed', 'reconciled')
+              AND receipt_id IS NULL
+            ORDER BY created_at
+        """), {"start": start, "end": end})]
+    if not ids:
+        return 0
+    chunks = [ids[offset:offset + chunk_size] for offset in range(0, len(ids), chunk_size)]
+    if processes <= 1 or len(chunks) == 1:
+        return sum(len(generate_receipts(chunk)) for chunk in chunks)
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_bulk_worker) as pool:
+        return sum(len(assets) for assets in pool.map(generate_receipts, chunks))
@@ -0,0 +1,73 @@
+"""
+AML/OFAC screening providers
+screen_donations asks the configured provider for a risk score and a
+sanctions match per donation. Screening fails closed: without a provider
+donations are held as 'unscreened', and when the provider errors they are
+not cleared (their pipeline is re-dispatched later). AML_SCREENING_PROVIDER=fake
+clears everything with a zero score, for tests and local runs only.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping, Optional
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# none | fake
+AML_SCREENING_PROVIDER = os.getenv("AML_SCREENING_PROVIDER", "none")
+# Donations scoring at or above this (0-100) are flagged
+AML_FLAG_SCORE = float(os.getenv("AML_FLAG_SCORE", "75"))
+
+
+@dataclass(frozen=True)
+class ScreeningResult:
+    aml_score: float
+    sanctions_match: bool = False
+
+
+class ScreeningProvider:
+    """Screens many donations per call"""
+
+    name: str = ""
+
+    def screen(self, donations: List[Mapping[str, Any]]) -> Dict[str, ScreeningResult]:
+        """
+        Results by donation id for rows with id, chain, from_address, txid
+        and amount_usd; ids the provider couldn't screen are omitted.
+        Raises on provider errors.
+        """
+        raise NotImplementedError
+
+
+class FakeScreeningProvider(ScreeningProvider):
+    """Fixed results by donation id (anything else is clean)"""
+
+    name = "fake"
+
+    def __init__(self, results: Optional[Dict[str, ScreeningResult]] = None):
+        self.results = dict(results or {})
+
+    def screen(self, donations: List[Mapping[str, Any]]) -> Dict[str, ScreeningResult]:
+        return {
+            str(row["id"]): self.results.get(str(row["id"]), ScreeningResult(0.0))
+            for row in donations
+        }
+
+
+_provider: Optional[ScreeningProvider] = None
+
+
+def register_screening_provider(provider: Optional[ScreeningProvider]):
+    """Use a specific provider (overrides the environment; None unsets it)"""
+    global _provider
+    _provider = provider
+
+
+def get_screening_provider() -> Optional[ScreeningProvider]:
+    """Configured provider, or None when there is none (donations stay unscreened)"""
+    global _provider
+    if _provider is None and AML_SCREENING_PROVIDER == "fake":
+        logger.warning("AML screening uses the fake provider: every donation is cleared")
+        _provider = FakeScreeningProvider()
+    return _provider
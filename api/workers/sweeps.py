@@ -0,0 +1,303 @@
+"""
+Wallet sweep planner
+plan_sweeps() is a pure function from wallet balances and pending sweep
+operations to a batched plan: transfers are grouped per chain and
+destination into as few transactions as each chain's transaction model
+allows. plan_naive() is the one-transaction-per-transfer baseline, and
+simulate() compares plans by fees and time to settle.
+"""
+
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ChainFeeModel:
+    """
+    How transfers on a chain can be combined and what they cost (native units).
+    kind: "utxo" (many inputs, one output per tx), "multi_op" (many transfer
+    operations per tx) or "account" (one sender per tx).
+    """
+
+    kind: str
+    base_fee: Decimal
+    per_input: Decimal = Decimal("0")
+    per_output: Decimal = Decimal("0")
+    max_inputs: int = 1
+    min_sweep: Decimal = Decimal("0")
+    # Seconds to submit one transaction from the sweep signer / to finality
+    submit_seconds: float = 1.0
+    confirm_seconds: float = 60.0
+
+
+# Illustrative defaults; pass fee_models= to plan with live fee estimates
+FEE_MODELS: Dict[str, ChainFeeModel] = {
+    "bitcoin": ChainFeeModel(
+        "utxo", base_fee=Decimal("0.00001100"), per_input=Decimal("0.00000680"),
+        per_output=Decimal("0.00000310"), max_inputs=500, min_sweep=Decimal("0.00010000"),
+        submit_seconds=2.0, confirm_seconds=1800.0
+    ),
+    "ethereum": ChainFeeModel(
+        "account", base_fee=Decimal("0.00042000"), min_sweep=Decimal("0.00500000"),
+        submit_seconds=1.0, confirm_seconds=156.0
+    ),
+    "polygon": ChainFeeModel(
+        "account", base_fee=Decimal("0.00200000"), min_sweep=Decimal("0.10000000"),
+        submit_seconds=1.0, confirm_seconds=128.0
+    ),
+    "solana": ChainFeeModel(
+        "multi_op", base_fee=Decimal("0.00000500"), per_input=Decimal("0.00000500"),
+        max_inputs=8, min_sweep=Decimal("0.00100000"), submit_seconds=0.5, confirm_seconds=13.0
+    ),
+    "stellar": ChainFeeModel(
+        "multi_op", base_fee=Decimal("0.00001000"), per_input=Decimal("0.00001000"),
+        max_inputs=100, min_sweep=Decimal("1.00000000"), submit_seconds=0.5, confirm_seconds=6.0
+    ),
+}
+
+
+@dataclass(frozen=True)
+class SweepTransfer:
+    """One source's contribution to a sweep"""
+
+    chain: str
+    from_wallet_id: str
+    from_address: str
+    to_wallet_id: Optional[str]
+    to_address: str
+    amount: Decimal
+    operation_ids: Tuple[str, ...] = ()
+
+
+@dataclass
+class SweepTransaction:
+    """One on-chain transaction in a plan"""
+
+    chain: str
+    to_wallet_id: Optional[str]
+    to_address: str
+    transfers: List[SweepTransfer]
+    fee: Decimal
+
+    @property
+    def amount(self) -> Decimal:
+        return sum((t.amount for t in self.transfers), Decimal("0"))
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "chain": self.chain,
+            "to_wallet_id": self.to_wallet_id,
+            "to_address": self.to_address,
+            "amount": str(self.amount),
+            "fee": str(self.fee),
+            "from_wallet_ids": [t.from_wallet_id for t in self.transfers],
+            "operation_ids": [op for t in self.transfers for op in t.operation_ids],
+        }
+
+
+@dataclass
+class SweepPlan:
+    transactions: List[SweepTransaction] = field(default_factory=list)
+    # Transfers left out because fees would eat most of them
+    skipped: List[SweepTransfer] = field(default_factory=list)
+    # Transfers on chains without a fee model
+    unsupported: List[SweepTransfer] = field(default_factory=list)
+
+    def fees_by_chain(self) -> Dict[str, Decimal]:
+        """Total fees per chain (native units, so not summable across chains)"""
+        fees: Dict[str, Decimal] = {}
+        for tx in self.transactions:
+            fees[tx.chain] = fees.get(tx.chain, Decimal("0")) + tx.fee
+        return fees
+
+    def by_chain(self) -> Dict[str, List[SweepTransaction]]:
+        chains: Dict[str, List[SweepTransaction]] = {}
+        for tx in self.transactions:
+            chains.setdefault(tx.chain, []).append(tx)
+        return chains
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "transactions": [tx.as_dict() for tx in self.transactions],
+            "skipped_wallet_ids": [t.from_wallet_id for t in self.skipped],
+            "unsupported_chains": sorted({t.chain for t in self.unsupported}),
+            "fees": {chain: str(fee) for chain, fee in self.fees_by_chain().items()},
+        }
+
+
+def transaction_fee(model: ChainFeeModel, transfer_count: int) -> Decimal:
+    """Fee for one transaction carrying transfer_count transfers"""
+    if model.kind == "utxo":
+        return model.base_fee + model.per_input * transfer_count + model.per_output
+    if model.kind == "multi_op":
+        return model.base_fee + model.per_input * transfer_count
+    return model.base_fee
+
+
+def marginal_fee(model: ChainFeeModel) -> Decimal:
+    """Extra fee for adding one transfer to a batched transaction"""
+    return model.base_fee if model.kind == "account" else model.per_input
+
+
+def collect_transfers(
+    wallets: Iterable[Mapping[str, Any]],
+    operations: Iterable[Mapping[str, Any]],
+    destinations: Mapping[str, Mapping[str, Any]]
+) -> List[SweepTransfer]:
+    """
+    Transfers to make: pending sweep operations as recorded, plus a full
+    balance sweep to the chain's destination for every other active
+    receiving wallet. Rows are mappings with wallets/treasury_operations columns.
+    """
+    wallets_by_id = {str(w["id"]): w for w in wallets}
+    transfers: Dict[Tuple[str, str], SweepTransfer] = {}
+
+    for op in operations:
+        source = wallets_by_id.get(str(op["from_wallet_id"]))
+        target = wallets_by_id.get(str(op["to_wallet_id"])) if op.get("to_wallet_id") else None
+        if source is None:
+            continue
+        if target is None:
+            target = destinations.get(source["chain"])
+        if target is None:
+            continue
+        key = (str(source["id"]), str(target["id"]))
+        previous = transfers.get(key)
+        transfers[key] = SweepTransfer(
+            chain=source["chain"],
+            from_wallet_id=str(source["id"]),
+            from_address=source["address"],
+            to_wallet_id=str(target["id"]),
+            to_address=target["address"],
+            amount=Decimal(str(op["amount_crypto"])) + (previous.amount if previous else Decimal("0")),
+            operation_ids=(previous.operation_ids if previous else ()) + (str(op["id"]),),
+        )
+
+    swept = {from_id for from_id, _ in transfers}
+    destination_ids = {str(d["id"]) for d in destinations.values()}
+    for wallet in wallets:
+        wallet_id = str(wallet["id"])
+        balance = Decimal(str(wallet.get("balance_crypto") or 0))
+        target = destinations.get(wallet["chain"])
+        if (
+            target is None
+            or wallet_id in swept
+            or wallet_id in destination_ids
+            or not wallet.get("active", True)
+            or wallet.get("wallet_type", "public") not in ("public", "hot")
+            or balance <= 0
+        ):
+            continue
+        transfers[(wallet_id, str(target["id"]))] = SweepTransfer(
+            chain=wallet["chain"],
+            from_wallet_id=wallet_id,
+            from_address=wallet["address"],
+            to_wallet_id=str(target["id"]),
+            to_address=target["address"],
+            amount=balance,
+        )
+    return list(transfers.values())
+
+
+def _fee_model(chain: str, fee_models: Mapping[str, ChainFeeModel]) -> ChainFeeModel:
+    model = fee_models.get(chain)
+    if model is None:
+        raise ValueError(f"No fee model for chain {chain}")
+    return model
+
+
+def plan_sweeps(
+    transfers: Iterable[SweepTransfer],
+    fee_models: Mapping[str, ChainFeeModel] = FEE_MODELS
+) -> SweepPlan:
+    """
+    Batched plan: per chain and destination, UTXO inputs and multi-op
+    transfers are packed up to max_inputs per transaction (largest first);
+    account chains need one transaction per sender, with every transfer
+    from that sender to the same destination merged. Transfers below
+    min_sweep or worth less than twice their marginal fee are skipped, and
+    chains without a fee model are left out (logged) without failing the rest.
+    """
+    plan = SweepPlan()
+    groups: Dict[Tuple[str, str], List[SweepTransfer]] = {}
+    for transfer in transfers:
+        model = fee_models.get(transfer.chain)
+        if model is None:
+            plan.unsupported.append(transfer)
+            continue
+        if transfer.amount < model.min_sweep or transfer.amount <= 2 * marginal_fee(model):
+            plan.skipped.append(transfer)
+            continue
+        groups.setdefault((transfer.chain, transfer.to_address), []).append(transfer)
+    for chain in sorted({t.chain for t in plan.unsupported}):
+        logger.warning(f"No fee model for chain {chain}, not planning its sweeps")
+
+    for (chain, to_address), group in sorted(groups.items()):
+        model = fee_models[chain]
+        group.sort(key=lambda t: t.amount, reverse=True)
+        if model.kind == "account":
+            merged: Dict[str, SweepTransfer] = {}
+            for t in group:
+                prev = merged.get(t.from_wallet_id)
+                merged[t.from_wallet_id] = t if prev is None else SweepTransfer(
+                    chain, t.from_wallet_id, t.from_address, t.to_wallet_id, to_address,
+                    prev.amount + t.amount, prev.operation_ids + t.operation_ids
+                )
+            batches = [[t] for t in merged.values()]
+        else:
+            size = max(1, model.max_inputs)
+            batches = [group[offset:offset + size] for offset in range(0, len(group), size)]
+        for batch in batches:
+            plan.transactions.append(SweepTransaction(
+                chain=chain,
+                to_wallet_id=batch[0].to_wallet_id,
+                to_address=to_address,
+                transfers=batch,
+                fee=transaction_fee(model, len(batch)),
+            ))
+    return plan
+
+
+def plan_naive(
+    transfers: Iterable[SweepTransfer],
+    fee_models: Mapping[str, ChainFeeModel] = FEE_MODELS
+) -> SweepPlan:
+    """Baseline: one transaction per transfer, nothing skipped"""
+    plan = SweepPlan()
+    for t in transfers:
+        model = _fee_model(t.chain, fee_models)
+        plan.transactions.append(SweepTransaction(
+            chain=t.chain,
+            to_wallet_id=t.to_wallet_id,
+            to_address=t.to_address,
+            transfers=[t],
+            fee=transaction_fee(model, 1),
+        ))
+    return plan
+
+
+def simulate(plan: SweepPlan, fee_models: Mapping[str, ChainFeeModel] = FEE_MODELS) -> Dict[str, Any]:
+    """
+    Fees and settle time of a plan. Each chain's transactions are submitted
+    one after another by its sweep signer and chains run in parallel, so a
+    chain settles after n * submit_seconds + confirm_seconds.
+    """
+    per_chain = {}
+    for chain, transactions in plan.by_chain().items():
+        model = fee_models[chain]
+        per_chain[chain] = {
+            "transactions": len(transactions),
+            "transfers": sum(len(tx.transfers) for tx in transactions),
+            "fee": str(sum((tx.fee for tx in transactions), Decimal("0"))),
+            "settle_seconds": round(len(transactions) * model.submit_seconds + model.confirm_seconds, 1),
+        }
+    return {
+        "transactions": len(plan.transactions),
+        "skipped": len(plan.skipped),
+        "settle_seconds": max((c["settle_seconds"] for c in per_chain.values()), default=0.0),
+        "chains": per_chain,
+    }
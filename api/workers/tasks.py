@@ -1,55 +1,413 @@
 """
 Background worker tasks
+Donation lifecycle: the confirmation poller (dispatch_donation_pipelines)
+confirms pending donations in bulk per chain, then runs compliance ->
+receipt -> NFT as a Celery canvas per batch of confirmed donations
+(see post_confirmation_pipeline)
 """
 
 from api.celery_app import celery_app
-from api.database import get_db
+from api.database import get_db, get_db_context
+from api.workers.chain_clients import TX_FAILED, get_chain_client
+from api.workers.receipts import generate_receipts, generate_receipts_range
+from api.workers.screening import AML_FLAG_SCORE, get_screening_provider
+from api.workers.sweeps import collect_transfers, plan_sweeps
+from celery import chain as celery_chain, group
+from sqlalchemy import text
+from datetime import date
+from typing import Dict, List, Optional
 import logging
+import os
 
 logger = logging.getLogger(__name__)
 
+# Donations per pipeline run (one confirmation lookup per batch)
+PIPELINE_BATCH_SIZE = int(os.getenv("DONATION_PIPELINE_BATCH_SIZE", "200"))
+
+# Confirmed donations whose pipeline hasn't completed this long after dispatch are dispatched again
+PIPELINE_REDISPATCH_AFTER = float(os.getenv("DONATION_PIPELINE_REDISPATCH_AFTER", "600"))
+
+# Donations at or above this amount need KYC before a receipt is issued
+COMPLIANCE_KYC_THRESHOLD_USD = float(os.getenv("COMPLIANCE_KYC_THRESHOLD_USD", "10000"))
+
+# Confirmations after which a donation counts as final
+REQUIRED_CONFIRMATIONS: Dict[str, int] = {
+    "bitcoin": 3,
+    "ethereum": 12,
+    "polygon": 64,
+    "solana": 32,
+    "stellar": 1,
+}
+DEFAULT_REQUIRED_CONFIRMATIONS = 6
+
+
+def update_donation_confirmations(txid: str, confirmations: int, status: Optional[str] = None):
+    """
+    Record confirmations (and optionally status) for a donation.
+    The donation_changes trigger publishes the change to API workers, which
+    push it to open SSE streams and evict cached lookups.
+    """
+    with get_db_context() as db:
+        db.execute(text("""
+            UPDATE donations
+            SET confirmations = :confirmations,
+                status = COALESCE(:status, status),
+                updated_at = NOW()
+            WHERE txid = :txid
+        """), {"txid": txid, "confirmations": confirmations, "status": status})
+
 
 @celery_app.task(name="blockchain_confirm_worker")
-def blockchain_confirm_worker(txid: str, chain: str):
+def blockchain_confirm_worker(
+    txid: str,
+    chain: str,
+    confirmations: Optional[int] = None,
+    status: Optional[str] = None
+):
     """Confirm blockchain transactions and update donation status"""
     logger.info(f"Confirming transaction {txid} on {chain}")
     # Implement blockchain confirmation logic
-    pass
+    if confirmations is not None:
+        update_donation_confirmations(txid, confirmations, status)
+
+
+def lookup_confirmations(chain: str, txids: List[str]) -> Dict[str, int]:
+    """Confirmation counts for many txids on one chain (one RPC round trip per client batch)"""
+    client = get_chain_client(chain)
+    if client is None or not txids:
+        return {}
+    return client.get_confirmations_batched(txids)
+
+
+def apply_confirmations(chain: str, confirmations: Dict[str, int]) -> List[str]:
+    """
+    Write confirmation counts for pending donations in one UPDATE.
+    Returns ids of donations that reached the chain's required confirmations
+    (stamped as dispatched to the post-confirmation pipeline in the same
+    UPDATE); TX_FAILED marks the donation failed.
+    """
+    if not confirmations:
+        return []
+    txids = list(confirmations)
+    with get_db_context() as db:
+        rows = db.execute(text("""
+            UPDATE donations AS d
+            SET confirmations = GREATEST(v.confirmations, 0),
+                status = CASE
+                    WHEN v.confirmations = :failed THEN 'failed'
+                    WHEN v.confirmations >= :required THEN 'confirmed'
+                    ELSE d.status
+                END,
+                pipeline_dispatched_at = CASE
+                    WHEN v.confirmations <> :failed AND v.confirmations >= :required THEN NOW()
+                    ELSE d.pipeline_dispatched_at
+                END,
+                updated_at = NOW()
+            FROM unnest(CAST(:txids AS text[]), CAST(:confirmations AS integer[]))
+                AS v(txid, confirmations)
+            WHERE d.txid = v.txid AND d.chain = :chain AND d.status = 'pending'
+            RETURNING d.id, d.status
+        """), {
+            "chain": chain,
+            "failed": TX_FAILED,
+            "required": REQUIRED_CONFIRMATIONS.get(chain, DEFAULT_REQUIRED_CONFIRMATIONS),
+            "txids": txids,
+            "confirmations": [confirmations[txid] for txid in txids],
+        }).fetchall()
+    return [str(row.id) for row in rows if row.status == "confirmed"]
+
+
+def screen_donations(donation_ids: List[str]) -> List[str]:
+    """
+    Compliance gate for confirmed donations; returns the ids that passed.
+    Each donation is screened by the AML provider (recording aml_score and
+    ofac_flag). Sanctioned or high-risk donations become 'flagged', large
+    ones without KYC 'kyc_required'. Without a provider they become
+    'unscreened'; if the provider fails they stay 'confirmed' and are
+    retried when their pipeline is re-dispatched.
+    """
+    if not donation_ids:
+        return []
+    with get_db_context() as db:
+        rows = db.execute(text("""
+            SELECT id, chain, from_address, txid, amount_usd, ofac_flag, kyc_id
+            FROM donations
+            WHERE id = ANY(CAST(:ids AS uuid[])) AND status = 'confirmed'
+        """), {"ids": donation_ids}).fetchall()
+    if not rows:
+        return []
+
+    provider = get_screening_provider()
+    results = {}
+    if provider is None:
+        logger.error(f"No AML screening provider configured, holding {len(rows)} donations as unscreened")
+    else:
+        try:
+            results = provider.screen([dict(row._mapping) for row in rows])
+        except Exception as e:
+            logger.error(f"AML screening via {provider.name} failed, not clearing {len(rows)} donations: {e}")
+            return []
+
+    # id -> (new status or None to clear, aml_score, ofac_flag)
+    decisions: Dict[str, tuple] = {}
+    for row in rows:
+        donation_id = str(row.id)
+        result = results.get(donation_id)
+        ofac_flag = bool(row.ofac_flag or (result is not None and result.sanctions_match))
+        if ofac_flag or (result is not None and result.aml_score >= AML_FLAG_SCORE):
+            status = "flagged"
+        elif result is None:
+            status = "unscreened"
+        elif row.amount_usd >= COMPLIANCE_KYC_THRESHOLD_USD and row.kyc_id is None:
+            status = "kyc_required"
+        else:
+            status = None
+        decisions[donation_id] = (status, result.aml_score if result is not None else None, ofac_flag)
+
+    with get_db_context() as db:
+        db.execute(text("""
+            UPDATE donations AS d
+            SET status = COALESCE(v.status, d.status),
+                aml_score = COALESCE(v.aml_score, d.aml_score),
+                ofac_flag = v.ofac_flag,
+                updated_at = NOW()
+            FROM unnest(
+                CAST(:ids AS uuid[]), CAST(:statuses AS text[]),
+                CAST(:scores AS numeric[]), CAST(:ofac_flags AS boolean[])
+            ) AS v(id, status, aml_score, ofac_flag)
+            WHERE d.id = v.id AND d.status = 'confirmed'
+        """), {
+            "ids": list(decisions),
+            "statuses": [d[0] for d in decisions.values()],
+            "scores": [d[1] for d in decisions.values()],
+            "ofac_flags": [d[2] for d in decisions.values()],
+        })
+    return [donation_id for donation_id, (status, _, _) in decisions.items() if status is None]
+
+
+def generate_receipt(donation_id: str):
+    """Generate PDF receipt and store"""
+    logger.info(f"Generating receipt for donation {donation_id}")
+    generate_receipts([donation_id])
+
+
+def mint_nft(donation_id: str):
+    """Mint receipt NFT"""
+    logger.info(f"Minting NFT for donation {donation_id}")
+    # Implement NFT minting logic
+
+
+@celery_app.task(name="compliance_batch")
+def compliance_batch(donation_ids: List[str]) -> List[str]:
+    """Run AML/OFAC checks on confirmed donations; returns the cleared ids"""
+    logger.info(f"Running compliance checks for {len(donation_ids)} donations")
+    return screen_donations(donation_ids)
+
+
+@celery_app.task(name="receipt_batch")
+def receipt_batch(donation_ids: List[str]) -> List[str]:
+    """Generate receipts for cleared donations"""
+    generate_receipts(donation_ids)
+    return donation_ids
+
+
+@celery_app.task(name="receipt_bulk_worker")
+def receipt_bulk_worker(start: str, end: str, processes: Optional[int] = None) -> int:
+    """Receipts for confirmed donations created in [start, end) (ISO dates), on a process pool"""
+    kwargs = {"processes": processes} if processes else {}
+    count = generate_receipts_range(date.fromisoformat(start), date.fromisoformat(end), **kwargs)
+    logger.info(f"Generated {count} receipts for {start}..{end}")
+    return count
+
+
+@celery_app.task(name="nft_batch")
+def nft_batch(donation_ids: List[str]) -> List[str]:
+    """Mint receipt NFTs for cleared donations (last pipeline step: marks them completed)"""
+    for donation_id in donation_ids:
+        mint_nft(donation_id)
+    mark_pipelines_completed(donation_ids)
+    return donation_ids
+
+
+def mark_pipelines_completed(donation_ids: List[str]):
+    """Record that the post-confirmation pipeline finished for these donations"""
+    if not donation_ids:
+        return
+    with get_db_context() as db:
+        db.execute(text("""
+            UPDATE donations
+            SET pipeline_completed_at = NOW()
+            WHERE id = ANY(CAST(:ids AS uuid[]))
+        """), {"ids": donation_ids})
+
+
+def claim_stalled_pipelines(after: float = PIPELINE_REDISPATCH_AFTER) -> Dict[str, List[str]]:
+    """
+    Confirmed donations whose pipeline was dispatched more than `after`
+    seconds ago and never completed (lost message, worker crash, failed
+    step), re-stamped as dispatched. Returns their ids by chain.
+    """
+    with get_db_context() as db:
+        rows = db.execute(text("""
+            UPDATE donations
+            SET pipeline_dispatched_at = NOW()
+            WHERE status = 'confirmed'
+              AND pipeline_completed_at IS NULL
+              AND pipeline_dispatched_at < NOW() - :after * interval '1 second'
+            RETURNING id, chain
+        """), {"after": after}).fetchall()
+    stalled: Dict[str, List[str]] = {}
+    for row in rows:
+        stalled.setdefault(row.chain, []).append(str(row.id))
+    return stalled
+
+
+def post_confirmation_pipeline(donation_ids: List[str]):
+    """Canvas for donations that are already confirmed: compliance -> receipt -> NFT"""
+    return celery_chain(
+        compliance_batch.s(donation_ids),
+        receipt_batch.s(),
+        nft_batch.s(),
+    )
+
+
+def poll_pending_confirmations() -> Dict[str, List[str]]:
+    """
+    Look up confirmations for every pending donation, batched per chain
+    through its chain client, with one bulk UPDATE per chain.
+    Returns newly confirmed donation ids by chain.
+    """
+    with get_db_context() as db:
+        rows = db.execute(text("""
+            SELECT chain, txid
+            FROM donations
+            WHERE status = 'pending' AND txid IS NOT NULL
+            ORDER BY chain, created_at
+        """)).fetchall()
+
+    by_chain: Dict[str, List[str]] = {}
+    for row in rows:
+        by_chain.setdefault(row.chain, []).append(row.txid)
+
+    confirmed: Dict[str, List[str]] = {}
+    for chain, txids in by_chain.items():
+        try:
+            confirmations = lookup_confirmations(chain, txids)
+        except Exception as e:
+            logger.error(f"Confirmation lookup failed for {chain}: {e}")
+            continue
+        confirmed[chain] = apply_confirmations(chain, confirmations)
+    return confirmed
+
+
+@celery_app.task(name="dispatch_donation_pipelines")
+def dispatch_donation_pipelines(batch_size: Optional[int] = None) -> int:
+    """
+    Confirmation poller: update all pending donations, then start one
+    compliance -> receipt -> NFT pipeline per batch of newly confirmed
+    donations on a chain, plus confirmed donations whose earlier pipeline
+    never completed. Returns pipelines started.
+    """
+    batch_size = batch_size or PIPELINE_BATCH_SIZE
+    confirmed = poll_pending_confirmations()
+    stalled = claim_stalled_pipelines()
+    if stalled:
+        logger.warning(f"Re-dispatching {sum(len(ids) for ids in stalled.values())} stalled donation pipelines")
+    for chain, ids in stalled.items():
+        confirmed.setdefault(chain, []).extend(ids)
+
+    pipelines = [
+        post_confirmation_pipeline(ids[offset:offset + batch_size])
+        for ids in confirmed.values()
+        for offset in range(0, len(ids), batch_size)
+    ]
+    if pipelines:
+        group(pipelines).apply_async()
+        logger.info(
+            f"Started {len(pipelines)} donation pipelines for "
+            f"{sum(len(ids) for ids in confirmed.values())} confirmed donations"
+        )
+    return len(pipelines)
 
 
 @celery_app.task(name="compliance_worker")
 def compliance_worker(donation_id: str):
     """Run AML/OFAC checks on donation"""
     logger.info(f"Running compliance checks for donation {donation_id}")
-    # Implement compliance checking logic
-    pass
+    return screen_donations([donation_id])
 
 
 @celery_app.task(name="receipt_worker")
 def receipt_worker(donation_id: str):
     """Generate PDF receipt and store"""
-    logger.info(f"Generating receipt for donation {donation_id}")
-    # Implement receipt generation logic
-    pass
+    generate_receipt(donation_id)
 
 
 @celery_app.task(name="nft_worker")
 def nft_worker(donation_id: str):
     """Mint receipt NFT"""
-    logger.info(f"Minting NFT for donation {donation_id}")
-    # Implement NFT minting logic
-    pass
+    mint_nft(donation_id)
 
 
-@celery_app.task(name="sweep_worker")
-def sweep_worker(wallet_id: str):
-    """Batch and sweep funds from wallet"""
-    logger.info(f"Sweeping funds from wallet {wallet_id}")
-    # Implement fund sweeping logic
-    pass
-
+@celery_app.task(name="webhook_consumer_worker")
+def webhook_consumer_worker(batch_size: Optional[int] = None):
+    """Process pending webhooks until the backlog is drained"""
+    from api.workers.webhook_consumer import WEBHOOK_BATCH_SIZE, drain_webhooks
 
+    batch_size = batch_size or WEBHOOK_BATCH_SIZE
+    total = 0
+    while True:
+        result = drain_webhooks(batch_size)
+        total += result["processed"]
+        # Failed rows are backed off, but stop rather than spin if a batch made no progress
+        if result["claimed"] < batch_size or not result["processed"]:
+            break
+    if total:
+        logger.info(f"Processed {total} webhooks")
+    return total
 
 
+def load_sweep_inputs(chain: Optional[str] = None):
+    """(wallets, pending sweep operations, destination per chain) from the database"""
+    params = {"chain": chain}
+    with get_db_context() as db:
+        wallets = [dict(row._mapping) for row in db.execute(text("""
+            SELECT id, chain, address, wallet_type, balance_crypto, active
+            FROM wallets
+            WHERE active = true AND (CAST(:chain AS text) IS NULL OR chain = :chain)
+            ORDER BY chain, created_at, id
+        """), params)]
+        operations = [dict(row._mapping) for row in db.execute(text("""
+            SELECT o.id, o.from_wallet_id, o.to_wallet_id, o.amount_crypto
+            FROM treasury_operations AS o
+            JOIN wallets AS w ON w.id = o.from_wallet_id
+            WHERE o.operation_type = 'sweep'
+              AND o.status IN ('pending', 'approved')
+              AND (CAST(:chain AS text) IS NULL OR w.chain = :chain)
+        """), params)]
+    # Sweep into the oldest active cold wallet of each chain
+    destinations = {}
+    for wallet in wallets:
+        if wallet["wallet_type"] == "cold":
+            destinations.setdefault(wallet["chain"], wallet)
+    return wallets, operations, destinations
 
 
+@celery_app.task(name="sweep_worker")
+def sweep_worker(wallet_id: Optional[str] = None) -> dict:
+    """
+    Plan sweeps only: batches every receiving wallet (on wallet_id's chain
+    when given) into the fewest transactions per chain and returns the
+    plan. Nothing is signed or broadcast: executing plans is not implemented.
+    Raises ValueError for an unknown wallet_id.
+    """
+    chain = None
+    if wallet_id:
+        with get_db_context() as db:
+            chain = db.execute(
+                text("SELECT chain FROM wallets WHERE id = :id"), {"id": wallet_id}
+            ).scalar()
+        if chain is None:
+            raise ValueError(f"Unknown wallet {wallet_id}")
+    logger.info(f"Planning sweeps for {chain or 'all chains'}")
+    return plan_sweeps(collect_transfers(*load_sweep_inputs(chain))).as_dict()
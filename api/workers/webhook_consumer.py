@@ -0,0 +1,108 @@
+"""
+Webhook consumer
+Drains unprocessed rows from the webhooks table in batches. Rows are
+claimed with FOR UPDATE SKIP LOCKED, so any number of workers can share
+the backlog without handling the same delivery twice.
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import logging
+import os
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from api.database import get_db_context
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_BATCH_SIZE = int(os.getenv("WEBHOOK_BATCH_SIZE", "100"))
+WEBHOOK_MAX_RETRIES = int(os.getenv("WEBHOOK_MAX_RETRIES", "5"))
+# Failed rows wait base * 2^retry_count seconds (capped) before the next attempt
+WEBHOOK_RETRY_BACKOFF_SECONDS = float(os.getenv("WEBHOOK_RETRY_BACKOFF_SECONDS", "30"))
+WEBHOOK_RETRY_MAX_BACKOFF_SECONDS = float(os.getenv("WEBHOOK_RETRY_MAX_BACKOFF_SECONDS", "3600"))
+
+# handler(db, payload) - runs inside the claiming transaction
+WebhookHandler = Callable[[Session, Dict[str, Any]], None]
+
+# (provider, event_type) -> handler; event_type None matches any event
+WEBHOOK_HANDLERS: Dict[Tuple[str, Optional[str]], WebhookHandler] = {}
+
+
+def register_webhook_handler(provider: str, event_type: Optional[str] = None):
+    """Decorator registering a handler for a provider's events"""
+    def decorator(handler: WebhookHandler) -> WebhookHandler:
+        WEBHOOK_HANDLERS[(provider, event_type)] = handler
+        return handler
+    return decorator
+
+
+def _handler_for(provider: str, event_type: Optional[str]) -> Optional[WebhookHandler]:
+    return WEBHOOK_HANDLERS.get((provider, event_type)) or WEBHOOK_HANDLERS.get((provider, None))
+
+
+@register_webhook_handler("wix", "form_submit")
+def handle_wix_form_submit(db: Session, payload: Dict[str, Any]):
+    """Wix form submission"""
+    data = payload.get("data", {})
+    logger.info(f"Wix form submission from {payload.get('source')} ({len(data)} fields)")
+    # Process donation or other form data
+
+
+def drain_webhooks(
+    batch_size: int = WEBHOOK_BATCH_SIZE,
+    max_retries: int = WEBHOOK_MAX_RETRIES
+) -> Dict[str, int]:
+    """
+    Claim and process one batch of pending webhooks.
+    Each handler runs in a savepoint; failures record error_message, bump
+    retry_count and push next_attempt_at back exponentially, and rows are
+    retried until max_retries is reached.
+    Events without a handler are marked processed.
+    """
+    processed: List[str] = []
+    failed = 0
+    with get_db_context() as db:
+        rows = db.execute(text("""
+            SELECT id, provider, event_type, payload
+            FROM webhooks
+            WHERE processed = false AND retry_count < :max_retries
+              AND (next_attempt_at IS NULL OR next_attempt_at <= NOW())
+            ORDER BY received_at
+            LIMIT :batch_size
+            FOR UPDATE SKIP LOCKED
+        """), {"batch_size": batch_size, "max_retries": max_retries}).fetchall()
+
+        for row in rows:
+            handler = _handler_for(row.provider, row.event_type)
+            try:
+                if handler is not None:
+                    with db.begin_nested():
+                        handler(db, row.payload or {})
+                processed.append(row.id)
+            except Exception as e:
+                failed += 1
+                logger.error(f"Webhook {row.id} ({row.provider}/{row.event_type}) failed: {e}")
+                db.execute(text("""
+                    UPDATE webhooks
+                    SET retry_count = retry_count + 1,
+                        error_message = :error,
+                        next_attempt_at = NOW() + LEAST(
+                            :backoff * power(2, retry_count), :max_backoff
+                        ) * interval '1 second'
+                    WHERE id = :id
+                """), {
+                    "id": row.id,
+                    "error": str(e),
+                    "backoff": WEBHOOK_RETRY_BACKOFF_SECONDS,
+                    "max_backoff": WEBHOOK_RETRY_MAX_BACKOFF_SECONDS,
+                })
+
+        if processed:
+            db.execute(text("""
+                UPDATE webhooks
+                SET processed = true, processed_at = NOW(), error_message = NULL
+                WHERE id = ANY(:ids)
+            """), {"ids": processed})
+
+    return {"claimed": len(rows), "processed": len(processed), "failed": failed}
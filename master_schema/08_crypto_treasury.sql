@@ -18,7 +18,7 @@ CREATE TABLE IF NOT EXISTS donations (
     memo text,
     txid text,
     confirmations int DEFAULT 0,
-    status text NOT NULL DEFAULT 'created', -- created/pending/confirmed/failed/flagged/kyc_required/reconciled
+    status text NOT NULL DEFAULT 'created', -- created/pending/confirmed/failed/flagged/kyc_required/unscreened/reconciled
     earmark text DEFAULT 'general', -- 'general', 'project', 'scholarship', 'infrastructure'
     po_b jsonb DEFAULT '{}'::jsonb, -- Purchase order / billing details
     aml_score numeric(5,2), -- 0-100 AML risk score
@@ -42,6 +42,24 @@ CREATE INDEX IF NOT EXISTS idx_donations_txid ON donations(txid);
 CREATE INDEX IF NOT EXISTS idx_donations_created_by ON donations(created_by);
 CREATE INDEX IF NOT EXISTS idx_donations_created_at ON donations(created_at DESC);
 
+-- invoice_id is a first-class column (lookups used to filter on metadata->>'invoice_id').
+-- Databases created before the API wrote the column get it here, then are backfilled
+-- from metadata; the UNIQUE constraint provides the lookup index.
+ALTER TABLE donations ADD COLUMN IF NOT EXISTS invoice_id text UNIQUE;
+
+UPDATE donations
+SET invoice_id = metadata->>'invoice_id'
+WHERE invoice_id IS NULL
+  AND metadata ? 'invoice_id';
+
+-- Post-confirmation pipeline (compliance -> receipt -> NFT) bookkeeping: set when a
+-- donation is confirmed and dispatched, and when its last step finishes. The poller
+-- re-dispatches confirmed donations whose pipeline was dispatched but never completed.
+ALTER TABLE donations ADD COLUMN IF NOT EXISTS pipeline_dispatched_at timestamptz;
+ALTER TABLE donations ADD COLUMN IF NOT EXISTS pipeline_completed_at timestamptz;
+CREATE INDEX IF NOT EXISTS idx_donations_pipeline_incomplete ON donations(pipeline_dispatched_at)
+    WHERE status = 'confirmed' AND pipeline_completed_at IS NULL;
+
 -- ============================================
 -- WALLETS (Treasury Management)
 -- ============================================
@@ -164,3 +182,52 @@ CREATE TRIGGER trigger_donations_audit
     FOR EACH ROW
     EXECUTE FUNCTION log_audit_event();
 
+-- Notify API workers when payment progress changes (cache invalidation, status streams)
+CREATE OR REPLACE FUNCTION notify_donation_changed()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('donation_changes', json_build_object(
+        'id', NEW.id,
+        'invoice_id', NEW.invoice_id,
+        'txid', NEW.txid,
+        'old_txid', OLD.txid,
+        'status', NEW.status,
+        'confirmations', NEW.confirmations
+    )::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trigger_donations_notify_change
+    AFTER UPDATE OF status, confirmations, txid ON donations
+    FOR EACH ROW
+    WHEN (OLD.status IS DISTINCT FROM NEW.status
+          OR OLD.confirmations IS DISTINCT FROM NEW.confirmations
+          OR OLD.txid IS DISTINCT FROM NEW.txid)
+    EXECUTE FUNCTION notify_donation_changed();
+
+
+-- ============================================
+-- TRIGGERS FOR wallets
+-- ============================================
+
+-- Notify API workers so their in-memory wallet pools refresh (payload: chain)
+CREATE OR REPLACE FUNCTION notify_wallets_changed()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        PERFORM pg_notify('wallets_changed', OLD.chain);
+    ELSE
+        PERFORM pg_notify('wallets_changed', NEW.chain);
+        IF TG_OP = 'UPDATE' AND OLD.chain IS DISTINCT FROM NEW.chain THEN
+            PERFORM pg_notify('wallets_changed', OLD.chain);
+        END IF;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trigger_wallets_notify
+    AFTER INSERT OR UPDATE OR DELETE ON wallets
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_wallets_changed();
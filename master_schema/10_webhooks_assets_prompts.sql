@@ -21,6 +21,66 @@ CREATE INDEX IF NOT EXISTS idx_webhooks_provider ON webhooks(provider, received_
 CREATE INDEX IF NOT EXISTS idx_webhooks_processed ON webhooks(processed, received_at DESC);
 CREATE INDEX IF NOT EXISTS idx_webhooks_event_type ON webhooks(event_type);
 
+-- Idempotency: sha256 of the raw request body; retried deliveries of the
+-- same payload from a provider collapse onto the first row
+ALTER TABLE webhooks ADD COLUMN IF NOT EXISTS idempotency_key text;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_webhooks_idempotency
+    ON webhooks(provider, idempotency_key);
+-- Earliest time a failed delivery may be retried (exponential backoff)
+ALTER TABLE webhooks ADD COLUMN IF NOT EXISTS next_attempt_at timestamptz;
+-- Consumer backlog scan (WHERE processed = false ORDER BY received_at)
+CREATE INDEX IF NOT EXISTS idx_webhooks_pending
+    ON webhooks(received_at) WHERE processed = false;
+
+-- ============================================
+-- AGENT MESSAGE BUS (agents/base/transports.py PostgresTransport)
+-- ============================================
+CREATE TABLE IF NOT EXISTS agent_bus_messages (
+    id bigserial PRIMARY KEY,
+    event_type text NOT NULL,
+    payload jsonb NOT NULL,
+    created_at timestamptz DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_agent_bus_messages_created ON agent_bus_messages(created_at);
+
+-- Consumer groups subscribed to an event type
+CREATE TABLE IF NOT EXISTS agent_bus_groups (
+    group_name text NOT NULL,
+    event_type text NOT NULL,
+    created_at timestamptz DEFAULT now(),
+    PRIMARY KEY (group_name, event_type)
+);
+
+-- One row per (group, message) until acknowledged; claimed_at is NULL until
+-- a consumer takes it, and stale claims are taken over (at-least-once)
+CREATE TABLE IF NOT EXISTS agent_bus_deliveries (
+    group_name text NOT NULL,
+    message_id bigint NOT NULL REFERENCES agent_bus_messages(id) ON DELETE CASCADE,
+    event_type text NOT NULL,
+    consumer text,
+    claimed_at timestamptz,
+    deliveries integer NOT NULL DEFAULT 0,
+    PRIMARY KEY (group_name, message_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_agent_bus_deliveries_claim
+    ON agent_bus_deliveries(group_name, event_type, message_id);
+
+-- Wake LISTENing consumers (payload: event_type)
+CREATE OR REPLACE FUNCTION notify_agent_bus_message()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('agent_bus', NEW.event_type);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trigger_agent_bus_messages_notify
+    AFTER INSERT ON agent_bus_messages
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_agent_bus_message();
+
 -- ============================================
 -- ASSETS (MinIO/S3 Storage Metadata)
 -- ============================================
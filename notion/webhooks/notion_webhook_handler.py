@@ -9,29 +9,73 @@ import json
 import hmac
 import hashlib
 import logging
+import threading
 from flask import Flask, request, jsonify
 from dotenv import load_dotenv
 
 load_dotenv()
 
 app = Flask(__name__)
-WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("notion-webhook")
 
+
+class HmacVerifier:
+    """Pre-keyed HMAC-SHA256 check against one or more secrets (same scheme as api/signing.py)"""
+
+    def __init__(self, secrets):
+        self.configured = bool(secrets)
+        self._keyed = [hmac.new(s.encode(), digestmod=hashlib.sha256) for s in secrets]
+
+    def verify(self, body: bytes, signature: str) -> bool:
+        if not signature:
+            return False
+        signature = signature.strip()
+        if "=" in signature:
+            signature = signature.split("=", 1)[1]
+        matched = False
+        for keyed in self._keyed:
+            mac = keyed.copy()
+            mac.update(body)
+            matched |= hmac.compare_digest(mac.hexdigest(), signature)
+        return matched
+
+
+_verifier_lock = threading.Lock()
+_verifier_cache = {}
+
+
+def get_verifier() -> HmacVerifier:
+    """
+    Verifier for WEBHOOK_SECRET_NOTION (or WEBHOOK_SECRET), comma-separated
+    while rotating; rebuilt whenever the configured value changes
+    """
+    raw = os.getenv("WEBHOOK_SECRET_NOTION")
+    if raw is None:
+        raw = os.getenv("WEBHOOK_SECRET", "")
+    verifier = _verifier_cache.get(raw)
+    if verifier is None:
+        with _verifier_lock:
+            _verifier_cache.clear()
+            verifier = _verifier_cache[raw] = HmacVerifier(
+                [s.strip() for s in raw.split(",") if s.strip()]
+            )
+    return verifier
+
 @app.route('/webhooks/notion', methods=['POST'])
 def handle_notion_webhook():
     """Handle incoming Notion webhook events"""
     try:
         # Verify webhook signature
         signature = request.headers.get('X-Notion-Signature', '')
-        if not verify_signature(request.data, signature):
+        body = request.get_data(cache=True)
+        if not verify_signature(body, signature):
             logger.warning("Invalid webhook signature")
             return jsonify({"error": "Invalid signature"}), 401
         
         # Process webhook event
-        event = request.json
+        event = json.loads(body)
         event_type = event.get('type')
         
         logger.info(f"Received Notion webhook: {event_type}")
@@ -52,16 +96,11 @@ def handle_notion_webhook():
 
 def verify_signature(payload: bytes, signature: str) -> bool:
     """Verify webhook signature"""
-    if not WEBHOOK_SECRET:
+    verifier = get_verifier()
+    if not verifier.configured:
         return True  # Skip verification if no secret set
     
-    expected = hmac.new(
-        WEBHOOK_SECRET.encode(),
-        payload,
-        hashlib.sha256
-    ).hexdigest()
-    
-    return hmac.compare_digest(expected, signature)
+    return verifier.verify(payload, signature)
 
 def handle_page_update(event: dict):
     """Handle page update event"""